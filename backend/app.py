@@ -1,108 +1,387 @@
+import io
 import os
-from flask import Flask, render_template, request, send_file
-from utils.processing import load_and_preprocess_data, melt_master_dataframe, find_missing_rows, count_matching_names
-from utils.input_utils.input_processor import check_columns, clean_phone_numbers
-from utils.clean_for_texting import clean_csv_for_texting
-from utils.input_utils.reversed_prospect_input import process_csv
+import time
+import itertools
+import tempfile
+from flask import (Flask, Request, Response, render_template, request, send_file, jsonify, url_for,
+                   stream_with_context, has_request_context)
+from utils.master_utils.master_cache import MasterCache
+from utils.master_utils.partitions import PartitionedMasterCache
+from utils.agent_lookup import combine_lookups
+from utils.crossmatch import (CrossmatchStats, MATCH_TIERS, crossmatch_frames, cascade_crossmatch_frames,
+                              preprocess_input, iter_crossmatch, master_partitions)
+from utils.csv_stream import iter_csv
+from utils.clean_for_texting import clean_dataframe_for_texting
+from utils.input_utils.reversed_prospect_input import process_dataframe
+from utils.jobs import JobQueue, JobQueueFull
+from utils.result_cache import ResultCache, cache_key, hash_stream
+from utils.metrics import (REGISTRY, ROWS_PROCESSED, BYTES_PROCESSED, HTTP_REQUESTS, AGENT_LOOKUP_SECONDS,
+                           RESULT_CACHE_REQUESTS, timed_stage)
 
 import pandas as pd
 import logging
 
 
+UPLOAD_SPOOL_THRESHOLD = 16 * 1024 * 1024  # uploads larger than this are spooled to a temp file
+
+
+class UploadRequest(Request):
+    """Keeps uploaded files in memory and only spools them to disk above UPLOAD_SPOOL_THRESHOLD."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD, mode="rb+")
+
+
 app = Flask(__name__, template_folder="../frontend/templates", static_folder="../frontend/static")
+app.request_class = UploadRequest
 
 UPLOAD_FOLDER = 'data/upload'
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MASTER_FILE_PATH = os.path.join(BASE_DIR, 'data', 'brokermetrics_data', 'Master', '11132024.csv')
+# Per-region master partitions (see utils.master_utils.partitions); used instead of the flat master when present
+MASTER_PARTITION_DIR = os.path.join(BASE_DIR, 'data', 'brokermetrics_data', 'Master', 'partitions')
+MASTER_RELOAD_INTERVAL = 30  # seconds between checks for a new master file
+CROSSMATCH_STREAMING_THRESHOLD = 50 * 1024 * 1024  # uploads larger than this are matched in chunks
+CROSSMATCH_CHUNKSIZE = 100000
+JOB_WORKERS = 2  # background jobs processed at the same time
+JOB_MAX_PENDING = 20  # queued + running jobs before new submissions are refused
+RESULT_CACHE_DIR = os.path.join(UPLOAD_FOLDER, 'result_cache')
+RESULT_CACHE_MAX_BYTES = 2 * 1024 ** 3  # disk kept for results of repeated uploads; 0 turns the cache off
+RESULT_CACHE_VERSION = 1  # bump when a cached route's output changes, so results cached before are not served
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-@app.route("/crossmatch", methods=["GET", "POST"])
-def index():
-    if request.method == "POST":
-        input_file = request.files["input_file"]
-        
-        # Save uploaded file
-        input_file_path = os.path.join(UPLOAD_FOLDER, input_file.filename)
-        input_file.save(input_file_path)
-
-        # Load and preprocess the uploaded input and master CSV files
-        input_df, master_df = load_and_preprocess_data(input_file_path, MASTER_FILE_PATH)
-        if(check_columns(input_df, ["First Name", "Last Name", "Phone"])):
-            clean_phone_numbers(input_df, ["Phone"])
+# Keep the lowercased, melted master resident instead of re-reading it per upload
+master_cache = MasterCache(MASTER_FILE_PATH, poll_interval=MASTER_RELOAD_INTERVAL)
+partitioned_master = PartitionedMasterCache(MASTER_PARTITION_DIR, poll_interval=MASTER_RELOAD_INTERVAL)
+# Decided once: partitions written by a rebuild while the app runs are served after a restart
+USE_PARTITIONS = partitioned_master.available
+if USE_PARTITIONS:
+    partitioned_master.start()
+elif os.path.exists(MASTER_FILE_PATH):
+    master_cache.start()
+
+# Large uploads can be processed in the background and polled for progress
+job_queue = JobQueue(os.path.join(UPLOAD_FOLDER, 'jobs'), max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING)
+
+# Re-uploads of the same file with the same options (and master) are answered from disk
+result_cache = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES)
+
+
+def _resident_snapshots():
+    """The loaded master snapshots: every resident region partition, or the flat master."""
+    if USE_PARTITIONS:
+        return [snapshot for snapshot in partitioned_master.resident().values() if snapshot is not None]
+    return [master_cache.snapshot] if master_cache.snapshot is not None else []
+
+
+def _master_cache_age():
+    snapshots = _resident_snapshots()
+    return time.time() - min(snapshot.loaded_at for snapshot in snapshots) if snapshots else None
+
+
+def _master_rows():
+    snapshots = _resident_snapshots()
+    return sum(len(snapshot.master_df) for snapshot in snapshots) if snapshots else None
+
+
+def get_master(regions=None):
+    """
+    The master to match against: the snapshots of the given region partitions
+    (every region when None), or the flat master when there are no partitions.
+    """
+    if USE_PARTITIONS:
+        return partitioned_master.snapshots(regions)
+    return master_cache.get()
+
+
+REGISTRY.gauge('csvtools_master_cache_age_seconds', 'Seconds since the resident master snapshot was loaded.',
+               function=_master_cache_age)
+REGISTRY.gauge('csvtools_master_rows', 'Rows in the resident master snapshot.', function=_master_rows)
+REGISTRY.gauge('csvtools_result_cache_bytes', 'Size of the cached results on disk.', function=lambda: result_cache.size)
+
+
+def _no_stage(stage):
+    pass
+
+
+def _input_size(input_file):
+    """Size in bytes of an input given as a path or a seekable file-like object."""
+    if isinstance(input_file, (str, os.PathLike)):
+        return os.path.getsize(input_file)
+    position = input_file.tell()
+    size = input_file.seek(0, os.SEEK_END)
+    input_file.seek(position)
+    return size
+
+
+CROSSMATCH_STAGES = ["load master", "parse", "match", "write"]
+
+def crossmatch_results(input_file, stats, set_stage=_no_stage, fuzzy_threshold=None, match_tiers=None, regions=None,
+                       master=None):
+    """
+    Crossmatch an uploaded file (path or file-like) against the resident master,
+    yielding (matched rows, missing agents, unique agents) as they are produced.
+    With fuzzy_threshold set, unmatched names are also fuzzy-matched to the master;
+    with match_tiers set, rows are matched by the email/phone/name cascade;
+    with regions set, only those region partitions are matched against.
+    master is the get_master(regions) result to match against, when the caller already has it.
+    """
+    set_stage("load master")
+    if master is None:
+        master = get_master(regions)
+
+    # Very large inputs are matched chunk by chunk with a fixed memory ceiling
+    if _input_size(input_file) > CROSSMATCH_STREAMING_THRESHOLD:
+        set_stage("match")
+        yield from iter_crossmatch(input_file, master, chunksize=CROSSMATCH_CHUNKSIZE, stats=stats,
+                                   fuzzy_threshold=fuzzy_threshold, match_tiers=match_tiers)
+        stats.log_summary()
+        ROWS_PROCESSED.inc(stats.input_rows, route=_route(), direction="in")
+        return
+
+    # Load and preprocess the uploaded input; the master is already resident
+    set_stage("parse")
+    with timed_stage("parse"):
+        input_df = pd.read_csv(input_file)
+    with timed_stage("normalize"):
+        input_df = preprocess_input(input_df)
+
+    # Merge the data based on 'First Name' and 'Last Name', and collect unmatched agents
+    set_stage("match")
+    with timed_stage("join"):
+        if match_tiers:
+            merged_df, unmatched_agents = cascade_crossmatch_frames(input_df, master, match_tiers, fuzzy_threshold, stats)
         else:
-            print("cols dont match")
+            merged_df, unmatched_agents = crossmatch_frames(input_df, master, fuzzy_threshold)
+    missing_agents = unmatched_agents.loc[:, ['First Name', 'Last Name', 'Phone', 'EMail']]
+    missing_agents = missing_agents[missing_agents['Phone'].isnull()]
 
-        # Melt the master DataFrame to handle multiple phone numbers
-        melted_master_df = melt_master_dataframe(master_df)
+    with timed_stage("dedup"):
+        cleaned_df = merged_df.drop_duplicates(subset=['First Name', 'Last Name', "Phone"])
+        unique_agents = merged_df.drop_duplicates(subset=['First Name', 'Last Name'])
 
-        # Find missing agents
-        missing_agents = find_missing_rows(melted_master_df, input_df, ['First Name', 'Last Name'])
-        missing_agents = missing_agents[missing_agents['Phone'].isnull()]
-        missing_agents.to_csv("missing.csv")
+    stats.input_rows = len(input_df)
+    stats.matched_agents = len(unique_agents)
+    stats.unmatched_agents = len(unmatched_agents)
+    stats.phone_numbers = len(cleaned_df)
+    stats.log_summary()
+    ROWS_PROCESSED.inc(stats.input_rows, route=_route(), direction="in")
+
+    yield cleaned_df, missing_agents, unique_agents
+
+def run_crossmatch(input_file_path, output_file_path, missing_output_path,
+                   unique_agents_output_path, set_stage=_no_stage, **match_options):
+    """Crossmatch an uploaded file and write the matched, missing and unique-agent files."""
+    stats = CrossmatchStats()
+    results = crossmatch_results(input_file_path, stats, set_stage, **match_options)
+    for i, (cleaned_df, missing_agents, unique_agents) in enumerate(results):
+        set_stage("write")
+        mode, header = ('w', True) if i == 0 else ('a', False)
+        with timed_stage("write"):
+            missing_agents.to_csv(missing_output_path, mode=mode, header=header, index=False)
+            unique_agents.to_csv(unique_agents_output_path, mode=mode, header=header, index=False)
+            cleaned_df.to_csv(output_file_path, mode=mode, header=header, index=False)
+    return stats
+
+
+CLEAN_TEXTING_STAGES = ["clean", "write"]
+
+def run_clean_texting(input_file_path, output_file_path, set_stage=_no_stage):
+    """Split an uploaded file into one row per valid phone number and write it."""
+    set_stage("clean")
+    cleaned_df = clean_for_texting(input_file_path)
+    set_stage("write")
+    with timed_stage("write"):
+        cleaned_df.to_csv(output_file_path, index=False)
+    return cleaned_df
 
-        # Merge the data based on 'First Name' and 'Last Name'
-        merged_df = pd.merge(input_df, melted_master_df, on=['First Name', 'Last Name'], how='left', suffixes=('', '_data'))
-        merged_df['Phone'] = merged_df['Phone'].fillna(merged_df['Phone_data'])
-        merged_df.drop(columns=['Phone_data'], inplace=True)
-        merged_df = merged_df[merged_df['Phone'].notna()]
-        cleaned_df = merged_df.drop_duplicates(subset=['First Name', 'Last Name', "Phone"])
 
-        unique_agents = merged_df.drop_duplicates(subset=['First Name', 'Last Name'])
-        unique_agents.to_csv("unique_agents.csv", index=False)
+CLEAN_INPUT_STAGES = ["parse", "write"]
 
-        print(f'Total rows in input: {len(input_df)}')
-        print(f'Match Rate: {len(unique_agents) / len(input_df) * 100:.2f}%')
-        print(f'Total agents matched and found phone numbers: {len(unique_agents)}')
-        print(f'Total Phone Numbers Found: {len(cleaned_df)}')
+def run_clean_input(input_file_path, output_file_path, set_stage=_no_stage):
+    """Split a Reverse Prospect paste into the five crossmatch columns and write it."""
+    set_stage("parse")
+    df = clean_input(input_file_path)
+    set_stage("write")
+    with timed_stage("write"):
+        df.to_csv(output_file_path, index=False)
+    return df
 
-        # Save the merged output to a CSV file
-        output_file_path = os.path.join(UPLOAD_FOLDER, "matched_result.csv")
-        print("output_file_path: ", output_file_path)
-        cleaned_df.to_csv(output_file_path, index=False)
 
-        # Return the file as a download
-        return send_file(output_file_path, as_attachment=True)
+def clean_for_texting(input_file):
+    """clean_csv_for_texting, with its parse and normalize stages timed separately."""
+    with timed_stage("parse"):
+        df = pd.read_csv(input_file)
+    ROWS_PROCESSED.inc(len(df), route=_route(), direction="in")
+    with timed_stage("normalize"):
+        return clean_dataframe_for_texting(df)
+
+
+def clean_input(input_file):
+    """process_csv, with its parse and normalize stages timed separately."""
+    with timed_stage("parse"):
+        df = pd.read_csv(input_file)
+    ROWS_PROCESSED.inc(len(df), route=_route(), direction="in")
+    with timed_stage("normalize"):
+        return process_dataframe(df)
+
+
+def _route():
+    """The matched URL rule of the current request (e.g. '/jobs/<kind>'), used as a metrics label."""
+    if not has_request_context():
+        return "background"
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _receive_upload():
+    """Parses the multipart upload (spooling it as needed), timing it and counting its bytes."""
+    with timed_stage("receive"):
+        input_file = request.files.get("input_file")
+    BYTES_PROCESSED.inc(request.content_length or 0, route=_route(), direction="in")
+    return input_file
+
+
+def _count_output(frames, route):
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    for df in frames:
+        ROWS_PROCESSED.inc(len(df), route=route, direction="out")
+        yield df
+
+
+def _count_bytes(pieces, route):
+    for piece in pieces:
+        BYTES_PROCESSED.inc(len(piece.encode("utf-8")), route=route, direction="out")
+        yield piece
+
+
+def csv_response(frames, download_name, result_key=None):
+    """
+    Stream one or more DataFrames to the client as a CSV download, encoding as we go.
+    With result_key set, the CSV is also stored in the result cache under that key.
+    """
+    route = _route()
+    pieces = iter_csv(_count_output(frames, route))
+    if result_key is not None:
+        pieces = result_cache.store(result_key, pieces)
+    pieces = _count_bytes(pieces, route)
+    return Response(stream_with_context(pieces), mimetype="text/csv",
+                    headers={"Content-Disposition": f"attachment; filename={download_name}"})
+
+
+def _master_version(master):
+    """Identifies the master snapshots a result is matched against: their files and modification times."""
+    return [(snapshot.path, snapshot.mtime) for snapshot in master_partitions(master)]
+
+
+def _cached_result(input_file, *key_parts):
+    """
+    Looks an upload up in the result cache by its content, the route and
+    key_parts (master version, options), counting the hit or miss.
+
+    Returns:
+    tuple: (cache key, the cached result opened for reading, or None on a miss).
+    """
+    with timed_stage("hash"):
+        content_hash = hash_stream(input_file.stream)
+    key = cache_key(RESULT_CACHE_VERSION, _route(), content_hash, *key_parts)
+    cached = result_cache.open(key)
+    RESULT_CACHE_REQUESTS.inc(route=_route(), result="hit" if cached else "miss")
+    return key, cached
+
+
+def cached_csv_response(cached, download_name):
+    """Send a result cache entry as the CSV download."""
+    BYTES_PROCESSED.inc(os.fstat(cached.fileno()).st_size, route=_route(), direction="out")
+    return send_file(cached, mimetype="text/csv", as_attachment=True, download_name=download_name)
+
+
+def _detach_upload_stream(input_file):
+    """
+    Take an upload's stream out of the request so it stays open while a streamed
+    response is still reading from it after the view has returned.
+    """
+    stream = input_file.stream
+    input_file.stream = io.BytesIO()
+    return stream
+
+
+def _match_options(form):
+    """
+    Reads the optional crossmatch form fields: fuzzy_threshold (0-1), cascade
+    (match by email, then phone, then name) and the region hints region,
+    office and zip, which pick the master partitions to match against.
+    Raises ValueError on bad values.
+    """
+    options = {}
+    value = form.get("fuzzy_threshold", "").strip()
+    if value:
+        threshold = float(value)
+        if not 0 < threshold <= 1:
+            raise ValueError(f"fuzzy_threshold must be between 0 and 1, got {threshold}")
+        options["fuzzy_threshold"] = threshold
+    if form.get("cascade", "").strip().lower() in ("1", "true", "on", "yes"):
+        options["match_tiers"] = MATCH_TIERS
+    # A flat master holds every region, so hints only matter once the master is partitioned
+    hints = [form.get(field, "").strip() for field in ("region", "office", "zip")]
+    if USE_PARTITIONS and any(hints):
+        options["regions"] = partitioned_master.resolve_regions(*hints)
+    return options
+
+
+def _matched_chunks(input_stream, master, match_options):
+    try:
+        for cleaned_df, _, _ in crossmatch_results(input_stream, CrossmatchStats(), master=master, **match_options):
+            yield cleaned_df
+    finally:
+        input_stream.close()
+
+
+@app.route("/crossmatch", methods=["GET", "POST"])
+def index():
+    if request.method == "POST":
+        input_file = _receive_upload()
+        if not input_file:
+            return "No file uploaded", 400
+        try:
+            match_options = _match_options(request.form)
+        except ValueError as e:
+            return str(e), 400
+
+        # Results only stay valid for the master they were matched against, so the snapshot
+        # in the key is the one matched against, even if a reload swaps in another meanwhile
+        master = get_master(match_options.get("regions"))
+        result_key, cached = _cached_result(input_file, _master_version(master), match_options)
+        if cached is not None:
+            return cached_csv_response(cached, "matched_result.csv")
+
+        # Parse the upload straight from the request stream; send matched rows to the client
+        # as each chunk is produced, computing the first one up front so errors surface as a 500
+        matched = _matched_chunks(_detach_upload_stream(input_file), master, match_options)
+        first_chunk = next(matched)
+        return csv_response(itertools.chain([first_chunk], matched), "matched_result.csv", result_key)
 
     return render_template("index.html")
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 @app.route("/clean_texting", methods=["GET", "POST"])
 def clean_csv_for_texting_route():
     if request.method == "POST":
-        input_file = request.files.get("input_file")
+        input_file = _receive_upload()
         if not input_file:
             return "No file uploaded", 400
 
-        input_file_path = os.path.join(UPLOAD_FOLDER, input_file.filename)
-        input_file.save(input_file_path)
-        
-        logging.info(f"Input file saved at: {input_file_path}")
-
-        output_file_path = os.path.join(UPLOAD_FOLDER, "cleaned_csv.csv")
-        print("UPload folder: ", UPLOAD_FOLDER)
-        print(output_file_path)
+        logging.info(f"Input file received: {input_file.filename}")
 
         try:
-            cleaned_df = clean_csv_for_texting(input_file_path)
-            print(cleaned_df)
-            cleaned_df.to_csv(output_file_path, index=False)
-            logging.info("CSV cleaned and saved successfully!")
-
-             # Verify the file exists
-            if os.path.exists(output_file_path):
-                logging.info(f"File successfully saved at: {output_file_path}")
-
-                # Optional: Check the contents of the saved CSV
-                saved_df = pd.read_csv(output_file_path)
-                logging.info(f"Contents of the saved CSV:\n{saved_df.head()}")
-            else:
-                logging.error(f"File not found after save attempt: {output_file_path}")
-                return "File not found after saving", 500
-
-
-            return send_file(output_file_path, as_attachment=True)
+            result_key, cached = _cached_result(input_file)
+            if cached is not None:
+                return cached_csv_response(cached, "cleaned_csv.csv")
+            cleaned_df = clean_for_texting(input_file.stream)
+            logging.info(f"CSV cleaned successfully ({len(cleaned_df)} rows):\n{cleaned_df.head()}")
+            return csv_response(cleaned_df, "cleaned_csv.csv", result_key)
 
         except Exception as e:
             logging.error(f"An error occurred while processing the file: {e}")
@@ -114,25 +393,17 @@ def clean_csv_for_texting_route():
 @app.route("/clean_input", methods=["GET", "POST"])
 def split_columns_route():
     if request.method == "POST":
-        input_file = request.files.get("input_file")
+        input_file = _receive_upload()
         if not input_file:
             return "No file uploaded", 400
 
-        # Save the input file
-        input_file_path = os.path.join(UPLOAD_FOLDER, input_file.filename)
-        input_file.save(input_file_path)
-        logging.info(f"Input file saved at: {input_file_path}")
-
-        output_file_path = os.path.join(UPLOAD_FOLDER, "cleaned_input.csv")
+        logging.info(f"Input file received: {input_file.filename}")
 
         try:
-            # Load and process the CSV
-            df = process_csv(input_file_path)
-            # Save the processed file
-            df.to_csv(output_file_path, index=False)
-            logging.info("CSV processed and saved successfully!")
-
-            return send_file(output_file_path, as_attachment=True)
+            # Load and process the CSV straight from the upload
+            df = clean_input(input_file.stream)
+            logging.info("CSV processed successfully!")
+            return csv_response(df, "cleaned_input.csv")
 
         except Exception as e:
             logging.error(f"An error occurred while processing the file: {e}")
@@ -140,5 +411,138 @@ def split_columns_route():
 
     return render_template("clean_input.html")
 
+
+def _crossmatch_job(job, input_file_path, form):
+    folder = job_queue.job_folder(job)
+    output_file_path = os.path.join(folder, job.download_name)
+    run_crossmatch(input_file_path, output_file_path,
+                   missing_output_path=os.path.join(folder, "missing.csv"),
+                   unique_agents_output_path=os.path.join(folder, "unique_agents.csv"),
+                   set_stage=job.set_stage,
+                   **_match_options(form))
+    return output_file_path
+
+
+def _clean_texting_job(job, input_file_path, form):
+    output_file_path = os.path.join(job_queue.job_folder(job), job.download_name)
+    run_clean_texting(input_file_path, output_file_path, set_stage=job.set_stage)
+    return output_file_path
+
+
+def _clean_input_job(job, input_file_path, form):
+    output_file_path = os.path.join(job_queue.job_folder(job), job.download_name)
+    run_clean_input(input_file_path, output_file_path, set_stage=job.set_stage)
+    return output_file_path
+
+
+# kind -> (job function, stages, download name)
+JOB_KINDS = {
+    "crossmatch": (_crossmatch_job, CROSSMATCH_STAGES, "matched_result.csv"),
+    "clean_texting": (_clean_texting_job, CLEAN_TEXTING_STAGES, "cleaned_csv.csv"),
+    "clean_input": (_clean_input_job, CLEAN_INPUT_STAGES, "cleaned_input.csv"),
+}
+
+
+@app.route("/agent", methods=["GET"])
+def agent_lookup_route():
+    """
+    Looks up one agent by name in the resident master and returns every known
+    phone and email for them as JSON. Query parameters: first_name and
+    last_name (required), office (Office ID or part of the office name) and
+    email (optional filters), and region or zip to pick the master partitions
+    to search (inferred from office or zip when not given).
+    """
+    first_name = request.args.get("first_name", "").strip()
+    last_name = request.args.get("last_name", "").strip()
+    if not first_name or not last_name:
+        return jsonify(error="first_name and last_name are required"), 400
+    office, email = request.args.get("office"), request.args.get("email")
+
+    # Never load the master on the request path; a lookup is only answered from resident snapshots
+    if USE_PARTITIONS:
+        try:
+            regions = partitioned_master.resolve_regions(request.args.get("region"), office, request.args.get("zip"))
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        snapshots = partitioned_master.resident(regions)
+    else:
+        snapshots = {None: master_cache.snapshot}
+    if not snapshots or any(snapshot is None for snapshot in snapshots.values()):
+        return jsonify(error="Master file is not loaded"), 503
+
+    start = time.perf_counter()
+    results = {region: snapshot.agent_index.lookup(first_name, last_name, office=office, email=email)
+               for region, snapshot in snapshots.items()}
+    result = results[None] if None in results else combine_lookups(results)
+    AGENT_LOOKUP_SECONDS.observe(time.perf_counter() - start)
+    if not result["agents"]:
+        return jsonify(error="No matching agent", first_name=first_name, last_name=last_name), 404
+    return jsonify(first_name=first_name, last_name=last_name, **result)
+
+
+@app.route("/jobs/<kind>", methods=["POST"])
+def submit_job_route(kind):
+    if kind not in JOB_KINDS:
+        return jsonify(error=f"Unknown job kind: {kind}"), 404
+    input_file = _receive_upload()
+    if not input_file:
+        return jsonify(error="No file uploaded"), 400
+    try:
+        _match_options(request.form)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    job_func, stages, download_name = JOB_KINDS[kind]
+    try:
+        job = job_queue.create(kind, stages, download_name)
+    except JobQueueFull as e:
+        return jsonify(error=f"Too many jobs in progress: {e}"), 503
+
+    # Jobs outlive the request, so their upload is kept in the job's own folder
+    try:
+        input_file_path = os.path.join(job_queue.job_folder(job), "input.csv")
+        input_file.save(input_file_path)
+    except Exception as e:
+        job_queue.discard(job, f"Could not save upload: {e}")
+        return jsonify(error="Could not save upload"), 500
+
+    job_queue.submit(job, job_func, input_file_path, request.form.to_dict())
+    logging.info(f"Queued {kind} job {job.id}")
+    return jsonify(job_id=job.id,
+                   status_url=url_for("job_status_route", job_id=job.id),
+                   result_url=url_for("job_result_route", job_id=job.id)), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status_route(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown job"), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result_route(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown job"), 404
+    if job.status == 'failed':
+        return jsonify(error=job.error), 500
+    if job.status != 'finished':
+        return jsonify(job.to_dict()), 409
+    return send_file(os.path.abspath(job.result_path), as_attachment=True, download_name=job.download_name)
+
+
+@app.after_request
+def count_request(response):
+    HTTP_REQUESTS.inc(route=_route(), method=request.method, status=str(response.status_code))
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_route():
+    return Response(REGISTRY.render(), content_type=REGISTRY.content_type)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
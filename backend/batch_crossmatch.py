@@ -0,0 +1,182 @@
+"""
+Crossmatch many input files against one master.
+
+The master is loaded, normalized and indexed once, then every input is
+streamed against that shared snapshot (see stream_crossmatch), several
+inputs at a time. Each input gets its own output file of matched
+(name, phone) rows and one summary line.
+
+Inputs can be CSV files, folders (every .csv in them) or glob patterns.
+The master can also be a folder of region partitions (see
+utils.master_utils.partitions); --region then limits matching to some of them.
+Run from the backend folder:
+    python batch_crossmatch.py data/Master/10232024.csv data/prospects/ --output-dir matched
+    python batch_crossmatch.py master.csv "data/prospects/*_2024-10-*.csv" --workers 4 --cascade
+    python batch_crossmatch.py data/Master/partitions data/prospects/ --region OC
+"""
+import os
+import glob
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.file_utils import atomic_output
+
+OUTPUT_SUFFIX = '_matched'
+DEFAULT_WORKERS = 4
+
+
+def resolve_inputs(patterns):
+    """
+    Expands folders (their .csv files), glob patterns and plain paths into
+    a sorted list of input files without duplicates.
+    """
+    file_paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            file_paths.update(os.path.join(pattern, filename) for filename in os.listdir(pattern)
+                              if filename.endswith('.csv'))
+        elif glob.has_magic(pattern):
+            file_paths.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+        else:
+            file_paths.add(pattern)
+    # A rerun into the same folder must not pick up the previous run's outputs
+    return sorted(path for path in file_paths
+                  if not os.path.splitext(os.path.basename(path))[0].endswith(OUTPUT_SUFFIX))
+
+
+def output_path_for(input_path, output_dir):
+    """The matched-rows file for an input: <output_dir>/<input name>_matched.csv."""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{stem}{OUTPUT_SUFFIX}.csv")
+
+
+def crossmatch_file(input_path, master, output_path, chunksize=50000, fuzzy_threshold=None, match_tiers=None):
+    """
+    Crossmatches one input file against a loaded MasterSnapshot, writing the
+    matched rows to output_path atomically (a failed input leaves no partial file).
+
+    Returns:
+    dict: The input and output paths, the run time in seconds and the
+    CrossmatchStats, or the error message if the input could not be matched.
+    """
+    from utils.crossmatch import stream_crossmatch
+
+    start = time.perf_counter()
+    result = {'input': input_path, 'output': output_path, 'stats': None, 'error': None}
+    try:
+        with atomic_output(output_path) as tmp_path:
+            result['stats'] = stream_crossmatch(input_path, master, tmp_path, chunksize=chunksize,
+                                                fuzzy_threshold=fuzzy_threshold, match_tiers=match_tiers)
+    except Exception as e:
+        result['error'] = str(e) or type(e).__name__
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def summary_line(result):
+    """One line describing how an input went."""
+    name = os.path.basename(result['input'])
+    if result['error'] is not None:
+        return f"{name}: FAILED: {result['error']}"
+    stats = result['stats']
+    return (f"{name}: {stats.input_rows} rows, {stats.match_rate:.2f}% matched, "
+            f"{stats.matched_agents} agents, {stats.unmatched_agents} unmatched, "
+            f"{stats.phone_numbers} phones -> {result['output']} ({result['seconds']:.1f}s)")
+
+
+def crossmatch_files(master, input_paths, output_dir, workers=DEFAULT_WORKERS, chunksize=50000,
+                     fuzzy_threshold=None, match_tiers=None):
+    """
+    Crossmatches every input against the same MasterSnapshot, up to
+    `workers` inputs at a time. The inputs share the snapshot's indexes in
+    this process, so the master is held in memory once, and the lazily
+    built fuzzy and email/phone indexes are built once for all of them.
+
+    Args:
+    master: A loaded MasterSnapshot, or a list of region partition snapshots.
+    input_paths: Input CSV paths.
+    output_dir: Folder for the per-input output files.
+    workers: Number of inputs processed concurrently.
+    chunksize: Input rows processed at a time per input.
+    fuzzy_threshold: Optional minimum name similarity for fuzzy matching.
+    match_tiers: Optional cascade tiers (see cascade_crossmatch_frames).
+
+    Returns:
+    list: One crossmatch_file result per input, in input order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = [output_path_for(input_path, output_dir) for input_path in input_paths]
+    clashes = {path for path in output_paths if output_paths.count(path) > 1}
+    if clashes:
+        raise ValueError(f"Inputs with the same file name would overwrite each other's output: {sorted(clashes)}")
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(crossmatch_file, input_path, master, output_path, chunksize,
+                                   fuzzy_threshold, match_tiers)
+                   for input_path, output_path in zip(input_paths, output_paths)]
+        for future in as_completed(futures):
+            result = future.result()
+            print(summary_line(result), flush=True)
+            results[result['input']] = result
+    return [results[input_path] for input_path in input_paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("master", help="Master CSV, or folder of region partitions, to match against")
+    parser.add_argument("inputs", nargs='+', help="Input CSV files, folders or glob patterns")
+    parser.add_argument("--output-dir", default="crossmatch_output", help="Folder for the output files")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Inputs matched concurrently")
+    parser.add_argument("--chunksize", type=int, default=50000, help="Input rows processed at a time")
+    parser.add_argument("--fuzzy-threshold", type=float, default=None,
+                        help="Also match names at least this similar (0-1)")
+    parser.add_argument("--cascade", action="store_true", help="Match by email, then phone, then name")
+    parser.add_argument("--region", help="With a partitioned master: comma-separated regions to match against")
+    args = parser.parse_args()
+
+    if args.fuzzy_threshold is not None and not 0 < args.fuzzy_threshold <= 1:
+        parser.error(f"--fuzzy-threshold must be between 0 and 1, got {args.fuzzy_threshold}")
+    input_paths = resolve_inputs(args.inputs)
+    if not input_paths:
+        parser.error("no input files found")
+
+    # pandas and the crossmatch modules are only loaded once there is work to do, so --help stays instant
+    from utils.crossmatch import MATCH_TIERS
+    from utils.master_utils.master_cache import MasterSnapshot
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    start = time.perf_counter()
+    if os.path.isdir(args.master):
+        from utils.master_utils.partitions import PartitionCatalog
+        catalog = PartitionCatalog(args.master)
+        try:
+            regions = catalog.resolve_regions(args.region)
+        except ValueError as e:
+            parser.error(str(e))
+        if not regions:
+            parser.error(f"no partitions in {args.master}")
+        master = [MasterSnapshot.from_csv(catalog.partition_path(region)) for region in regions]
+        label = f"{args.master} ({', '.join(regions)})"
+    else:
+        master = MasterSnapshot.from_csv(args.master)
+        label = args.master
+    snapshots = master if isinstance(master, list) else [master]
+    print(f"Loaded master {label}: {sum(len(s.master_df) for s in snapshots)} agents, "
+          f"{sum(len(s.melted_df) for s in snapshots)} phone rows ({time.perf_counter() - start:.1f}s)", flush=True)
+
+    try:
+        results = crossmatch_files(master, input_paths, args.output_dir, args.workers, args.chunksize,
+                                   args.fuzzy_threshold, MATCH_TIERS if args.cascade else None)
+    except ValueError as e:
+        parser.error(str(e))
+    failed = sum(1 for result in results if result['error'] is not None)
+    print(f"{len(results) - failed} of {len(results)} inputs matched in {time.perf_counter() - start:.1f}s")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
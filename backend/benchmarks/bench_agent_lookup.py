@@ -0,0 +1,109 @@
+"""
+Measure /agent lookup latency with many concurrent clients.
+
+Every client thread sends requests through the Flask test client (so
+request parsing, the index probe and JSON encoding are all timed), asking
+for random master agents, some with an office or email filter and some for
+names that don't exist. Together the clients send --rate requests per
+second on a fixed schedule, and latency is measured from when a request
+was due, so time spent queued behind other clients counts. Reports latency
+percentiles and throughput, and exits with status 1 if the p99 is over
+--target-ms.
+
+Run from the backend folder:
+    python -m benchmarks.bench_agent_lookup --size 1m --clients 32 --rate 500
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from benchmarks.datagen import generate_dataset, parse_size
+
+DEFAULT_TARGET_MS = 5
+
+
+def make_queries(master_df, count, rng):
+    """Query strings for random agents: a quarter filtered by office, a quarter by email, a tenth misses."""
+    picked = rng.integers(0, len(master_df), size=count)
+    first = master_df['First Name'].astype(object).to_numpy()[picked]
+    last = master_df['Last Name'].astype(object).to_numpy()[picked]
+    offices = master_df['Office ID'].astype(object).to_numpy()[picked]
+    emails = master_df['EMail'].astype(object).to_numpy()[picked]
+    kinds = rng.random(count)
+    queries = []
+    for i in range(count):
+        query = f"/agent?first_name={first[i]}&last_name={last[i]}"
+        if kinds[i] < 0.1:
+            query = f"/agent?first_name={first[i]}&last_name=nobody{i}"
+        elif kinds[i] < 0.35 and offices[i] is not None:
+            query += f"&office={offices[i]}"
+        elif kinds[i] < 0.6 and isinstance(emails[i], str):
+            query += f"&email={emails[i]}"
+        queries.append(query.replace(' ', '%20'))
+    return queries
+
+
+def run_client(client, queries, start, interval, latencies, statuses):
+    for i, query in enumerate(queries):
+        due = start + i * interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        response = client.get(query)
+        latencies.append(time.perf_counter() - due)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="Master rows: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent client threads")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client")
+    parser.add_argument("--rate", type=float, default=500, help="Requests per second across all clients")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS, help="Allowed p99 latency")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where datasets are generated")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_dir, parse_size(args.size))
+    from app import app, master_cache
+
+    start = time.perf_counter()
+    master = master_cache.set_path(paths['master'])
+    print(f"Master: {len(master.master_df)} rows loaded and indexed in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(0)
+    client = app.test_client()
+    per_client = [make_queries(master.master_df, args.requests, rng) for _ in range(args.clients)]
+    # Warm up Flask's routing and the JSON encoder before timing
+    for query in per_client[0][:20]:
+        client.get(query)
+
+    latencies, statuses = [], {}
+    interval = args.clients / args.rate
+    start = time.perf_counter() + 0.1
+    # Clients are staggered so their requests are spread evenly over time
+    threads = [threading.Thread(target=run_client, args=(app.test_client(), queries, start + i * interval / args.clients,
+                                                         interval, latencies, statuses))
+               for i, queries in enumerate(per_client)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"{len(ms)} requests from {args.clients} clients in {elapsed:.1f}s ({len(ms) / elapsed:.0f} req/s), "
+          f"status counts {dict(sorted(statuses.items()))}")
+    print(f"latency p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms, max {ms.max():.2f} ms")
+    if p99 > args.target_ms:
+        print(f"p99 is over the {args.target_ms:g} ms target")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
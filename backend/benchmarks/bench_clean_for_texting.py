@@ -0,0 +1,97 @@
+"""
+Benchmark the columnar clean_csv_for_texting against the original
+iterrows implementation and check both produce the same output.
+
+Run from the backend folder:
+    python -m benchmarks.bench_clean_for_texting --rows 500000
+"""
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import timed
+from utils.clean_for_texting import clean_dataframe_for_texting
+
+
+def format_phone_number(phone):
+    """The original per-cell phone formatter used by the baseline."""
+    phone = re.sub(r'\D', '', str(phone))
+    return phone if len(phone) == 10 else None
+
+
+def legacy_clean_dataframe_for_texting(df):
+    """The original row-by-row implementation, kept here as the baseline."""
+    split_rows = []
+    for _, row in df.iterrows():
+        phones = [row.get("Phone 1"), row.get("Phone 2"), row.get("Phone 3")]
+        for phone in phones:
+            if pd.notna(phone):
+                formatted_phone = format_phone_number(phone)
+                if formatted_phone:
+                    split_rows.append({
+                        'first name': row["First Name"],
+                        'last name': row["Last Name"],
+                        'office': row["Office Name"],
+                        'phone': formatted_phone,
+                        'email': row["EMail"]
+                    })
+    new_df = pd.DataFrame(split_rows)
+    new_df = new_df.drop_duplicates(subset='phone')
+    duplicate_emails = new_df['email'].duplicated(keep=False)
+    new_df.loc[duplicate_emails, 'email'] = ''
+    return new_df
+
+
+def make_county_export(rows, seed=0):
+    """Build a county-export shaped DataFrame with messy and repeated phones."""
+    rng = np.random.default_rng(seed)
+    phones = rng.integers(2000000000, 9999999999, size=(rows, 3)).astype(object)
+    # Mix of formatted strings, blanks and bad lengths like the real exports
+    phones[rng.random((rows, 3)) < 0.3] = np.nan
+    # Every number some cell holds formatted shows up in one of these styles, chosen at random
+    formatted = rng.random((rows, 3)) < 0.2
+    styles = ["({0}) {1}-{2}", "{0}.{1}.{2}", "{0}-{1}-{2}", "{0} {1} {2}", "+1 {0} {1} {2}"]
+    picked_styles = rng.integers(0, len(styles), formatted.sum())
+    phones[formatted] = [styles[style].format(str(p)[:3], str(p)[3:6], str(p)[6:])
+                         for p, style in zip(phones[formatted], picked_styles)]
+    # Numbers ending in 0000, which a trailing ".0+" strip would cut short when dotted
+    zeros = rng.random((rows, 3)) < 0.02
+    phones[zeros] = [f"{str(p)[:3]}.{str(p)[3:6]}.0000" for p in phones[zeros]]
+    phones[rng.random((rows, 3)) < 0.05] = "555-1234"
+    # Repeat some phones across agents so deduplication has work to do
+    repeat = rng.random(rows) < 0.1
+    phones[repeat, 0] = phones[rng.integers(0, rows, repeat.sum()), 1]
+    emails = np.array([f"agent{i}@example.com" for i in rng.integers(0, rows, rows)], dtype=object)
+    return pd.DataFrame({
+        "First Name": [f"first{i}" for i in range(rows)],
+        "Last Name": [f"last{i}" for i in range(rows)],
+        "Office Name": [f"office {i % 500}" for i in range(rows)],
+        "EMail": emails,
+        "Phone 1": phones[:, 0],
+        "Phone 2": phones[:, 1],
+        "Phone 3": phones[:, 2],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Number of agent rows to generate")
+    args = parser.parse_args()
+
+    df = make_county_export(args.rows)
+
+    legacy_df, legacy_seconds = timed(legacy_clean_dataframe_for_texting, df)
+    new_df, new_seconds = timed(clean_dataframe_for_texting, df)
+
+    pd.testing.assert_frame_equal(legacy_df, new_df, check_dtype=False)
+
+    print(f"Rows in: {args.rows}, rows out: {len(new_df)}")
+    print(f"iterrows:  {legacy_seconds:.3f}s")
+    print(f"columnar:  {new_seconds:.3f}s")
+    print(f"Speedup:   {legacy_seconds / new_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare the old "keep the most filled row" dedup (count non-nulls per row,
+sort the whole frame, drop_duplicates) with coalesce_duplicates, which
+groups the repeated keys in one hashed pass and merges their fields.
+
+The master is loaded once, then a share of its agents get their fields
+split between the original row and an appended copy, the way the same
+agent shows up partially filled in two exports. A few other agents have
+every key field blank; they can't be told apart, so each must come out as
+its own row rather than being merged with the rest.
+Reports wall time, peak traced memory and how many filled cells and
+keyless rows survive.
+
+Run from the backend folder:
+    python -m benchmarks.bench_coalesce --size 1m
+"""
+import os
+import gc
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datagen import generate_dataset, parse_size
+from utils.processing import load_and_preprocess_master, coalesce_duplicates
+
+KEY_COLUMNS = ['First Name', 'Last Name', 'EMail']
+
+
+def sort_and_drop(df, key_columns):
+    """The previous approach, as used by remove_duplicates_keep_filled and cross_match."""
+    df = df.copy()
+    df['non_nan_count'] = df.notna().sum(axis=1)
+    df = df.sort_values(by='non_nan_count', ascending=False).drop_duplicates(subset=key_columns, keep='first')
+    return df.drop(columns=['non_nan_count'])
+
+
+VARIANTS = {
+    'sort + drop_duplicates': sort_and_drop,
+    'coalesce_duplicates': coalesce_duplicates,
+}
+
+
+def keyless_rows(df):
+    return int(df[KEY_COLUMNS].isna().all(axis=1).sum())
+
+
+def with_split_duplicates(master_df, share, keyless_share=0.01, seed=0):
+    """
+    Splits the non-key fields of `share` of the agents across two rows: the
+    original keeps about half of them and an appended copy holds the rest.
+    Another `keyless_share` of the agents have their key fields blanked.
+    """
+    rng = np.random.default_rng(seed)
+    df = master_df.reset_index(drop=True)
+    keyless = rng.choice(len(df), int(len(df) * keyless_share), replace=False)
+    df.loc[keyless, KEY_COLUMNS] = None
+    picked = rng.choice(np.setdiff1d(np.arange(len(df)), keyless), int(len(df) * share), replace=False)
+    copies = df.iloc[picked].reset_index(drop=True)
+    for col in df.columns.difference(KEY_COLUMNS):
+        in_copy = rng.random(len(picked)) < 0.5
+        copies.loc[~in_copy, col] = None
+        df.loc[picked[in_copy], col] = None
+    return pd.concat([df, copies], ignore_index=True).copy()
+
+
+def measure(func, df):
+    gc.collect()
+    start = time.perf_counter()
+    func(df, KEY_COLUMNS)
+    seconds = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func(df, KEY_COLUMNS)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_mb, len(result), int(result.notna().sum().sum()), keyless_rows(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="Master rows: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--duplicate-share", type=float, default=0.3, help="Share of rows appended again as partial copies")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where datasets are generated")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_dir, parse_size(args.size))
+    df = with_split_duplicates(load_and_preprocess_master(paths['master']), args.duplicate_share)
+    print(f"{len(df)} rows, {int(df.notna().sum().sum())} filled cells, {keyless_rows(df)} keyless rows")
+
+    print(f"{'':<24} {'time':>9} {'peak':>10} {'rows':>10} {'filled cells':>13} {'keyless rows':>13}")
+    for name, func in VARIANTS.items():
+        seconds, peak_mb, rows, filled, keyless = measure(func, df)
+        print(f"{name:<24} {seconds:8.2f}s {peak_mb:8.1f}MB {rows:>10} {filled:>13} {keyless:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measure drop_duplicates_in_csv's time and peak memory under different
+memory budgets: a large budget deduplicates in memory, smaller ones split
+the file into more on-disk buckets.
+
+The master is written out with a share of its rows repeated (shuffled in)
+and each budget runs in its own fresh process on a copy of that file.
+Peak memory is the growth of the process's maximum resident set size.
+
+Run from the backend folder:
+    python -m benchmarks.bench_external_dedup --size 1m --budgets 4096,400,100
+"""
+import os
+import time
+import shutil
+import resource
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from benchmarks.datagen import generate_dataset, parse_size
+from utils.external_dedup import read_csv_text, plan_partitions, dedup_csv_file
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_input(master_path, output_path, duplicate_share):
+    master = read_csv_text(master_path)
+    with_duplicates = pd.concat([master, master.sample(frac=duplicate_share, random_state=0)])
+    with_duplicates.sample(frac=1, random_state=1).to_csv(output_path, index=False)
+
+
+def measure(file_path, memory_budget_mb):
+    baseline = peak_rss_mb()
+    buckets, _ = plan_partitions(file_path, memory_budget_mb)
+    start = time.perf_counter()
+    rows_before, rows_after = dedup_csv_file(file_path, memory_budget_mb=memory_budget_mb)
+    return {
+        'buckets': buckets,
+        'seconds': time.perf_counter() - start,
+        'peak_mb': peak_rss_mb() - baseline,
+        'rows_before': rows_before,
+        'rows_after': rows_after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="Master rows: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--budgets", default="4096,400,100", help="Comma-separated memory budgets in MB")
+    parser.add_argument("--duplicate-share", type=float, default=0.3, help="Share of rows repeated in the file")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where datasets are generated")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_dir, parse_size(args.size))
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, 'with_duplicates.csv')
+        # Built in a worker too: the peak RSS of this process carries over into the ones it spawns
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            executor.submit(write_input, paths['master'], source, args.duplicate_share).result()
+        print(f"Input: {os.path.getsize(source) / 1024 ** 2:.1f} MB on disk")
+
+        print(f"{'budget':>8} {'buckets':>8} {'time':>9} {'peak':>10} {'rows':>19}")
+        for budget in (int(b) for b in args.budgets.split(',')):
+            work_file = os.path.join(work_dir, 'work.csv')
+            shutil.copy(source, work_file)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                r = executor.submit(measure, work_file, budget).result()
+            print(f"{budget:>6}MB {r['buckets']:>8} {r['seconds']:8.2f}s {r['peak_mb']:8.1f}MB "
+                  f"{r['rows_before']:>9}->{r['rows_after']:<9}")
+
+
+if __name__ == "__main__":
+    main()
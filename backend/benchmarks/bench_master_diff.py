@@ -0,0 +1,118 @@
+"""
+Time diff_masters against a naive diff that loads both masters whole and
+merges them on Agent ID, and check that both report the same counts.
+
+The "new" snapshot is the generated master with a share of agents dropped,
+new agents appended, one phone replaced for some agents, emails changed or
+cleared for others, the phone columns of yet others shuffled and the
+phones of a last share split over two rows of the same Agent ID (neither
+of which must count as a change), written in a different row order.
+
+Run from the backend folder:
+    python -m benchmarks.bench_master_diff --size 1m
+"""
+import os
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datagen import generate_dataset, parse_size
+from benchmarks.harness import timed
+from utils.phone_utils import PHONE_COLUMNS
+from utils.master_utils.schema import read_master_csv
+from utils.master_utils.master_diff import diff_masters
+
+
+def write_new_snapshot(master_path, output_path, share, rng):
+    """Writes the changed copy of the master described above."""
+    df = pd.read_csv(master_path, dtype=str)
+    rows = len(df)
+    df = df.drop(index=rng.choice(rows, int(rows * share), replace=False))
+
+    added = df.sample(n=int(rows * share), random_state=1).copy()
+    added['Agent ID'] = (np.arange(len(added)) + 10 ** 9).astype(str)
+    added['Phone 1'] = rng.integers(2000000000, 9999999999, len(added)).astype(str)
+    df = pd.concat([df, added], ignore_index=True)
+
+    picked = rng.choice(len(df), int(rows * share * 4), replace=False)
+    quarters = np.array_split(picked, 4)
+    df.loc[quarters[0], 'Phone 2'] = rng.integers(2000000000, 9999999999, len(quarters[0])).astype(str)
+    df.loc[quarters[1], 'EMail'] = np.where(rng.random(len(quarters[1])) < 0.8,
+                                            'changed' + pd.Series(quarters[1]).astype(str) + '@example.com', np.nan)
+    df.loc[quarters[2], PHONE_COLUMNS] = df.loc[quarters[2], PHONE_COLUMNS[::-1]].to_numpy()
+    # The last phones of these agents move to a second row of the same Agent ID
+    split = df.loc[quarters[3]].copy()
+    split['Phone 1'] = np.nan
+    df.loc[quarters[3], PHONE_COLUMNS[1:]] = np.nan
+    df = pd.concat([df, split], ignore_index=True)
+    df.sample(frac=1, random_state=2).to_csv(output_path, index=False)
+
+
+def read_contact_sets(path):
+    """Agent ID -> (set of phones, set of emails) over all of the agent's rows, from the fully loaded master."""
+    df = read_master_csv(path)
+    df['EMail'] = df['EMail'].fillna('').astype(str).str.strip().str.lower()
+    contacts = {agent_id: (set(), set()) for agent_id in df['Agent ID'].dropna().unique().tolist()}
+    pairs = [(col, df[['Agent ID', col]].dropna().drop_duplicates()) for col in PHONE_COLUMNS + ['EMail']]
+    for col, values in pairs:
+        kind = 1 if col == 'EMail' else 0
+        for agent_id, value in zip(values['Agent ID'].tolist(), values[col].tolist()):
+            if value != '':
+                contacts[agent_id][kind].add(value)
+    return contacts
+
+
+def naive_diff(old_path, new_path):
+    """The same counts from two fully loaded masters, merging the rows of each Agent ID into sets."""
+    counts = dict.fromkeys(['added', 'removed', 'changed', 'phones_added', 'phones_removed',
+                            'emails_added', 'emails_removed', 'emails_changed'], 0)
+    old, new = read_contact_sets(old_path), read_contact_sets(new_path)
+    counts['removed'] = len(old.keys() - new.keys())
+    counts['added'] = len(new.keys() - old.keys())
+    for agent_id in old.keys() & new.keys():
+        (old_phones, old_emails), (new_phones, new_emails) = old[agent_id], new[agent_id]
+        if old_phones == new_phones and old_emails == new_emails:
+            continue
+        counts['changed'] += 1
+        counts['phones_added'] += len(new_phones - old_phones)
+        counts['phones_removed'] += len(old_phones - new_phones)
+        if old_emails != new_emails:
+            if len(old_emails) == 1 and len(new_emails) == 1:
+                counts['emails_changed'] += 1
+            else:
+                counts['emails_added'] += len(new_emails - old_emails)
+                counts['emails_removed'] += len(old_emails - new_emails)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="Master rows: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--share", type=float, default=0.02, help="Share of agents dropped, added and changed")
+    parser.add_argument("--skip-naive", action="store_true", help="Only time diff_masters")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where datasets are generated")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_dir, parse_size(args.size))
+    with tempfile.TemporaryDirectory() as work_dir:
+        new_path = os.path.join(work_dir, 'new_master.csv')
+        write_new_snapshot(paths['master'], new_path, args.share, np.random.default_rng(0))
+
+        diff, seconds = timed(diff_masters, paths['master'], new_path)
+        diff.log_summary()
+        print(f"diff_masters: {seconds:.2f}s, {len(diff.changes)} changes")
+        if args.skip_naive:
+            return
+        expected, naive_seconds = timed(naive_diff, paths['master'], new_path)
+
+    print(f"naive merge:  {naive_seconds:.2f}s")
+    mismatched = {name: (getattr(diff, name), count) for name, count in expected.items() if getattr(diff, name) != count}
+    if mismatched:
+        raise SystemExit(f"Counts differ from the naive diff (diff_masters, naive): {mismatched}")
+    print("Counts match the naive diff")
+
+
+if __name__ == "__main__":
+    main()
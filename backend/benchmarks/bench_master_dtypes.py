@@ -0,0 +1,79 @@
+"""
+Measure how much memory a worker needs to keep the master resident with
+the compact master schema, compared with the previous all-object load.
+
+Each variant loads and melts the master in its own fresh process and
+reports the DataFrames' own size (memory_usage(deep=True)) and, on Linux,
+how much the process's resident memory grew.
+
+Run from the backend folder:
+    python -m benchmarks.bench_master_dtypes --size 1m
+"""
+import os
+import gc
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.datagen import generate_dataset, parse_size
+from utils.processing import load_and_preprocess_csv, load_and_preprocess_master, melt_master_dataframe
+
+LOADERS = {
+    'object (previous)': load_and_preprocess_csv,
+    'typed schema': load_and_preprocess_master,
+}
+
+
+def resident_mb():
+    """Current resident set size in MB, or None where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def measure(loader_name, master_path):
+    gc.collect()
+    rss_before = resident_mb()
+    start = time.perf_counter()
+    master_df = LOADERS[loader_name](master_path)
+    melted_df = melt_master_dataframe(master_df)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    rss_after = resident_mb()
+    return {
+        'seconds': seconds,
+        'master_mb': master_df.memory_usage(deep=True).sum() / 1024 ** 2,
+        'melted_mb': melted_df.memory_usage(deep=True).sum() / 1024 ** 2,
+        'rss_mb': rss_after - rss_before if rss_before is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="Master rows: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where datasets are generated")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_dir, parse_size(args.size))
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in LOADERS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[name] = executor.submit(measure, name, paths['master']).result()
+
+    print(f"{'':<18} {'load+melt':>10} {'master':>10} {'melted':>10} {'resident':>10}")
+    for name, r in results.items():
+        rss = f"{r['rss_mb']:8.1f}MB" if r['rss_mb'] is not None else f"{'-':>10}"
+        print(f"{name:<18} {r['seconds']:9.2f}s {r['master_mb']:8.1f}MB {r['melted_mb']:8.1f}MB {rss}")
+
+    before, after = results['object (previous)'], results['typed schema']
+    print(f"Master frame: {before['master_mb'] / after['master_mb']:.1f}x smaller")
+    if before['rss_mb'] and after['rss_mb']:
+        print(f"Resident memory per worker: {before['rss_mb'] / after['rss_mb']:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
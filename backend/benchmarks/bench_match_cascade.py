@@ -0,0 +1,82 @@
+"""
+Benchmark the email -> phone -> name match cascade, probing prebuilt master
+indexes, against the same cascade done with a full pd.merge per tier.
+
+The generated input is reduced to one key per row, an email, a phone or a
+name, so every tier has rows to match. The merges also match phones and
+emails shared by several agents, which the indexes leave to the next
+tier, so their unmatched counts can differ by those rows.
+
+Run from the backend folder:
+    python -m benchmarks.bench_match_cascade --size 1m
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datagen import generate_dataset, parse_size
+from benchmarks.harness import timed
+from utils.crossmatch import MATCH_TIERS, cascade_crossmatch_frames, preprocess_input
+from utils.master_utils.master_cache import MasterSnapshot
+from utils.phone_utils import normalize_phone_columns
+
+
+def single_key_input(input_df, rng):
+    """Keeps only the email, only the phone or only the name of each input row."""
+    kind = rng.integers(0, 3, size=len(input_df))
+    return pd.DataFrame({
+        "First Name": np.where(kind == 2, input_df["First Name"], "unknown"),
+        "Last Name": np.where(kind == 2, input_df["Last Name"], [f"person{i}" for i in range(len(input_df))]),
+        "EMail": np.where(kind == 0, input_df["EMail"], None),
+        "Phone": np.where(kind == 1, input_df["Phone"], None),
+    })
+
+
+def merge_cascade(input_df, melted_df):
+    """The same cascade as a full merge against the melted master per tier."""
+    remaining = input_df.reset_index(drop=True)
+    frames = []
+    for column in [["EMail"], ["Phone"], ["First Name", "Last Name"]]:
+        probe = remaining.dropna(subset=column).reset_index()
+        merged = pd.merge(probe, melted_df, on=column, how="inner", suffixes=("", "_data"))
+        frames.append(merged)
+        remaining = remaining.drop(index=merged["index"].unique())
+    return pd.concat(frames, ignore_index=True), remaining
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="Master and input rows: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of input files matched per master load")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where datasets are generated")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_dir, parse_size(args.size))
+    input_df = preprocess_input(single_key_input(pd.read_csv(paths['input']), np.random.default_rng(0)))
+
+    snapshot, load_seconds = timed(MasterSnapshot.from_csv, paths['master'])
+    index_start = time.perf_counter()
+    for kind in ("email", "phone"):
+        snapshot.contact_lookup(kind)
+    index_seconds = time.perf_counter() - index_start
+
+    (cascade_df, cascade_unmatched), cascade_seconds = timed(cascade_crossmatch_frames, input_df, snapshot, MATCH_TIERS)
+
+    melted_df = normalize_phone_columns(snapshot.melted_df.copy(), ["Phone"])
+    (merge_df, merge_unmatched), merge_seconds = timed(merge_cascade, input_df, melted_df)
+
+    print(f"Master rows: {len(snapshot.master_df)}, input rows: {len(input_df)}")
+    print(f"Master load: {load_seconds:.3f}s, email/phone indexes: {index_seconds:.3f}s (once per master)")
+    print(f"Matched rows by tier: {cascade_df['Match Tier'].value_counts().to_dict()}")
+    print(f"Unmatched: cascade {len(cascade_unmatched)}, merges {len(merge_unmatched)}")
+    print(f"Indexed cascade: {cascade_seconds:.3f}s per input")
+    print(f"Merge cascade:   {merge_seconds:.3f}s per input")
+    print(f"Over {args.repeat} inputs: {index_seconds + cascade_seconds * args.repeat:.3f}s "
+          f"vs {merge_seconds * args.repeat:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
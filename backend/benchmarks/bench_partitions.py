@@ -0,0 +1,111 @@
+"""
+Compare a flat master with the same rows kept as region partitions: the
+time to rebuild and reload everything versus one region, and to crossmatch
+an input against every region versus only the region it is pruned to.
+
+The generated master is split into LA, OC and SB aggregates (a third each,
+with zips typical of the region, and a few agents without an Agent ID),
+and the partitions are built from those. Agents without an ID can't be
+coalesced, so every one of them must reach its partition.
+The flat master is the concatenation of the partitions, so matching
+against all partitions must give the same rows as matching against it.
+
+Run from the backend folder:
+    python -m benchmarks.bench_partitions --size 1m
+"""
+import os
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datagen import generate_dataset, parse_size
+from benchmarks.harness import timed
+from utils.crossmatch import crossmatch_frames, preprocess_input
+from utils.master_utils.master_cache import MasterSnapshot
+from utils.master_utils.partitions import REGIONS, PartitionCatalog, build_partition, build_partitions
+
+# Alt. Zip ranges given to each region's agents
+REGION_ZIPS = {'LA': (90001, 91899), 'OC': (92601, 92899), 'SB': (92301, 92599)}
+NO_ID_SHARE = 0.005  # share of aggregate rows written without an Agent ID
+
+
+def write_aggregates(master_path, aggregated_dir, rng):
+    """
+    Splits the master into one aggregate per region, a third of the rows each.
+
+    Returns:
+    int: Rows written without an Agent ID, across all regions.
+    """
+    master = pd.read_csv(master_path, dtype=str)
+    without_id = 0
+    for region, rows in zip(REGIONS, np.array_split(np.arange(len(master)), len(REGIONS))):
+        df = master.iloc[rows].copy()
+        has_zip = df['Alt. Zip'].notna()
+        df.loc[has_zip, 'Alt. Zip'] = rng.integers(*REGION_ZIPS[region], has_zip.sum()).astype(str)
+        no_id = rng.random(len(df)) < NO_ID_SHARE
+        df.loc[no_id, 'Agent ID'] = None
+        without_id += int(no_id.sum())
+        df.to_csv(os.path.join(aggregated_dir, f'{region}.csv'), index=False)
+    return without_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="Master rows: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--region", default="OC", help="Region the input's agents are drawn from")
+    parser.add_argument("--input-rows", type=int, default=50000, help="Input rows to crossmatch")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where datasets are generated")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_dir, parse_size(args.size))
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as work_dir:
+        aggregated_dir = os.path.join(work_dir, 'Aggregated')
+        partition_dir = os.path.join(work_dir, 'partitions')
+        os.makedirs(aggregated_dir)
+        without_id = write_aggregates(paths['master'], aggregated_dir, rng)
+
+        _, build_all = timed(build_partitions, aggregated_dir, partition_dir)
+        _, build_one = timed(build_partition, args.region, os.path.join(aggregated_dir, f'{args.region}.csv'),
+                             partition_dir)
+        catalog = PartitionCatalog(partition_dir)
+        flat_path = os.path.join(work_dir, 'flat.csv')
+        pd.concat([pd.read_csv(catalog.partition_path(region), dtype=str) for region in catalog.regions]).to_csv(
+            flat_path, index=False)
+
+        partitioned_without_id = sum(int(pd.read_csv(catalog.partition_path(region), usecols=['Agent ID'])
+                                         ['Agent ID'].isna().sum()) for region in catalog.regions)
+
+        flat, load_flat = timed(MasterSnapshot.from_csv, flat_path)
+        partitions, load_all = timed(lambda: {region: MasterSnapshot.from_csv(catalog.partition_path(region))
+                                              for region in catalog.regions})
+        _, load_one = timed(MasterSnapshot.from_csv, catalog.partition_path(args.region))
+
+        # Input agents come from one region, and the zip they were given is the hint
+        region_df = partitions[args.region].master_df
+        picked = region_df.sample(n=min(args.input_rows, len(region_df)), replace=False, random_state=0)
+        input_df = preprocess_input(pd.DataFrame({'First Name': picked['First Name'], 'Last Name': picked['Last Name'],
+                                                  'Phone': np.nan, 'EMail': picked['EMail']}))
+        zip_hint = str(rng.integers(*REGION_ZIPS[args.region]))
+        pruned = catalog.resolve_regions(zip_code=zip_hint)
+
+        (flat_rows, _), match_flat = timed(crossmatch_frames, input_df, flat)
+        (all_rows, _), match_all = timed(crossmatch_frames, input_df, list(partitions.values()))
+        (pruned_rows, _), match_pruned = timed(crossmatch_frames, input_df, [partitions[r] for r in pruned])
+
+    sizes = ', '.join(f"{region} {entry['rows']} rows" for region, entry in catalog.regions.items())
+    print(f"Regions: {sizes}")
+    print(f"{'rebuild':<10} all regions {build_all:7.2f}s   {args.region} only {build_one:7.2f}s")
+    print(f"{'reload':<10} flat {load_flat:7.2f}s   all partitions {load_all:7.2f}s   {args.region} only {load_one:7.2f}s")
+    print(f"{'crossmatch':<10} flat {match_flat:7.2f}s ({len(flat_rows)} rows)   "
+          f"all partitions {match_all:7.2f}s ({len(all_rows)} rows)   "
+          f"zip {zip_hint} -> {','.join(pruned)} {match_pruned:7.2f}s ({len(pruned_rows)} rows)")
+    print(f"Agents without an Agent ID: {without_id} in the aggregates, {partitioned_without_id} in the partitions")
+    if len(all_rows) != len(flat_rows):
+        raise SystemExit("Matching against all partitions should give the same rows as the flat master")
+
+
+if __name__ == "__main__":
+    main()
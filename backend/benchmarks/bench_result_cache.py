@@ -0,0 +1,66 @@
+"""
+Time re-uploads of the same file to /crossmatch and /clean_texting with and
+without the result cache.
+
+Each route gets the generated input once (a miss: the pipeline runs and its
+output is stored) and then --repeat more times (hits: the stored output is
+sent back). Hits must return exactly the bytes of the miss. The cache lives
+in a temporary folder, so earlier runs don't turn the first upload into a hit.
+
+Run from the backend folder:
+    python -m benchmarks.bench_result_cache --size 1m
+"""
+import io
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.datagen import generate_dataset, parse_size
+from utils.result_cache import ResultCache
+
+
+def post(client, route, content):
+    start = time.perf_counter()
+    response = client.post(route, data={'input_file': (io.BytesIO(content), 'input.csv')},
+                           content_type='multipart/form-data')
+    body = response.get_data()
+    if response.status_code != 200:
+        raise SystemExit(f"{route} answered {response.status_code}: {body[:200]}")
+    return body, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="Master rows: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--repeat", type=int, default=5, help="Re-uploads timed per route")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where datasets are generated")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_dir, parse_size(args.size))
+    import app
+
+    app.master_cache.set_path(paths['master'])
+    client = app.app.test_client()
+    uploads = {'/crossmatch': paths['input'], '/clean_texting': paths['master']}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        app.result_cache = ResultCache(cache_dir, app.RESULT_CACHE_MAX_BYTES)
+        for route, path in uploads.items():
+            with open(path, 'rb') as f:
+                content = f.read()
+            first, miss = post(client, route, content)
+            hits = []
+            for _ in range(args.repeat):
+                body, seconds = post(client, route, content)
+                if body != first:
+                    raise SystemExit(f"{route}: a cached result differs from the processed one")
+                hits.append(seconds)
+            print(f"{route:<15} {len(content) / 1e6:7.1f} MB upload, {len(first) / 1e6:7.1f} MB result   "
+                  f"miss {miss:7.2f}s   hit median {np.median(hits):7.3f}s ({miss / np.median(hits):.0f}x)")
+        print(f"Cache: {len(app.result_cache)} entries, {app.result_cache.size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
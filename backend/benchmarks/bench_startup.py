@@ -0,0 +1,132 @@
+"""
+Measure cold start-up: how long a fresh interpreter takes to import each
+backend module and to print --help for each command-line tool, and check
+that importing a module does no I/O of its own.
+
+Every measurement starts a new Python process (the fastest of --repeat
+runs is kept). Imports are also run from an empty folder with an audit
+hook that records every file opened or listed outside Python's own
+module loading, so a module that reads data, writes files or walks a
+folder at import time is reported. Exits with status 1 if a tool's
+--help is slower than --budget-ms or an import has side effects.
+
+Run from the backend folder:
+    python -m benchmarks.bench_startup
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Command-line tools whose --help should come back without loading pandas
+ENTRY_POINTS = ['xlsx_to_csv.py', 'batch_crossmatch.py', 'diff_masters.py']
+DEFAULT_BUDGET_MS = 200
+
+# Run in the child: import a module and report the files touched while doing so
+_IMPORT_PROBE = r'''
+import os, sys, json, importlib
+touched = []
+code_suffixes = ('.py', '.pyc', '.so', '.pyd', '.pth')
+# Reads only count inside the backend or the working folder; libraries may read their own data files
+watched = (os.getcwd(), sys.argv[2])
+def hook(event, args):
+    if event not in ('open', 'os.listdir', 'os.scandir', 'os.remove', 'os.rename', 'os.mkdir'):
+        return
+    path = args[0]
+    if path is None or isinstance(path, int):
+        return
+    path = os.path.abspath(os.fsdecode(path))
+    if path.endswith(code_suffixes) or '__pycache__' in path:
+        return
+    # The import system lists package folders while resolving modules
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_filename.startswith('<frozen importlib'):
+            return
+        frame = frame.f_back
+    writing = event == 'open' and (any(c in (args[1] or 'r') for c in 'wax+') or args[2] & (os.O_WRONLY | os.O_RDWR))
+    if event in ('open', 'os.listdir', 'os.scandir') and not writing and not path.startswith(watched):
+        return
+    touched.append(f"{event} {path}")
+sys.addaudithook(hook)
+importlib.import_module(sys.argv[1])
+print(json.dumps(touched))
+'''
+
+
+def backend_modules():
+    """Dotted names of every module in the backend except the benchmarks and the web app."""
+    modules = []
+    for root, dirs, files in os.walk(BACKEND_DIR):
+        dirs[:] = sorted(d for d in dirs if d not in ('benchmarks', 'data', '__pycache__') and not d.startswith('.'))
+        for filename in sorted(files):
+            if filename.endswith('.py') and filename != 'app.py':
+                relative = os.path.relpath(os.path.join(root, filename[:-3]), BACKEND_DIR)
+                modules.append(relative.replace(os.sep, '.'))
+    return modules
+
+
+def best_time(command, repeat, cwd=BACKEND_DIR, env=None):
+    """Fastest wall time in ms of running command in a fresh process, and whether it succeeded."""
+    times, ok = [], True
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+        ok = ok and completed.returncode == 0
+    return min(times), ok
+
+
+def import_side_effects(module):
+    """Files the module opened, listed or changed while being imported from an empty folder."""
+    with tempfile.TemporaryDirectory() as empty_dir:
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+        completed = subprocess.run([sys.executable, '-c', _IMPORT_PROBE, module, BACKEND_DIR],
+                                   cwd=empty_dir, env=env, capture_output=True, text=True)
+        leftovers = os.listdir(empty_dir)
+    if completed.returncode != 0:
+        return [f"import failed: {completed.stderr.strip().splitlines()[-1:]}"]
+    touched = json.loads(completed.stdout.strip().splitlines()[-1])
+    return touched + [f"created {name}" for name in leftovers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per measurement (fastest is kept)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Allowed cold --help time")
+    args = parser.parse_args()
+
+    problems = []
+    baseline, _ = best_time([sys.executable, '-c', 'pass'], args.repeat)
+    print(f"{'python -c pass':<50} {baseline:7.0f} ms")
+
+    for entry_point in ENTRY_POINTS:
+        ms, ok = best_time([sys.executable, entry_point, '--help'], args.repeat)
+        flag = '' if ok and ms <= args.budget_ms else '  OVER BUDGET' if ok else '  FAILED'
+        print(f"{'python ' + entry_point + ' --help':<50} {ms:7.0f} ms{flag}")
+        if flag:
+            problems.append(f"{entry_point} --help took {ms:.0f} ms")
+
+    for module in backend_modules():
+        # From an empty folder, so a module that writes relative paths at import can't litter the backend
+        with tempfile.TemporaryDirectory() as empty_dir:
+            ms, ok = best_time([sys.executable, '-c', f'import {module}'], args.repeat, cwd=empty_dir,
+                               env=dict(os.environ, PYTHONPATH=BACKEND_DIR))
+        side_effects = import_side_effects(module)
+        flag = '  FAILED' if not ok else f"  SIDE EFFECTS: {side_effects}" if side_effects else ''
+        print(f"{'import ' + module:<50} {ms:7.0f} ms{flag}")
+        if flag:
+            problems.append(f"import {module}: {side_effects or 'failed'}")
+
+    if problems:
+        print(f"{len(problems)} problem(s)")
+        sys.exit(1)
+    print(f"All tools start within {args.budget_ms:.0f} ms and every module imports without side effects")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Generate synthetic BrokerMetrics masters and Reverse Prospect inputs for
+benchmarking.
+
+Masters have the 15 EXPECTED_COLUMNS with the quirks of the real exports:
+phones saved as floats (7143106401.0), some formatted as "(714) 310-6401",
+some too short, and NaNs throughout. Prospect files reuse agents from the
+master so crossmatching has something to find.
+
+Files are written in chunks, so even the 10M-row sizes never hold the
+whole dataset in memory. Run from the backend folder:
+    python -m benchmarks.datagen --sizes 10k,100k --data-dir benchmarks/.data
+"""
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from utils.master_utils.ingest import EXPECTED_COLUMNS
+from utils.input_utils.reversed_prospect_input import process_dataframe
+from utils.processing import lowercase_strings
+from utils.phone_utils import normalize_phone_values
+
+SIZES = {'10k': 10000, '100k': 100000, '1m': 1000000, '10m': 10000000}
+CHUNK_ROWS = 500000
+# BrokerMetrics exports come one file per county/pull; combine_csv_files reads a folder of them
+FOLDER_FILES = 8
+
+SYLLABLES = np.array(["an", "ber", "cal", "da", "el", "fin", "gor", "ha", "is", "jo", "ka", "lo", "mar",
+                      "ne", "or", "pe", "qui", "ro", "sa", "ti", "ur", "ve", "wil", "yan", "zo"])
+FIRST_NAMES = np.array([a.capitalize() + b for a in SYLLABLES for b in SYLLABLES])
+LAST_NAMES = np.array([a.capitalize() + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES[::3]])
+OFFICE_WORDS = np.array(["Realty", "Properties", "Real Estate", "Homes", "Group", "Partners", "Associates"])
+CITIES = np.array(["Anaheim", "Irvine", "Santa Ana", "Costa Mesa", "Los Angeles", "Pasadena", "Long Beach",
+                   "Torrance", "Glendale", "Santa Barbara", "Goleta", "Carpinteria", "Newport Beach", "Tustin"])
+PHONE_TYPES = np.array(["Cell", "Office", "Home", "Fax", "Direct"], dtype=object)
+
+
+def parse_size(size):
+    """Turns '10k', '1m' or a plain number into a row count."""
+    size = str(size).lower()
+    return SIZES[size] if size in SIZES else int(size)
+
+
+def _with_nans(values, rng, rate):
+    values = np.asarray(values, dtype=object)
+    values[rng.random(len(values)) < rate] = np.nan
+    return values
+
+
+def mangle_phones(numbers, rng, nan_rate=0.3):
+    """
+    Renders 10-digit phone numbers the way they show up in the exports:
+    mostly as floats, some formatted, a few truncated, the rest missing.
+    """
+    phones = numbers.astype(float).astype(object)
+    draw = rng.random(len(numbers))
+    formatted = (draw >= nan_rate) & (draw < nan_rate + 0.15)
+    truncated = (draw >= nan_rate + 0.15) & (draw < nan_rate + 0.18)
+
+    digits = pd.Series(numbers[formatted]).astype(str)
+    phones[formatted] = ("(" + digits.str[:3] + ") " + digits.str[3:6] + "-" + digits.str[6:]).to_numpy()
+    phones[truncated] = (numbers[truncated] % 10**7).astype(str)
+    phones[draw < nan_rate] = np.nan
+    return phones
+
+
+def make_master_chunk(start, rows, rng):
+    """Builds rows [start, start + rows) of a BrokerMetrics-shaped master."""
+    agent_ids = np.arange(start, start + rows) + 100000
+    first = FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), rows)]
+    last = LAST_NAMES[rng.integers(0, len(LAST_NAMES), rows)]
+    office_ids = rng.integers(0, max(rows // 20, 1), rows) + start
+    office_names = (pd.Series(LAST_NAMES[office_ids % len(LAST_NAMES)]) + " "
+                    + OFFICE_WORDS[office_ids % len(OFFICE_WORDS)]).to_numpy(dtype=object)
+
+    emails = (pd.Series(first).str.lower() + "." + pd.Series(last).str.lower()
+              + pd.Series(agent_ids).astype(str) + "@example.com").to_numpy(dtype=object)
+    cities = CITIES[rng.integers(0, len(CITIES), rows)]
+    addresses = (pd.Series(rng.integers(1, 9999, rows)).astype(str) + " "
+                 + pd.Series(LAST_NAMES[rng.integers(0, len(LAST_NAMES), rows)]) + " St").to_numpy(dtype=object)
+
+    df = pd.DataFrame({
+        'Agent ID': agent_ids,
+        'First Name': first,
+        'Last Name': last,
+        'Office ID': office_ids,
+        'Office Name': _with_nans(office_names, rng, 0.02),
+    })
+    for i, nan_rate in zip((1, 2, 3), (0.1, 0.4, 0.7)):
+        numbers = rng.integers(2000000000, 9999999999, rows)
+        df[f'Phone {i}'] = mangle_phones(numbers, rng, nan_rate)
+        df[f'Phone {i} Type'] = np.where(pd.isna(df[f'Phone {i}']), np.nan,
+                                         PHONE_TYPES[rng.integers(0, len(PHONE_TYPES), rows)])
+    df['EMail'] = _with_nans(emails, rng, 0.1)
+    df['Alt. Address'] = _with_nans(addresses, rng, 0.8)
+    df['Alt. City'] = _with_nans(cities, rng, 0.5)
+    # Zips come through as floats because of the NaNs
+    df['Alt. Zip'] = np.where(rng.random(rows) < 0.5, np.nan, rng.integers(90001, 93599, rows).astype(float))
+    return df[EXPECTED_COLUMNS]
+
+
+def make_prospect_chunk(master_chunk, rng, match_rate=0.8):
+    """
+    Builds a Reverse Prospect export from a master chunk: full names in
+    'Agent', and email, office and phone run together in 'Messdata'.
+    """
+    rows = len(master_chunk)
+    picked = master_chunk.iloc[rng.integers(0, rows, rows)].reset_index(drop=True)
+    unknown = rng.random(rows) >= match_rate
+    first = picked['First Name'].to_numpy(dtype=object)
+    last = picked['Last Name'].to_numpy(dtype=object)
+    last[unknown] = LAST_NAMES[rng.integers(0, len(LAST_NAMES), unknown.sum())] + "son"
+
+    phones = pd.to_numeric(picked['Phone 1'], errors='coerce')
+    phone_text = phones.astype('Int64').astype(str).str.replace('<NA>', '')
+    phone_text = ("(" + phone_text.str[:3] + ") " + phone_text.str[3:6] + "-" + phone_text.str[6:]).where(phones.notna(), "")
+    messdata = (picked['EMail'].fillna("") + " " + picked['Office Name'].fillna("") + " " + phone_text).str.strip()
+
+    return pd.DataFrame({
+        'Agent': pd.Series(first) + " " + pd.Series(last),
+        'Messdata': messdata.where(rng.random(rows) > 0.05, np.nan),
+    })
+
+
+def prospect_to_input(prospect_df):
+    """The cleaned crossmatch input (First Name, Last Name, EMail, Phone) for a prospect chunk."""
+    df = process_dataframe(prospect_df.copy())
+    df['Phone'] = normalize_phone_values(df['Phone']).astype(float).to_numpy()
+    return lowercase_strings(df[['First Name', 'Last Name', 'EMail', 'Phone']])
+
+
+def dataset_paths(data_dir, rows):
+    """Returns the file paths of the generated dataset for a row count."""
+    folder = os.path.join(data_dir, str(rows))
+    return {
+        'master': os.path.join(folder, 'master.csv'),
+        'brokermetrics_folder': os.path.join(folder, 'brokermetrics'),
+        'prospect': os.path.join(folder, 'reverse_prospect.csv'),
+        'input': os.path.join(folder, 'input.csv'),
+        'complete_marker': os.path.join(folder, '.complete'),
+    }
+
+
+def generate_dataset(data_dir, rows, seed=0, force=False):
+    """
+    Writes the master, a folder of per-county BrokerMetrics files holding
+    the same rows, the raw Reverse Prospect export and the cleaned input,
+    all with the given number of rows. Fully written datasets are reused.
+
+    Returns:
+    dict: The dataset's file paths (see dataset_paths).
+    """
+    paths = dataset_paths(data_dir, rows)
+    if not force and os.path.exists(paths['complete_marker']):
+        return paths
+
+    os.makedirs(paths['brokermetrics_folder'], exist_ok=True)
+    rng = np.random.default_rng(seed)
+    file_rows = -(-rows // FOLDER_FILES)
+    for start in range(0, rows, CHUNK_ROWS):
+        chunk_rows = min(CHUNK_ROWS, rows - start)
+        first = start == 0
+        master_chunk = make_master_chunk(start, chunk_rows, rng)
+        prospect_chunk = make_prospect_chunk(master_chunk, rng)
+
+        master_chunk.to_csv(paths['master'], mode='w' if first else 'a', header=first, index=False)
+        prospect_chunk.to_csv(paths['prospect'], mode='w' if first else 'a', header=first, index=False)
+        prospect_to_input(prospect_chunk).to_csv(paths['input'], mode='w' if first else 'a', header=first, index=False)
+
+        positions = np.arange(start, start + chunk_rows) // file_rows
+        for file_number in np.unique(positions):
+            part = master_chunk[positions == file_number]
+            part_path = os.path.join(paths['brokermetrics_folder'], f'county_{file_number:02d}.csv')
+            new_file = file_number * file_rows >= start
+            part.to_csv(part_path, mode='w' if new_file else 'a', header=new_file, index=False)
+        print(f"Generated {start + chunk_rows}/{rows} rows")
+
+    # Only a dataset that was written to the end is reused by later runs
+    open(paths['complete_marker'], 'w').close()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k", help="Comma-separated sizes: 10k, 100k, 1m, 10m or row counts")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"), help="Where to write the datasets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true", help="Regenerate datasets that already exist")
+    args = parser.parse_args()
+
+    for size in args.sizes.split(","):
+        paths = generate_dataset(args.data_dir, parse_size(size), args.seed, args.force)
+        print(f"{size}: {paths['master']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Time the pipeline stages on synthetic data and track their peak memory.
+
+Each (benchmark, size) case runs in a fresh process so one case's garbage
+doesn't skew the next. Wall time is the fastest of --repeat runs; peak
+memory is the highest traced allocation during one extra run. Results are
+written as JSON, and two result files can be compared to flag regressions.
+
+Run from the backend folder:
+    python -m benchmarks.harness run --sizes 10k,100k --output before.json
+    python -m benchmarks.harness run --sizes 10k,100k --output after.json
+    python -m benchmarks.harness compare before.json after.json
+"""
+import io
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import multiprocessing
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datagen import generate_dataset, parse_size
+from utils.processing import load_and_preprocess_data, load_and_preprocess_csv, melt_master_dataframe, find_missing_rows
+from utils.clean_for_texting import clean_csv_for_texting
+from utils.input_utils.reversed_prospect_input import process_csv
+from utils.master_utils.combine_lists import combine_csv_files
+from utils.master_utils.ingest import EXPECTED_COLUMNS
+
+NAME_COLUMNS = ['First Name', 'Last Name']
+# A case only counts as a regression if it is both this much slower/bigger and above the noise floor
+DEFAULT_THRESHOLD = 0.10
+MIN_SECONDS_DELTA = 0.01
+MIN_MB_DELTA = 1.0
+
+
+def _load_args(paths, work_dir):
+    return paths['input'], paths['master']
+
+
+def _melt_args(paths, work_dir):
+    return load_and_preprocess_csv(paths['master']),
+
+
+def _missing_rows_args(paths, work_dir):
+    return load_and_preprocess_csv(paths['master']), load_and_preprocess_csv(paths['input']), NAME_COLUMNS
+
+
+def _texting_args(paths, work_dir):
+    return paths['master'],
+
+
+def _prospect_args(paths, work_dir):
+    return paths['prospect'],
+
+
+def _combine_args(paths, work_dir):
+    return paths['brokermetrics_folder'], os.path.join(work_dir, 'combined.csv'), EXPECTED_COLUMNS
+
+
+# Benchmark name -> (builds the call's arguments outside the timed region, function under test)
+BENCHMARKS = {
+    'load_and_preprocess_data': (_load_args, load_and_preprocess_data),
+    'melt_master_dataframe': (_melt_args, melt_master_dataframe),
+    'find_missing_rows': (_missing_rows_args, find_missing_rows),
+    'clean_csv_for_texting': (_texting_args, clean_csv_for_texting),
+    'process_csv': (_prospect_args, process_csv),
+    'combine_csv_files': (_combine_args, combine_csv_files),
+}
+
+
+def timed(func, *args, **kwargs):
+    """
+    Calls func once, for the standalone benchmarks that compare two
+    implementations side by side.
+
+    Returns:
+    tuple: (func's result, wall time in seconds).
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_case(name, rows, paths, repeat=3, trace_memory=True):
+    """
+    Runs one benchmark on one dataset (call it in a fresh process).
+
+    Returns:
+    dict: The benchmark name, row count, best and all wall times, and peak traced memory in MB.
+    """
+    build_args, func = BENCHMARKS[name]
+    with tempfile.TemporaryDirectory() as work_dir:
+        args = build_args(paths, work_dir)
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            # Some stages print their whole result; keep that out of the timing and the output
+            with redirect_stdout(io.StringIO()):
+                func(*args)
+            times.append(time.perf_counter() - start)
+
+        peak_mb = None
+        if trace_memory:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                with redirect_stdout(io.StringIO()):
+                    func(*args)
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+            finally:
+                tracemalloc.stop()
+
+    return {
+        'benchmark': name,
+        'rows': rows,
+        'seconds': min(times),
+        'all_seconds': times,
+        'peak_mb': peak_mb,
+    }
+
+
+def environment_info():
+    """Describes the machine and library versions a result file was produced with."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(sizes, names, data_dir, repeat=3, trace_memory=True):
+    """
+    Generates (or reuses) a dataset per size and runs every named benchmark
+    on it, each case in its own process.
+
+    Returns:
+    dict: {'environment': ..., 'results': [run_case results]}.
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for rows in sizes:
+        paths = generate_dataset(data_dir, rows)
+        for name in names:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_case, name, rows, paths, repeat, trace_memory).result()
+            peak = f"{result['peak_mb']:.1f} MB" if result['peak_mb'] is not None else "-"
+            print(f"{name:<26} {rows:>10} rows  {result['seconds']:9.3f}s  peak {peak}")
+            results.append(result)
+    return {'environment': environment_info(), 'results': results}
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares two result sets case by case.
+
+    Returns:
+    list: One dict per case present in both, with the relative change in
+    time and memory and whether either is a regression beyond threshold.
+    """
+    baseline_cases = {(r['benchmark'], r['rows']): r for r in baseline['results']}
+    comparisons = []
+    for result in current['results']:
+        before = baseline_cases.get((result['benchmark'], result['rows']))
+        if before is None:
+            continue
+        time_change = result['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+        slower = time_change > threshold and result['seconds'] - before['seconds'] > MIN_SECONDS_DELTA
+
+        memory_change, bigger = None, False
+        if result['peak_mb'] is not None and before['peak_mb']:
+            memory_change = result['peak_mb'] / before['peak_mb'] - 1
+            bigger = memory_change > threshold and result['peak_mb'] - before['peak_mb'] > MIN_MB_DELTA
+
+        comparisons.append({
+            'benchmark': result['benchmark'],
+            'rows': result['rows'],
+            'seconds_before': before['seconds'],
+            'seconds_after': result['seconds'],
+            'time_change': time_change,
+            'peak_mb_before': before['peak_mb'],
+            'peak_mb_after': result['peak_mb'],
+            'memory_change': memory_change,
+            'regression': slower or bigger,
+        })
+    return comparisons
+
+
+def print_comparison(comparisons):
+    for c in comparisons:
+        memory = f"{c['memory_change']:+7.1%}" if c['memory_change'] is not None else "      -"
+        flag = "  REGRESSION" if c['regression'] else ""
+        print(f"{c['benchmark']:<26} {c['rows']:>10} rows  "
+              f"{c['seconds_before']:8.3f}s -> {c['seconds_after']:8.3f}s ({c['time_change']:+7.1%})  "
+              f"memory {memory}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks and write a result file')
+    run_parser.add_argument('--sizes', default='10k,100k', help='Comma-separated sizes: 10k, 100k, 1m, 10m or row counts')
+    run_parser.add_argument('--only', default=','.join(BENCHMARKS), help='Comma-separated benchmarks to run')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (the fastest is kept)')
+    run_parser.add_argument('--no-memory', action='store_true', help='Skip the traced run used to measure peak memory')
+    run_parser.add_argument('--data-dir', default=os.path.join('benchmarks', '.data'), help='Where datasets are generated')
+    run_parser.add_argument('--output', default='benchmark_results.json', help='Result file to write')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two result files and flag regressions')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='Relative slowdown or memory growth counted as a regression')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        names = args.only.split(',')
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            parser.error(f"unknown benchmarks: {unknown}; choose from {list(BENCHMARKS)}")
+        sizes = [parse_size(size) for size in args.sizes.split(',')]
+        results = run_benchmarks(sizes, names, args.data_dir, args.repeat, not args.no_memory)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    comparisons = compare_results(baseline, current, args.threshold)
+    print_comparison(comparisons)
+    regressions = [c for c in comparisons if c['regression']]
+    print(f"{len(regressions)} regression(s) in {len(comparisons)} compared cases")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import pandas as pd
 from csv_utilities import CSVUtilities
+from utils.processing import coalesce_duplicates, hash_key_columns
+from utils.fuzzy import FuzzyNameIndex, resolve_fuzzy_names
+
+NAME_COLS = ["first_name", "last_name"]
 
 class CSVProcessor:
 
@@ -32,8 +36,17 @@ class CSVProcessor:
         return df
 
     @staticmethod
-    def cross_match(input_df, reference_df, matching_cols):
-        """Cross match the columns of each row of each df and return the list of matched columns from the reference dataframe."""
+    def cross_match(input_df, reference_df, matching_cols, fuzzy_threshold=None):
+        """
+        Cross match the columns of each row of each df and return the list of matched columns from the reference dataframe.
+        Each matched agent (told apart by agent_id) comes out once per distinct phone, with their partial rows merged.
+
+        With fuzzy_threshold (0-1) set and both name columns among matching_cols,
+        input names missing from the reference are matched to the closest
+        reference name first. Matched rows then also carry the names as
+        submitted ('submitted_first_name', 'submitted_last_name') and a
+        'match_score' (1.0 for exact matches).
+        """
         
         try:
             # Validate the needed columns for matching
@@ -56,16 +69,21 @@ class CSVProcessor:
                 print("indf: ", input_df.columns)
                 print("input df: ", input_df[matching_cols])
                 input_df = input_df[matching_cols]
-                
-                
+                if fuzzy_threshold is not None and set(NAME_COLS) <= set(matching_cols):
+                    input_df = CSVProcessor.resolve_fuzzy_names(input_df, reference_df, fuzzy_threshold)
+
                 all_matches = pd.merge(reference_df, input_df, on=matching_cols, how="inner").drop_duplicates()
 
                 # Drop unnecessary or redundant columns
                 all_matches = all_matches.loc[:, ~all_matches.columns.duplicated()]
 
-                # Resolve duplicates by keeping the row with the most non-null columns
-                all_matches['non_null_count'] = all_matches.notnull().sum(axis=1)
-                all_matches = all_matches.sort_values('non_null_count', ascending=False).drop_duplicates(subset=['first_name', 'last_name'], keep='first').drop(columns='non_null_count')
+                # An agent's empty phone slots add nothing once another of their rows has a phone
+                has_phone = all_matches['phone'].notna()
+                all_matches = all_matches[has_phone | ~all_matches['agent_id'].isin(all_matches.loc[has_phone, 'agent_id'])]
+
+                # Merge each agent's partial rows, keeping every non-null column; agents are told
+                # apart by id, since two agents can share a name
+                all_matches = coalesce_duplicates(all_matches, ['agent_id'])
                 
                 # Capitalize values in specified columns
                 all_matches = CSVProcessor.capitalize_values(all_matches)
@@ -77,14 +95,30 @@ class CSVProcessor:
 
         return pd.DataFrame()
 
-
-input_file = r"backend\agentdata\reverse_prospect_data\vicky_reverse.csv"
-reference_file = r"backend\agentdata\aggregate_data\master_data.csv"
-input_df = CSVUtilities.load_csv(input_file)
-ref_df = CSVUtilities.load_csv(reference_file)
-# valid_data_cols = ["first_name", "last_name", "email", "office_name", "phone"]
-
-matched_df = CSVProcessor.cross_match(input_df, ref_df, ["first_name", "last_name"])
-matched_df.to_csv(r"backend\agentdata\matched_data\matched_data1.csv", index=False)
-
-
+    @staticmethod
+    def resolve_fuzzy_names(input_df, reference_df, fuzzy_threshold):
+        """
+        Replaces the names of input rows missing from reference_df with the
+        closest reference name, keeping the original names in
+        'submitted_first_name'/'submitted_last_name' and the similarity in
+        'match_score'. Rows with no reference name above the threshold are dropped.
+        """
+        unmatched = ~pd.Index(hash_key_columns(input_df, NAME_COLS)).isin(hash_key_columns(reference_df, NAME_COLS))
+        index = FuzzyNameIndex(reference_df, first_col="first_name", last_col="last_name")
+        resolved = resolve_fuzzy_names(input_df, index, unmatched, fuzzy_threshold, "first_name", "last_name")
+        resolved = resolved[~unmatched | resolved["Matched First Name"].notna().to_numpy()]
+        return resolved.rename(columns={
+            "first_name": "submitted_first_name", "last_name": "submitted_last_name",
+            "Matched First Name": "first_name", "Matched Last Name": "last_name", "Match Score": "match_score",
+        })
+
+
+if __name__ == "__main__":
+    input_file = r"backend\agentdata\reverse_prospect_data\vicky_reverse.csv"
+    reference_file = r"backend\agentdata\aggregate_data\master_data.csv"
+    input_df = CSVUtilities.load_csv(input_file)
+    ref_df = CSVUtilities.load_csv(reference_file)
+    # valid_data_cols = ["first_name", "last_name", "email", "office_name", "phone"]
+
+    matched_df = CSVProcessor.cross_match(input_df, ref_df, ["first_name", "last_name"])
+    matched_df.to_csv(r"backend\agentdata\matched_data\matched_data1.csv", index=False)
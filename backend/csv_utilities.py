@@ -1,4 +1,6 @@
 import pandas as pd
+from utils.phone_utils import normalize_phone_columns
+from utils.processing import coalesce_duplicates
 
 class CSVUtilities:
     
@@ -75,7 +77,8 @@ class CSVUtilities:
     @staticmethod
     def convert_phone_numbers(df, phone_columns):
         """
-        Converts phone numbers to pure digits in specified columns.
+        Converts phone numbers to pure 10-digit strings in specified columns.
+        Values that aren't valid 10-digit numbers become None.
 
         Parameters:
         df (pd.DataFrame): The DataFrame to process.
@@ -84,10 +87,7 @@ class CSVUtilities:
         Returns:
         pd.DataFrame: DataFrame with phone numbers converted to pure digits.
         """
-        for column in phone_columns:
-            if column in df.columns:
-                df[column] = df[column].astype(str).str.replace(r'\D', '', regex=True)
-        return df
+        return normalize_phone_columns(df, phone_columns)
 
     @staticmethod
     def find_duplicates(file_path, columns):
@@ -109,7 +109,7 @@ class CSVUtilities:
     @staticmethod
     def remove_duplicates_keep_filled(file_path, output_file_path=None):
         """
-        Removes duplicates from the CSV file, keeping the row with more filled columns.
+        Removes duplicates from the CSV file, merging rows with the same name and email so every filled column is kept.
 
         Parameters:
         file_path (str): The path to the input CSV file.
@@ -117,9 +117,7 @@ class CSVUtilities:
         """
         df = CSVUtilities.load_csv(file_path)
         if df is not None and not df.empty:
-            df['non_nan_count'] = df.notna().sum(axis=1)
-            df = df.sort_values(by='non_nan_count', ascending=False).drop_duplicates(subset=['first_name', 'last_name', 'email'], keep='first')
-            df = df.drop(columns=['non_nan_count'])
+            df = coalesce_duplicates(df, ['first_name', 'last_name', 'email'])
             CSVUtilities.save_csv(df, output_file_path or file_path)
         else:
             print("The DataFrame is empty or could not be loaded.")
@@ -0,0 +1,51 @@
+"""
+Compare two dated master snapshots by Agent ID.
+
+Prints how many agents were added, removed or changed and how many phones
+and emails were added, removed or changed, and with --output writes one
+row per change. Each file is read once, and agents whose phones and email
+are unchanged are skipped by comparing 64-bit fingerprints.
+
+Run from the backend folder:
+    python diff_masters.py data/brokermetrics_data/Master/10232024.csv data/brokermetrics_data/Master/11132024.csv
+    python diff_masters.py old.csv new.csv --output master_changes.csv
+"""
+import os
+import time
+import logging
+import argparse
+
+from utils.file_utils import atomic_output
+
+DEFAULT_CHUNKSIZE = 200000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old", help="The earlier master CSV")
+    parser.add_argument("new", help="The later master CSV")
+    parser.add_argument("--output", help="Write every change (one row each) to this CSV")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows of the new master read at a time")
+    args = parser.parse_args()
+
+    for path in (args.old, args.new):
+        if not os.path.isfile(path):
+            parser.error(f"file does not exist: {path}")
+
+    # pandas is only loaded once there is work to do, so --help stays instant
+    from utils.master_utils.master_diff import diff_masters
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    start = time.perf_counter()
+    diff = diff_masters(args.old, args.new, chunksize=args.chunksize)
+    diff.log_summary()
+    if args.output:
+        changes = diff.changes
+        with atomic_output(args.output) as tmp_path:
+            changes.to_csv(tmp_path, index=False)
+        print(f"{len(changes)} changes written to {args.output}")
+    print(f"Compared in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from utils.master_utils.partitions import PartitionCatalog, build_partition
+
+
+def test_build_partition_keeps_agents_without_agent_id(tmp_path):
+    aggregate = pd.DataFrame({
+        'Agent ID': ['1', '1', None, None],
+        'First Name': ['Ann', 'Ann', 'Bob', 'Cal'],
+        'Last Name': ['Lee', 'Lee', 'Ray', 'Roe'],
+        'Office ID': ['10', '10', '10', '11'],
+        'Office Name': ['Main Realty', 'Main Realty', 'Main Realty', 'Side Realty'],
+        'Phone 1': ['7145550001', None, '7145550002', '7145550003'],
+        'EMail': [None, 'ann@example.com', None, None],
+        'Alt. Zip': ['92602', '92602', '92603', '92604'],
+    })
+    aggregate_path = tmp_path / 'OC.csv'
+    aggregate.to_csv(aggregate_path, index=False)
+
+    assert build_partition('OC', str(aggregate_path), str(tmp_path / 'partitions')) == 3
+    partition = pd.read_csv(PartitionCatalog(str(tmp_path / 'partitions')).partition_path('OC'), dtype=str)
+    assert partition['First Name'].tolist() == ['Ann', 'Bob', 'Cal']
+    assert partition.loc[0, 'EMail'] == 'ann@example.com'
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from utils.processing import coalesce_duplicates
+
+
+def test_coalesce_duplicates_fills_rows_that_agree():
+    df = pd.DataFrame({'Agent ID': ['1', '1', '2'],
+                       'Phone': ['7145550001', None, '7145550003'],
+                       'EMail': [None, 'a@example.com', None]})
+    result = coalesce_duplicates(df, ['Agent ID'])
+    assert result.to_dict('list') == {'Agent ID': ['1', '2'],
+                                      'Phone': ['7145550001', '7145550003'],
+                                      'EMail': ['a@example.com', None]}
+
+
+def test_coalesce_duplicates_keeps_conflicting_rows():
+    df = pd.DataFrame({'Agent ID': ['1', '2', '1'],
+                       'Phone': ['7145550001', '7145550003', '7145550002']})
+    result = coalesce_duplicates(df, ['Agent ID'])
+    assert result.to_dict('list') == df.to_dict('list')
+
+
+def test_coalesce_duplicates_keeps_keyless_rows():
+    df = pd.DataFrame({'First Name': ['ann', np.nan, np.nan, 'ann'],
+                       'Last Name': ['lee', np.nan, np.nan, 'lee'],
+                       'Phone': ['7145550001', '7145550002', '7145550003', None]})
+    result = coalesce_duplicates(df, ['First Name', 'Last Name'])
+    assert result['Phone'].tolist() == ['7145550001', '7145550002', '7145550003']
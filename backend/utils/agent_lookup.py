@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from utils.phone_utils import PHONE_COLUMNS
+
+# Joins first and last name into one hashed key; never appears in a name
+NAME_SEPARATOR = '\x1f'
+
+
+def normalize_text(value):
+    """Trims and lowercases a query value the way master text is stored; None and blanks become ''."""
+    return str(value).strip().lower() if value is not None else ''
+
+
+def hash_names(first_names, last_names):
+    """
+    Hashes (first name, last name) pairs into 64-bit keys. Both arguments
+    are arrays of already trimmed, lowercased text of the same length.
+    """
+    joined = np.asarray(first_names, dtype=object) + NAME_SEPARATOR + np.asarray(last_names, dtype=object)
+    # categorize=False: factorizing first only pays off when many values repeat, not for one query
+    return pd.util.hash_array(joined, categorize=False)
+
+
+def _json_value(value):
+    """A master cell as a JSON value: None for missing, int for ids and phones, text otherwise."""
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return str(value)
+
+
+class AgentIndex:
+    """
+    Resident lookup of master rows by agent name, for answering single
+    lookups without touching the DataFrame's index or re-hashing any column.
+
+    The trimmed, lowercased names of every row are hashed once into sorted
+    64-bit keys; a lookup hashes one name, binary-searches the keys and
+    reads the few matching rows straight out of the column arrays. Hash
+    collisions are ruled out by comparing the names of the rows found.
+
+    Attributes:
+    keys: Sorted name hashes, one per master row.
+    positions: The master row position of each key.
+    columns: The master's column arrays by column name.
+    """
+
+    def __init__(self, master_df):
+        first_names = master_df['First Name'].astype(object).fillna('').str.strip().to_numpy(dtype=object)
+        last_names = master_df['Last Name'].astype(object).fillna('').str.strip().to_numpy(dtype=object)
+        hashes = hash_names(first_names, last_names)
+        self.positions = np.argsort(hashes, kind='stable')
+        self.keys = hashes[self.positions]
+        # Scalar reads from the underlying arrays cost about a microsecond; df.iloc costs hundreds
+        self.columns = {col: master_df[col].array for col in master_df.columns}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _value(self, col, position):
+        column = self.columns.get(col)
+        return _json_value(column[position]) if column is not None else None
+
+    def _text(self, col, position):
+        value = self._value(col, position)
+        return normalize_text(value) if value is not None else ''
+
+    def row_positions(self, first_name, last_name):
+        """Master row positions of the agents with this exact (normalized) name, in master order."""
+        first_name, last_name = normalize_text(first_name), normalize_text(last_name)
+        key = hash_names([first_name], [last_name])[0]
+        start = self.keys.searchsorted(key, side='left')
+        end = self.keys.searchsorted(key, side='right')
+        return [int(position) for position in np.sort(self.positions[start:end])
+                if self._text('First Name', position) == first_name
+                and self._text('Last Name', position) == last_name]
+
+    def record(self, position):
+        """One master row as a dict with its phones (number and type) and email."""
+        phones = []
+        for col in PHONE_COLUMNS:
+            number = self._value(col, position)
+            if number is not None:
+                phones.append({'number': str(number), 'type': self._value(f'{col} Type', position)})
+        return {
+            'agent_id': self._value('Agent ID', position),
+            'first_name': self._value('First Name', position),
+            'last_name': self._value('Last Name', position),
+            'office_id': self._value('Office ID', position),
+            'office_name': self._value('Office Name', position),
+            'phones': phones,
+            'email': self._value('EMail', position),
+        }
+
+    def lookup(self, first_name, last_name, office=None, email=None):
+        """
+        Finds every master row for an agent name and gathers their contacts.
+
+        Args:
+        first_name: The agent's first name (case and surrounding spaces are ignored).
+        last_name: The agent's last name.
+        office: Optional filter; keeps rows whose Office ID equals it or whose
+        office name contains it.
+        email: Optional filter; keeps rows with exactly this email.
+
+        Returns:
+        dict: 'agents' (one record per matching row, see record), plus
+        'phones' and 'emails': every distinct phone number and email across
+        them, in master order. 'agents' is empty when nothing matches.
+        """
+        office, email = normalize_text(office), normalize_text(email)
+        agents = []
+        for position in self.row_positions(first_name, last_name):
+            if office and not (office == self._text('Office ID', position)
+                               or office in self._text('Office Name', position)):
+                continue
+            if email and email != self._text('EMail', position):
+                continue
+            agents.append(self.record(position))
+
+        phones = [phone['number'] for agent in agents for phone in agent['phones']]
+        emails = [agent['email'] for agent in agents if agent['email']]
+        return {
+            'agents': agents,
+            'phones': list(dict.fromkeys(phones)),
+            'emails': list(dict.fromkeys(emails)),
+        }
+
+
+def combine_lookups(results):
+    """
+    Merges AgentIndex.lookup results from several region partitions into
+    one, tagging every agent record with the region it was found in.
+
+    Args:
+    results: Region code -> lookup result, in the order to report them.
+
+    Returns:
+    dict: 'agents', 'phones' and 'emails' across all the regions, as for AgentIndex.lookup.
+    """
+    agents = [dict(agent, region=region) for region, result in results.items() for agent in result['agents']]
+    return {
+        'agents': agents,
+        'phones': list(dict.fromkeys(phone for result in results.values() for phone in result['phones'])),
+        'emails': list(dict.fromkeys(email for result in results.values() for email in result['emails'])),
+    }
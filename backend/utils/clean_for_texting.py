@@ -1,40 +1,34 @@
-import re
+import numpy as np
 import pandas as pd
+from utils.phone_utils import PHONE_COLUMNS, normalize_phone_values
 
-# Function to format phone number
-def format_phone_number(phone):
-    # Remove all non-numeric characters using regex
-    phone = re.sub(r'\D', '', str(phone))
-    return phone if len(phone) == 10 else None  # Return only if it's a valid 10-digit phone number
+OUTPUT_COLUMNS = ['first name', 'last name', 'office', 'phone', 'email']
 
-# Function to clean the CSV for texting purposes
+# Function to clean the CSV for texting purposes (file_path may also be a file-like object)
 def clean_csv_for_texting(file_path):
     df = pd.read_csv(file_path)
-    split_rows = []
-
-    # Split each row by phone numbers
-    for _, row in df.iterrows():
-        first_name = row["First Name"]
-        last_name = row["Last Name"]
-        office = row["Office Name"]
-        email = row["EMail"]
-        phones = [row.get("Phone 1"), row.get("Phone 2"), row.get("Phone 3")]
-
-        # Create a new row for each formatted phone number
-        for phone in phones:
-            if pd.notna(phone):
-                formatted_phone = format_phone_number(phone)
-                if formatted_phone:
-                    split_rows.append({
-                        'first name': first_name,
-                        'last name': last_name,
-                        'office': office,
-                        'phone': formatted_phone,
-                        'email': email
-                    })
-
-    # Create a new DataFrame with the split rows
-    new_df = pd.DataFrame(split_rows)
+    return clean_dataframe_for_texting(df)
+
+# Function to clean an already loaded DataFrame for texting purposes
+def clean_dataframe_for_texting(df):
+    phone_cols = [col for col in PHONE_COLUMNS if col in df.columns]
+    n_phones = len(phone_cols)
+
+    # Explode wide -> long, one row per (agent, phone) in row-major order so
+    # the first phone of the first agent wins when deduplicating
+    repeated = {
+        'first name': np.repeat(df["First Name"].to_numpy(), n_phones),
+        'last name': np.repeat(df["Last Name"].to_numpy(), n_phones),
+        'office': np.repeat(df["Office Name"].to_numpy(), n_phones),
+        'phone': df[phone_cols].to_numpy().ravel() if n_phones else np.array([], dtype=object),
+        'email': np.repeat(df["EMail"].to_numpy(), n_phones),
+    }
+    long_df = pd.DataFrame(repeated, columns=OUTPUT_COLUMNS)
+
+    # Keep only valid 10-digit phone numbers
+    long_df = long_df[long_df['phone'].notna()]
+    long_df['phone'] = normalize_phone_values(long_df['phone']).values
+    new_df = long_df[long_df['phone'].notna()].reset_index(drop=True)
 
     # Remove duplicate phone numbers
     new_df = new_df.drop_duplicates(subset='phone')
@@ -42,6 +36,5 @@ def clean_csv_for_texting(file_path):
     # Remove duplicate emails (keep email only for the first occurrence)
     duplicate_emails = new_df['email'].duplicated(keep=False)
     new_df.loc[duplicate_emails, 'email'] = ''
-    
-    return new_df
 
+    return new_df
@@ -0,0 +1,350 @@
+import logging
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from utils.processing import (lowercase_strings, hash_key_columns, lookup_key_positions,
+                              select_matching_rows)
+from utils.input_utils.input_processor import check_columns, clean_phone_numbers
+from utils.master_utils.master_cache import NAME_COLUMNS, CONTACT_COLUMNS, contact_keys
+from utils.fuzzy import MATCHED_NAME_COLUMNS, MultiFuzzyNameIndex, resolve_fuzzy_names
+from utils.metrics import timed_stage
+from utils.phone_utils import normalize_phone_values
+
+MISSING_COLUMNS = ['First Name', 'Last Name', 'Phone', 'EMail']
+# Cascade order: the most specific keys are tried first
+MATCH_TIERS = ['email', 'phone', 'name']
+
+
+class HashedKeySet:
+    """
+    A compact set of 64-bit key hashes used to deduplicate across chunks.
+
+    New keys are buffered in small sorted batches and folded into one sorted
+    array once the buffer grows past merge_threshold, so memory stays at
+    roughly 8 bytes per distinct key.
+    """
+
+    def __init__(self, merge_threshold=1000000):
+        self.merge_threshold = merge_threshold
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._pending = []
+        self._pending_size = 0
+
+    def __len__(self):
+        return len(self._sorted) + self._pending_size
+
+    @staticmethod
+    def _in_sorted(sorted_keys, keys):
+        positions = np.searchsorted(sorted_keys, keys)
+        positions[positions == len(sorted_keys)] = 0
+        return sorted_keys[positions] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+
+    def add_new(self, keys):
+        """Add keys and return a mask of the ones seen for the first time (first occurrence only)."""
+        seen = self._in_sorted(self._sorted, keys)
+        for batch in self._pending:
+            seen |= self._in_sorted(batch, keys)
+        first_seen = ~seen & ~pd.Index(keys).duplicated()
+
+        new_keys = np.unique(keys[first_seen])
+        if len(new_keys):
+            self._pending.append(new_keys)
+            self._pending_size += len(new_keys)
+            if self._pending_size >= self.merge_threshold:
+                self._sorted = np.unique(np.concatenate([self._sorted] + self._pending))
+                self._pending = []
+                self._pending_size = 0
+        return first_seen
+
+
+class CrossmatchStats:
+    """Running totals for a crossmatch, accumulated chunk by chunk."""
+
+    def __init__(self):
+        self.input_rows = 0
+        self.matched_agents = 0
+        self.unmatched_agents = 0
+        self.phone_numbers = 0
+        self.tier_matches = {}
+
+    @property
+    def match_rate(self):
+        return self.matched_agents / self.input_rows * 100 if self.input_rows else 0.0
+
+    def log_summary(self):
+        print(f'Total rows in input: {self.input_rows}')
+        print(f'Match Rate: {self.match_rate:.2f}%')
+        print(f'Total agents matched and found phone numbers: {self.matched_agents}')
+        print(f'Total agents unmatched: {self.unmatched_agents}')
+        print(f'Total Phone Numbers Found: {self.phone_numbers}')
+        for tier, count in self.tier_matches.items():
+            print(f'Input rows matched by {tier}: {count}')
+
+
+def preprocess_input(input_df):
+    """Lowercase and de-duplicate the input and clean its phone column the way /crossmatch expects."""
+    input_df = lowercase_strings(input_df).drop_duplicates()
+    if check_columns(input_df, ["First Name", "Last Name", "Phone"]):
+        clean_phone_numbers(input_df, ["Phone"])
+    else:
+        print("cols dont match")
+    return input_df
+
+
+def master_partitions(master):
+    """A MasterSnapshot, or a list of region partition snapshots, as a list of snapshots."""
+    return list(master) if isinstance(master, (list, tuple)) else [master]
+
+
+def _name_found(input_df, partitions):
+    """Boolean mask of the input rows whose name is in any of the partitions."""
+    keys = pd.Index(hash_key_columns(input_df, NAME_COLUMNS))
+    found = np.zeros(len(input_df), dtype=bool)
+    for partition in partitions:
+        found |= keys.isin(partition.name_keys)
+    return found
+
+
+def crossmatch_frames(input_df, master, fuzzy_threshold=None):
+    """
+    Match a preprocessed input DataFrame against a MasterSnapshot by name.
+
+    Only the melted master rows whose names occur in the input are pulled out
+    of the snapshot's lookup before merging, so the cost scales with the input.
+    With fuzzy_threshold set, names without an exact match are resolved to the
+    closest master name through the snapshot's blocking index first and
+    joined on that; the input's names are kept as submitted, with the
+    master's in 'Matched First Name'/'Matched Last Name' and a 'Match Score'
+    recording how each row matched.
+
+    Given a list of region partitions, each partition's lookup is probed and
+    the candidates are merged together, as if the partitions were one master;
+    a fuzzy name resolves to its best match across the partitions.
+
+    Args:
+    input_df: Lowercased, de-duplicated input with 'First Name'/'Last Name'.
+    master: A MasterSnapshot, or a list of region partition snapshots.
+    fuzzy_threshold: Optional minimum name similarity (0-1) for fuzzy matches.
+
+    Returns:
+    merged_df: Input rows joined to master phones, only rows with a phone.
+    unmatched_df: Input rows whose name isn't in the master.
+    """
+    partitions = master_partitions(master)
+    found = _name_found(input_df, partitions)
+    join_columns = NAME_COLUMNS
+
+    if fuzzy_threshold is not None:
+        fuzzy_index = (partitions[0].fuzzy_index if len(partitions) == 1
+                       else MultiFuzzyNameIndex([partition.fuzzy_index for partition in partitions]))
+        input_df = resolve_fuzzy_names(input_df, fuzzy_index, ~found, fuzzy_threshold)
+        join_columns = MATCHED_NAME_COLUMNS
+        matched_names = input_df[MATCHED_NAME_COLUMNS].set_axis(NAME_COLUMNS, axis=1)
+        found = _name_found(matched_names, partitions) & matched_names.notna().all(axis=1).to_numpy()
+    unmatched_df = input_df[~found]
+
+    # Only names found in the master pull candidates, so unmatched rows can't join master rows without a name
+    keys = hash_key_columns(input_df[join_columns].set_axis(NAME_COLUMNS, axis=1), NAME_COLUMNS)[found]
+    candidates = [select_matching_rows(partition.melted_df, partition.name_lookup, keys) for partition in partitions]
+    candidates = candidates[0] if len(candidates) == 1 else pd.concat(candidates, ignore_index=True)
+    candidates = candidates.rename(columns=dict(zip(NAME_COLUMNS, join_columns)))
+
+    merged_df = pd.merge(input_df, candidates, on=join_columns, how='left', suffixes=('', '_data'))
+    merged_df = fill_master_phones(merged_df)
+    return merged_df, unmatched_df
+
+
+def fill_master_phones(merged_df):
+    """
+    Fill the input's missing phones from the joined master phone ('Phone_data'),
+    written as 10-digit text like the cleaned input phones, and keep only
+    rows that end up with a phone.
+    """
+    master_phones = normalize_phone_values(merged_df['Phone_data']).set_axis(merged_df.index)
+    merged_df['Phone'] = merged_df['Phone'].fillna(master_phones)
+    merged_df = merged_df.drop(columns=['Phone_data'])
+    return merged_df[merged_df['Phone'].notna()]
+
+
+def match_contact_tier(input_df, master, kind):
+    """
+    Match input rows to the master by a single exact email or phone key,
+    probing the snapshot's prebuilt lookup for that key (each partition's,
+    for a list of region partitions).
+
+    Input columns are kept as they are and the master's columns are added
+    alongside, with '_data' appended to the ones the input already has.
+
+    Returns:
+    merged_df: One row per (input row, master phone row) pair sharing the key, in input order.
+    matched_mask: Boolean mask of the input rows that matched at least one master row.
+    """
+    column = CONTACT_COLUMNS[kind]
+    if column not in input_df.columns:
+        return input_df.iloc[:0], np.zeros(len(input_df), dtype=bool)
+
+    keys, present = contact_keys(input_df[column], kind)
+    rows = np.flatnonzero(present)
+    input_parts, master_parts = [], []
+    for partition in master_partitions(master):
+        key_positions, master_positions = lookup_key_positions(partition.contact_lookup(kind), keys[rows])
+        input_parts.append(rows[key_positions])
+        master_parts.append(partition.melted_df.iloc[master_positions])
+    input_positions = np.concatenate(input_parts)
+    right = master_parts[0] if len(master_parts) == 1 else pd.concat(master_parts, ignore_index=True)
+    if len(master_parts) > 1:
+        order = np.argsort(input_positions, kind='stable')
+        input_positions, right = input_positions[order], right.iloc[order]
+
+    matched_mask = np.zeros(len(input_df), dtype=bool)
+    matched_mask[input_positions] = True
+
+    left = input_df.iloc[input_positions].reset_index(drop=True)
+    right = right.reset_index(drop=True)
+    right = right.rename(columns={col: f'{col}_data' for col in right.columns if col in left.columns})
+    return pd.concat([left, right], axis=1), matched_mask
+
+
+def cascade_crossmatch_frames(input_df, master, tiers=MATCH_TIERS, fuzzy_threshold=None, stats=None):
+    """
+    Match a preprocessed input DataFrame against a MasterSnapshot tier by tier.
+
+    Each tier ('email', 'phone', then 'name') only sees the input rows that
+    no earlier tier resolved, and uses its own prebuilt index over the
+    master, so every tier is a probe rather than a full merge. The name
+    tier is crossmatch_frames, including its optional fuzzy matching.
+
+    Args:
+    input_df: Lowercased, de-duplicated input with 'First Name'/'Last Name'.
+    master: A MasterSnapshot, or a list of region partition snapshots.
+    tiers: The tiers to run, in order.
+    fuzzy_threshold: Optional minimum name similarity for the name tier.
+    stats: Optional CrossmatchStats whose per-tier match counts are updated.
+
+    Returns:
+    merged_df: Input rows joined to master phones, only rows with a phone,
+    with a 'Match Tier' column and the master's own names as
+    'First Name_data'/'Last Name_data' (for name matches, the fuzzy-matched
+    name when there is one).
+    unmatched_df: Input rows no tier could resolve.
+    """
+    remaining = input_df
+    merged_frames = []
+    for tier in tiers:
+        if remaining.empty:
+            break
+        if tier == 'name':
+            merged_df, unmatched_df = crossmatch_frames(remaining, master, fuzzy_threshold)
+            merged_df = merged_df.copy()
+            matched_count = len(remaining) - len(unmatched_df)
+            remaining = unmatched_df
+            for col, matched_col in zip(NAME_COLUMNS, MATCHED_NAME_COLUMNS):
+                merged_df[f'{col}_data'] = merged_df[matched_col if matched_col in merged_df.columns else col]
+        else:
+            merged_df, matched_mask = match_contact_tier(remaining, master, tier)
+            merged_df = fill_master_phones(merged_df)
+            matched_count = int(matched_mask.sum())
+            remaining = remaining[~matched_mask]
+        merged_df['Match Tier'] = tier
+        merged_frames.append(merged_df)
+        if stats is not None:
+            stats.tier_matches[tier] = stats.tier_matches.get(tier, 0) + matched_count
+
+    merged_df = pd.concat(merged_frames, ignore_index=True) if merged_frames else input_df.iloc[:0]
+    return merged_df, remaining
+
+
+def _append_csv(df, path, first):
+    if path is not None:
+        df.to_csv(path, mode='w' if first else 'a', header=first, index=False)
+
+
+def iter_crossmatch(input_csv_path, master, chunksize=50000, stats=None, fuzzy_threshold=None, match_tiers=None):
+    """
+    Crossmatch an input CSV of any size against a MasterSnapshot in chunks.
+
+    The input is read chunksize rows at a time and each chunk is probed
+    against the prebuilt master lookup. Duplicate input rows, duplicate
+    (name, phone) results and repeat agents are tracked across chunks with
+    hashed key sets, so the combined output matches the in-memory /crossmatch
+    while memory stays bounded by the chunk size plus 8 bytes per distinct key.
+
+    Args:
+    input_csv_path: Path (or file-like) of the input CSV.
+    master: A MasterSnapshot (or list of region partition snapshots) to match against.
+    chunksize: Number of input rows to process at a time.
+    stats: Optional CrossmatchStats to accumulate totals into.
+    fuzzy_threshold: Optional minimum name similarity for fuzzy matching (see crossmatch_frames).
+    match_tiers: Optional cascade tiers (see cascade_crossmatch_frames); by default only names are matched.
+
+    Yields:
+    tuple: (matched rows, unmatched agents without a phone, first matched row per agent) per chunk.
+    """
+    if stats is None:
+        stats = CrossmatchStats()
+    seen_input_rows = HashedKeySet()
+    seen_phones = HashedKeySet()
+    seen_agents = HashedKeySet()
+
+    chunks = iter(pd.read_csv(input_csv_path, chunksize=chunksize))
+    for i in itertools.count():
+        with timed_stage('parse'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with timed_stage('normalize'):
+            chunk = preprocess_input(chunk)
+        with timed_stage('dedup'):
+            chunk = chunk[seen_input_rows.add_new(hash_key_columns(chunk, list(chunk.columns)))]
+        stats.input_rows += len(chunk)
+
+        with timed_stage('join'):
+            if match_tiers:
+                merged_df, unmatched_df = cascade_crossmatch_frames(chunk, master, match_tiers, fuzzy_threshold, stats)
+            else:
+                merged_df, unmatched_df = crossmatch_frames(chunk, master, fuzzy_threshold)
+
+        with timed_stage('dedup'):
+            cleaned_df = merged_df[seen_phones.add_new(hash_key_columns(merged_df, NAME_COLUMNS + ['Phone']))]
+            unique_agents = merged_df[seen_agents.add_new(hash_key_columns(merged_df, NAME_COLUMNS))]
+        missing_agents = unmatched_df.loc[:, MISSING_COLUMNS]
+        missing_agents = missing_agents[missing_agents['Phone'].isnull()]
+
+        stats.matched_agents += len(unique_agents)
+        stats.unmatched_agents += len(unmatched_df)
+        stats.phone_numbers += len(cleaned_df)
+        logging.info(f"Crossmatched chunk {i + 1}: {stats.input_rows} input rows so far")
+
+        yield cleaned_df, missing_agents, unique_agents
+
+
+def stream_crossmatch(input_csv_path, master, output_file_path, chunksize=50000,
+                      unmatched_output_path=None, unique_agents_output_path=None, fuzzy_threshold=None,
+                      match_tiers=None):
+    """
+    Crossmatch an input CSV of any size chunk by chunk (see iter_crossmatch),
+    appending each chunk's results to the output files as it goes.
+
+    Args:
+    input_csv_path: Path (or file-like) of the input CSV.
+    master: A MasterSnapshot (or list of region partition snapshots) to match against.
+    output_file_path: Where to write the matched (name, phone) rows.
+    chunksize: Number of input rows to process at a time.
+    unmatched_output_path: Optional path for agents not found in the master.
+    unique_agents_output_path: Optional path for one matched row per agent.
+    fuzzy_threshold: Optional minimum name similarity for fuzzy matching (see crossmatch_frames).
+    match_tiers: Optional cascade tiers (see cascade_crossmatch_frames).
+
+    Returns:
+    CrossmatchStats: Totals accumulated across every chunk.
+    """
+    stats = CrossmatchStats()
+    chunks = iter_crossmatch(input_csv_path, master, chunksize, stats, fuzzy_threshold, match_tiers)
+    for i, (cleaned_df, missing_agents, unique_agents) in enumerate(chunks):
+        first = i == 0
+        _append_csv(cleaned_df, output_file_path, first)
+        _append_csv(missing_agents, unmatched_output_path, first)
+        _append_csv(unique_agents, unique_agents_output_path, first)
+    return stats
@@ -1,4 +1,7 @@
 import pandas as pd
+from utils.processing import find_missing_rows, load_and_preprocess_master
+from utils.crossmatch import stream_crossmatch
+from utils.master_utils.master_cache import MasterSnapshot
 
 def convert_csv_to_lowercase(input_file_path, output_file_path):
     """
@@ -25,24 +28,8 @@ def load_and_preprocess_data(input_csv_path, master_csv_path):
     master_df: Preprocessed master DataFrame.
     """
     input_df = pd.read_csv(input_csv_path).map(lambda x: x.lower() if isinstance(x, str) else x)
-    master_df = pd.read_csv(master_csv_path).map(lambda x: x.lower() if isinstance(x, str) else x)
-    return input_df.drop_duplicates(), master_df.drop_duplicates()
-
-def find_missing_rows(main_df, supplementary_df, key_columns):
-    """
-    Adds rows from supplementary_df to main_df if they are not already present
-    based on the key columns (e.g., 'First Name' and 'Last Name').
-    
-    Args:
-    main_df: The DataFrame to which non-matching rows will be added.
-    supplementary_df: The DataFrame from which non-matching rows will be sourced.
-    key_columns: List of column names to use as keys for comparison.
-    
-    Returns:
-    missing_rows_df: The DataFrame of missing rows that are not present in main_df.
-    """
-    missing_rows_df = supplementary_df[~supplementary_df[key_columns].apply(tuple, 1).isin(main_df[key_columns].apply(tuple, 1))]
-    return missing_rows_df.loc[:, ['First Name', 'Last Name', 'Phone', 'EMail']]
+    master_df = load_and_preprocess_master(master_csv_path)
+    return input_df.drop_duplicates(), master_df
 
 def melt_master_dataframe(master_df):
     """
@@ -74,10 +61,19 @@ def count_matching_names(main_df, supplementary_df, key_columns):
     merged_df = supplementary_df.merge(main_df, on=key_columns, how='inner')
     return merged_df.shape[0]
 
-def main():
+def main(chunksize=None):
     # Define file paths
     input_csv_path = r"CSV-Tools\backend\agentdata\reverse_prospect_data\reverse_prospect_agent_list.csv"  
     master_csv_path = r"CSV-Tools\backend\brokermetrics_data\Master\10212024.csv"
+    output_file_path = "cleaned_merged_output.csv"
+
+    # Stream very large inputs through a prebuilt master index instead of loading them whole
+    if chunksize:
+        master = MasterSnapshot.from_csv(master_csv_path)
+        stats = stream_crossmatch(input_csv_path, master, output_file_path, chunksize=chunksize,
+                                  unique_agents_output_path="unique_agents.csv")
+        stats.log_summary()
+        return
     
 
     # Load and preprocess data
@@ -110,7 +106,6 @@ def main():
     print(f'Total agents unmatched: {len(missing_agents)}')
     print(f'Total Phone Numbers Found: {len(merged_df)}')
 
-    output_file_path = "cleaned_merged_output.csv"  
     merged_df.to_csv(output_file_path, index=False)
 
 if __name__ == "__main__":
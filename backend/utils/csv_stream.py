@@ -0,0 +1,37 @@
+import pandas as pd
+
+from utils.metrics import timed_stage
+
+CSV_CHUNK_ROWS = 50000
+
+
+def iter_csv(frames, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Encodes a DataFrame, or an iterable of DataFrames produced one after
+    another, to CSV text a slice at a time.
+
+    The header is taken from the first frame and written once, so a
+    generator of result chunks can be sent to the client as it is produced
+    without ever writing a file.
+
+    Args:
+    frames: A DataFrame or an iterable of DataFrames with the same columns.
+    chunk_rows: Maximum number of rows encoded per yielded piece.
+
+    Yields:
+    str: Consecutive pieces of the CSV document.
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+
+    header = True
+    for df in frames:
+        if header and df.empty:
+            yield df.to_csv(index=False)
+            header = False
+            continue
+        for start in range(0, len(df), chunk_rows):
+            with timed_stage('write'):
+                piece = df.iloc[start:start + chunk_rows].to_csv(index=False, header=header)
+            yield piece
+            header = False
@@ -0,0 +1,171 @@
+import os
+import math
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from utils.processing import hash_key_columns
+from utils.file_utils import atomic_output
+
+DEFAULT_MEMORY_BUDGET_MB = 1024
+# Deduplicating a frame needs room for the frame itself plus its row hashes and the result
+WORKING_SET_FACTOR = 3
+SAMPLE_ROWS = 10000
+MIN_CHUNK_ROWS = 1000
+# Every bucket keeps a file handle open while rows are partitioned
+MAX_BUCKETS = 512
+ROW_NUMBER_COLUMN = '__row_number'
+
+
+def read_csv_text(path_or_buffer, **kwargs):
+    """
+    Reads a CSV keeping every field as the text written in the file (blank
+    fields stay ''), so rows compare and write back exactly as they are.
+    """
+    return pd.read_csv(path_or_buffer, dtype=str, keep_default_na=False, na_filter=False, **kwargs)
+
+
+def estimate_row_bytes(file_path, sample_rows=SAMPLE_ROWS):
+    """
+    Estimates a parsed row's size in memory and the number of rows in the
+    file, from its first rows.
+
+    Returns:
+    tuple: (bytes per parsed row, estimated row count); (0, 0) for a file without rows.
+    """
+    sample = read_csv_text(file_path, nrows=sample_rows)
+    if sample.empty:
+        return 0, 0
+    sample_file_bytes = len(sample.to_csv(index=False, header=False).encode())
+    row_bytes = sample.memory_usage(deep=True).sum() / len(sample)
+    return row_bytes, int(os.path.getsize(file_path) * len(sample) / sample_file_bytes)
+
+
+def plan_partitions(file_path, memory_budget_mb):
+    """
+    Works out how many buckets the file must be split into so each one can
+    be deduplicated within the memory budget, and how many rows to read at a time.
+
+    Returns:
+    tuple: (bucket count, chunk rows). One bucket means the file fits in memory.
+    """
+    row_bytes, estimated_rows = estimate_row_bytes(file_path)
+    if not estimated_rows:
+        return 1, MIN_CHUNK_ROWS
+    budget_rows = max(int(memory_budget_mb * 1024 ** 2 / (row_bytes * WORKING_SET_FACTOR)), MIN_CHUNK_ROWS)
+    buckets = min(math.ceil(estimated_rows / budget_rows), MAX_BUCKETS)
+    return buckets, budget_rows
+
+
+def _partition_rows(file_path, bucket_paths, subset, chunk_rows):
+    """
+    Pass 1: sends every row, tagged with its row number, to the bucket
+    chosen by the hash of its key, so all copies of a row land in the same bucket.
+
+    Returns:
+    tuple: (the file's columns, row count).
+    """
+    handles = [open(path, 'w', newline='', encoding='utf-8') for path in bucket_paths]
+    try:
+        columns, row_count = None, 0
+        for chunk in read_csv_text(file_path, chunksize=chunk_rows):
+            columns = list(chunk.columns)
+            bucket_ids = hash_key_columns(chunk, subset or columns) % len(bucket_paths)
+            chunk.insert(0, ROW_NUMBER_COLUMN, np.arange(row_count, row_count + len(chunk)))
+            for bucket_id, rows in chunk.groupby(bucket_ids, sort=False):
+                rows.to_csv(handles[bucket_id], header=False, index=False)
+            row_count += len(chunk)
+    finally:
+        for handle in handles:
+            handle.close()
+    return columns, row_count
+
+
+def _first_occurrences(bucket_paths, columns, row_count, subset):
+    """
+    Pass 2: deduplicates each bucket on its own and marks the row numbers
+    of the rows to keep (the first of each set of duplicates).
+    """
+    keep = np.zeros(row_count, dtype=bool)
+    dtypes = {col: str for col in columns}
+    dtypes[ROW_NUMBER_COLUMN] = np.int64
+    for path in bucket_paths:
+        if os.path.getsize(path) == 0:
+            continue
+        bucket = pd.read_csv(path, header=None, names=[ROW_NUMBER_COLUMN] + columns, dtype=dtypes,
+                             keep_default_na=False, na_filter=False)
+        # Rows were appended in file order, so within a bucket the first copy comes first
+        firsts = bucket[ROW_NUMBER_COLUMN].to_numpy()[~bucket.duplicated(subset=subset or columns).to_numpy()]
+        keep[firsts] = True
+        del bucket
+        os.remove(path)
+    return keep
+
+
+def external_drop_duplicates(file_path, output_path, subset=None, buckets=8, chunk_rows=100000, temp_dir=None):
+    """
+    Drops duplicate rows from a CSV without loading it whole: rows are
+    hash-partitioned into bucket files on disk, each bucket is deduplicated
+    independently, and a final pass copies the surviving rows in their
+    original order. Memory use is bounded by one chunk or one bucket.
+
+    Args:
+    file_path: The CSV to deduplicate.
+    output_path: Where to write the result (may be file_path).
+    subset: Columns that identify a duplicate; all columns when None.
+    buckets: Number of on-disk buckets.
+    chunk_rows: Rows read per chunk while streaming the file.
+    temp_dir: Folder for the bucket files; defaults to the output's folder.
+
+    Returns:
+    tuple: (rows before, rows after).
+    """
+    bucket_root = temp_dir or os.path.dirname(os.path.abspath(output_path))
+    with tempfile.TemporaryDirectory(dir=bucket_root, prefix='.dedup_buckets_') as bucket_dir:
+        bucket_paths = [os.path.join(bucket_dir, f'bucket_{i:04d}.csv') for i in range(buckets)]
+        columns, row_count = _partition_rows(file_path, bucket_paths, subset, chunk_rows)
+        if columns is None:
+            columns = list(read_csv_text(file_path, nrows=0).columns)
+        keep = _first_occurrences(bucket_paths, columns, row_count, subset)
+
+    with atomic_output(output_path) as tmp_path:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as out:
+            pd.DataFrame(columns=columns).to_csv(out, index=False)
+            start = 0
+            for chunk in read_csv_text(file_path, chunksize=chunk_rows):
+                chunk[keep[start:start + len(chunk)]].to_csv(out, header=False, index=False)
+                start += len(chunk)
+    return row_count, int(keep.sum())
+
+
+def dedup_csv_file(file_path, output_path=None, subset=None, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, temp_dir=None):
+    """
+    Drops duplicate rows from a CSV file, keeping the first of each, and
+    writes the result atomically. Files that fit in the memory budget are
+    deduplicated in memory; larger ones go through external_drop_duplicates.
+    Fields are compared as the text in the file, so values are written back unchanged.
+
+    Args:
+    file_path: The CSV to deduplicate.
+    output_path: Where to write the result; defaults to overwriting file_path.
+    subset: Columns that identify a duplicate; all columns when None.
+    memory_budget_mb: Roughly how much memory the deduplication may use.
+    temp_dir: Folder for the bucket files of the external mode.
+
+    Returns:
+    tuple: (rows before, rows after).
+    """
+    output_path = output_path or file_path
+    buckets, chunk_rows = plan_partitions(file_path, memory_budget_mb)
+    if buckets > 1:
+        logging.info(f"Deduplicating {file_path} out of core in {buckets} buckets "
+                     f"({chunk_rows} rows per chunk, budget {memory_budget_mb} MB)")
+        return external_drop_duplicates(file_path, output_path, subset, buckets, chunk_rows, temp_dir)
+
+    df = read_csv_text(file_path)
+    deduped = df.drop_duplicates(subset=subset)
+    with atomic_output(output_path) as tmp_path:
+        deduped.to_csv(tmp_path, index=False)
+    return len(df), len(deduped)
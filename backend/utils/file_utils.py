@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# The process umask can only be read by setting it, so read it once (and put it straight back)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_output(file_path):
+    """
+    Yields a temporary path in the same folder as file_path. When the block
+    finishes, the temp file is flushed to disk and renamed over file_path,
+    so readers (and a crash) only ever see the old or the complete new file.
+    If the block raises, the temp file is removed and file_path is untouched.
+
+    The new file gets file_path's permissions when it already exists, and
+    the usual ones for a new file otherwise (mkstemp alone makes it owner-only).
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        yield tmp_path
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
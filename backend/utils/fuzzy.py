@@ -0,0 +1,207 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FUZZY_THRESHOLD = 0.85
+# The master name each input row was matched to, next to the name as submitted
+MATCHED_NAME_COLUMNS = ['Matched First Name', 'Matched Last Name']
+
+_SOUNDEX_CODES = {letter: str(code)
+                  for code, letters in enumerate(["aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"])
+                  for letter in letters}
+_NON_NAME_CHARS = re.compile(r"[^a-z0-9\s-]")
+
+
+def soundex(word):
+    """Returns the 4-character American Soundex code of a lowercase word ('' for empty words)."""
+    if not word:
+        return ""
+    code = word[0]
+    previous = _SOUNDEX_CODES.get(word[0], "")
+    for letter in word[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != "0" and digit != previous:
+            code += digit
+        if letter not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def normalize_name(first_name, last_name):
+    """
+    Normalizes a name for fuzzy comparison.
+
+    Punctuation is dropped, middle names and initials are ignored, and
+    hyphenated or multi-part surnames are kept both whole and as parts.
+
+    Returns:
+    tuple: (first name, list of last-name variants), all lowercase.
+    """
+    first_tokens = _NON_NAME_CHARS.sub("", str(first_name).lower()).replace("-", " ").split()
+    last_tokens = _NON_NAME_CHARS.sub("", str(last_name).lower()).replace("-", " ").split()
+    first = first_tokens[0] if first_tokens else ""
+    variants = [" ".join(last_tokens)] if last_tokens else [""]
+    if len(last_tokens) > 1:
+        variants.extend(last_tokens)
+    return first, variants
+
+
+def blocking_keys(first, last_variants):
+    """
+    Returns the blocking keys of a normalized name: the Soundex of every
+    surname variant, the first-name Soundex with the surname's initial (for
+    typos that change the surname's code) and the first-name Soundex with
+    the surname's consonant code (for typos in the surname's initial).
+    """
+    keys = {"L:" + soundex(last.replace(" ", "")) for last in last_variants if last}
+    if first and last_variants[0]:
+        last = last_variants[0].replace(" ", "")
+        first_code = soundex(first)
+        keys.add("I:" + first_code + last[0])
+        keys.add("C:" + first_code + soundex(last)[1:])
+    return keys
+
+
+def name_similarity(first_a, lasts_a, first_b, lasts_b):
+    """Scores two normalized names between 0 and 1, using the best-matching surname variants."""
+    first_score = SequenceMatcher(None, first_a, first_b).ratio()
+    last_score = max(SequenceMatcher(None, a, b).ratio() for a in lasts_a for b in lasts_b)
+    return (first_score + last_score) / 2
+
+
+class FuzzyNameIndex:
+    """
+    A blocking index over the distinct names of a master DataFrame.
+
+    Each name is filed under a few phonetic blocking keys, so an input name
+    is only scored against the master names sharing one of its keys instead
+    of against the whole master.
+    """
+
+    def __init__(self, master_df, first_col='First Name', last_col='Last Name'):
+        names = master_df[[first_col, last_col]].dropna().drop_duplicates().reset_index(drop=True)
+        self.first_col = first_col
+        self.last_col = last_col
+        self.names = names
+        self._normalized = [normalize_name(first, last) for first, last in zip(names[first_col], names[last_col])]
+
+        blocks = defaultdict(list)
+        for position, (first, lasts) in enumerate(self._normalized):
+            for key in blocking_keys(first, lasts):
+                blocks[key].append(position)
+        self._blocks = {key: np.array(positions) for key, positions in blocks.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, first_name, last_name):
+        """Returns the positions (into self.names) of master names sharing a block with the given name."""
+        first, lasts = normalize_name(first_name, last_name)
+        found = [self._blocks[key] for key in blocking_keys(first, lasts) if key in self._blocks]
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=int)
+
+    def best_match(self, first_name, last_name, threshold=DEFAULT_FUZZY_THRESHOLD):
+        """
+        Finds the most similar master name among the candidates.
+
+        Returns:
+        tuple: (master position, score), or (None, best score) if nothing reaches threshold.
+        """
+        first, lasts = normalize_name(first_name, last_name)
+        best_position, best_score = None, 0.0
+        for position in self.candidates(first_name, last_name):
+            master_first, master_lasts = self._normalized[position]
+            score = name_similarity(first, lasts, master_first, master_lasts)
+            if score > best_score:
+                best_position, best_score = position, score
+        if best_score < threshold:
+            return None, best_score
+        return best_position, best_score
+
+    def match(self, input_df, threshold=DEFAULT_FUZZY_THRESHOLD, first_col=None, last_col=None):
+        """
+        Fuzzy-matches every row of input_df against the master names.
+
+        Returns:
+        pd.DataFrame: Indexed like input_df, with the matched master first and
+        last name (NaN where nothing passed threshold) and the 'Match Score'.
+        """
+        first_col = first_col or self.first_col
+        last_col = last_col or self.last_col
+        matched_first, matched_last, scores = [], [], []
+        for first_name, last_name in zip(input_df[first_col], input_df[last_col]):
+            position, score = self.best_match(first_name, last_name, threshold)
+            if position is None:
+                matched_first.append(np.nan)
+                matched_last.append(np.nan)
+            else:
+                matched_first.append(self.names.iat[position, 0])
+                matched_last.append(self.names.iat[position, 1])
+            scores.append(score)
+        return pd.DataFrame({first_col: matched_first, last_col: matched_last, 'Match Score': scores},
+                            index=input_df.index)
+
+    def candidate_pair_count(self, input_df, first_col=None, last_col=None):
+        """Counts the (input, master) pairs scored for input_df, for comparison with len(input_df) * len(self)."""
+        first_col = first_col or self.first_col
+        last_col = last_col or self.last_col
+        return sum(len(self.candidates(first, last)) for first, last in zip(input_df[first_col], input_df[last_col]))
+
+
+class MultiFuzzyNameIndex:
+    """
+    Fuzzy-matches against several FuzzyNameIndexes (one per master region
+    partition) as if they were one, keeping each name's best-scoring match.
+    """
+
+    def __init__(self, indexes):
+        self.indexes = list(indexes)
+
+    def __len__(self):
+        return sum(len(index) for index in self.indexes)
+
+    def match(self, input_df, threshold=DEFAULT_FUZZY_THRESHOLD, first_col=None, last_col=None):
+        """Same as FuzzyNameIndex.match, taking the highest score across the indexes (the first on ties)."""
+        best = self.indexes[0].match(input_df, threshold, first_col, last_col)
+        for index in self.indexes[1:]:
+            other = index.match(input_df, threshold, first_col, last_col)
+            better = other['Match Score'] > best['Match Score']
+            best.loc[better] = other.loc[better]
+        return best
+
+
+def resolve_fuzzy_names(input_df, index, unmatched_mask, threshold=DEFAULT_FUZZY_THRESHOLD,
+                        first_col='First Name', last_col='Last Name'):
+    """
+    Finds the closest master name for the unmatched input rows.
+
+    The input's names are left as submitted; 'Matched First Name' and
+    'Matched Last Name' hold the master name each row matched (its own name
+    for exact matches, empty when no master name reaches threshold) and
+    'Match Score' how close it was (1.0 for exact matches).
+
+    Args:
+    input_df: The input DataFrame.
+    index: A FuzzyNameIndex over the master.
+    unmatched_mask: Boolean mask of the rows that had no exact name match.
+    threshold: Minimum similarity (0-1) for a fuzzy match to be accepted.
+
+    Returns:
+    pd.DataFrame: A copy of input_df with the matched name and 'Match Score' columns.
+    """
+    unmatched_mask = np.asarray(unmatched_mask, dtype=bool)
+    resolved = input_df.copy()
+    resolved[MATCHED_NAME_COLUMNS[0]] = resolved[first_col].where(~unmatched_mask)
+    resolved[MATCHED_NAME_COLUMNS[1]] = resolved[last_col].where(~unmatched_mask)
+    resolved['Match Score'] = 1.0
+    unmatched = resolved[unmatched_mask]
+    if unmatched.empty:
+        return resolved
+
+    matches = index.match(unmatched, threshold, first_col, last_col)
+    resolved.loc[matches.index, 'Match Score'] = matches['Match Score']
+    resolved.loc[matches.index, MATCHED_NAME_COLUMNS] = matches[[first_col, last_col]].to_numpy()
+    return resolved
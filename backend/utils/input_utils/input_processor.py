@@ -2,9 +2,8 @@ import os
 import pandas as pd
 import logging
 import numpy as np
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from utils.phone_utils import normalize_phone_columns
+from utils.external_dedup import DEFAULT_MEMORY_BUDGET_MB, dedup_csv_file
 
 
 def load_csv(file_path):
@@ -31,17 +30,7 @@ def clean_column_names(df):
 
 def convert_phone_numbers(df, phone_columns):
     """Converts phone numbers to pure digits in specified columns and ensures they are 10 digits long."""
-    for column in phone_columns:
-        if column in df.columns:
-            # Convert to string and check for '.' at index -2
-            df[column] = df[column].astype(str).apply(
-                lambda x: x[:-1] if len(x) == 12 and x[-2] == '.' else x
-            )
-
-            # Clean phone numbers: remove non-digit characters and validate length
-            df[column] = df[column].str.replace(r'\D', '', regex=True)
-            df[column] = df[column].apply(lambda x: x if len(x) == 10 else None)  # Set to None if not 10 digits
-    return df
+    return normalize_phone_columns(df, phone_columns)
 
 
 def validate_and_clean_csv(df, validation_rules):
@@ -76,16 +65,24 @@ def clean_phone_numbers(df, phone_columns):
     return df
 
 
-def drop_duplicates_in_csv(file_path):
-    """Drops duplicate rows from a CSV file."""
-    df = load_csv(file_path)
-    if df is not None:
-        row_count_before = len(df)
-        logging.info(f'Row count before dropping duplicates: {row_count_before}')
-        df_cleaned = df.drop_duplicates()
-        row_count_after = len(df_cleaned)
-        logging.info(f'Row count after dropping duplicates: {row_count_after}')
-        save_csv(df_cleaned, file_path)
+def drop_duplicates_in_csv(file_path, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Drops duplicate rows from a CSV file, rewriting it atomically. Files too
+    large for memory_budget_mb are deduplicated out of core in on-disk buckets.
+    """
+    try:
+        row_count_before, row_count_after = dedup_csv_file(file_path, memory_budget_mb=memory_budget_mb)
+    except FileNotFoundError:
+        logging.error(f"Error: The file at {file_path} was not found.")
+        return
+    except pd.errors.EmptyDataError:
+        logging.error("Error: The file is empty.")
+        return
+    except Exception as e:
+        logging.error(f"An error occurred while dropping duplicates: {e}")
+        return
+    logging.info(f'Row count before dropping duplicates: {row_count_before}')
+    logging.info(f'Row count after dropping duplicates: {row_count_after}')
 
 
 def check_columns(df, cols):
@@ -1,53 +1,75 @@
 import pandas as pd
 import re
 
+OUTPUT_COLUMNS = ['EMail', 'Office Name', 'Phone', 'First Name', 'Last Name']
+
+EMAIL_PATTERN = r'\S+@\S+'
+PHONE_PATTERN = r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
+
+# One pass over each cell: two lookaheads find the first email and the first
+# phone independently, exactly like two separate re.search calls would
+MEMBER_INFO_PATTERN = re.compile(
+    rf'^(?=(?:.*?(?P<email>{EMAIL_PATTERN}))?)(?=(?:.*?(?P<phone>{PHONE_PATTERN}))?)',
+    re.DOTALL
+)
+
 def process_csv(file_path):
-    # Load the CSV file
+    # Load the CSV file (a path or a file-like object such as an upload stream)
     df = pd.read_csv(file_path)
+    df = process_dataframe(df)
+    print(df)
+    return df
+
+def process_csv_chunks(file_path, chunksize=100000):
+    # Parse and process the CSV one chunk at a time, yielding each result
+    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+        yield process_dataframe(chunk)
+
+def process_csv_to_file(file_path, output_file_path, chunksize=100000):
+    # Stream the processed chunks straight to the output file
+    row_count = 0
+    for i, chunk in enumerate(process_csv_chunks(file_path, chunksize)):
+        chunk.to_csv(output_file_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        row_count += len(chunk)
+    if row_count == 0:
+        pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(output_file_path, index=False)
+    return row_count
 
+def process_dataframe(df):
     # Check and process 'Member Email Office Name Member Direct Phone' column
     if 'Messdata' in df.columns:
-        if df['Messdata'].notna().any():  # Check if 'Messdata' has any non-NaN values
-            df['Messdata'] = df['Messdata'].astype(str)
-            df[['EMail', 'Office Name', 'Phone']] = df['Messdata'].apply(split_member_info)
-        else:  # If 'Messdata' is empty
-            df[['EMail', 'Office Name', 'Phone']] = ''
-        df.drop(columns=['Messdata'], inplace=True)
+        # Empty cells give an empty email, office and phone, whatever the rest of the chunk holds
+        df[['EMail', 'Office Name', 'Phone']] = split_member_info_column(df['Messdata'].fillna('').astype(str))
+        df = df.drop(columns=['Messdata'])
 
     # Check and process 'Agent' column
     if 'Agent' in df.columns:
-        df[['First Name', 'Last Name']] = df['Agent'].apply(split_name)
-        df.drop(columns=['Agent'], inplace=True)
-    
-    print(df)
-    
+        df[['First Name', 'Last Name']] = split_name_column(df['Agent'])
+        df = df.drop(columns=['Agent'])
+
     # Keep only the specified columns
-    columns_to_keep = ['EMail', 'Office Name', 'Phone', 'First Name', 'Last Name']
-    df = df[columns_to_keep]
+    return df[OUTPUT_COLUMNS]
 
-    return df
+def split_member_info_column(messdata):
+    # Extract the first email and phone of every row in a single regex pass
+    extracted = messdata.str.extract(MEMBER_INFO_PATTERN).fillna("")
+    emails = extracted['email']
+    phones = extracted['phone']
 
-def split_member_info(row):
-    # Regex to identify email and phone patterns
-    email_match = re.search(r'\S+@\S+', row)
-    phone_match = re.search(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', row)
-    
-    # Extract email and phone if they exist
-    email = email_match.group(0) if email_match else ""
-    phone = phone_match.group(0) if phone_match else ""
-    
     # The rest is assumed to be the office name
-    office_name = row.replace(email, "").replace(phone, "").strip()
-    
-    return pd.Series([email, office_name, phone])
-
-def split_name(full_name):
-    # Split the full name by spaces
-    name_parts = full_name.split()
-    
+    office_names = [
+        row.replace(email, "").replace(phone, "").strip()
+        for row, email, phone in zip(messdata, emails, phones)
+    ]
+
+    return pd.DataFrame({'EMail': emails, 'Office Name': office_names, 'Phone': phones}, index=messdata.index)
+
+def split_name_column(agents):
+    # Split every full name by whitespace at once
+    name_parts = agents.str.split()
+
     # Use the last part as the last name, and the rest as the first name
-    last_name = name_parts[-1] if len(name_parts) > 0 else ""
-    first_name = " ".join(name_parts[:-1]) if len(name_parts) > 1 else ""
-    
-    return pd.Series([first_name, last_name])
+    last_names = name_parts.str[-1].fillna("")
+    first_names = name_parts.str[:-1].str.join(" ").fillna("")
 
+    return pd.DataFrame({'First Name': first_names, 'Last Name': last_names}, index=agents.index)
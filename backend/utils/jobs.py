@@ -0,0 +1,166 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is already at capacity."""
+
+
+class Job:
+    """
+    A unit of background work with stage-level progress.
+
+    Attributes:
+    id: Unique job id handed back to the client.
+    kind: What the job does, e.g. 'crossmatch'.
+    stages: Ordered stage names the job reports through.
+    status: 'queued', 'running', 'finished' or 'failed'.
+    stage: The stage currently running (None until the job starts).
+    result_path: Output file, set once the job has finished.
+    download_name: File name the result should be downloaded as.
+    error: Error message if the job failed.
+    """
+
+    def __init__(self, kind, stages, download_name):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.stages = list(stages)
+        self.download_name = download_name
+        self.status = 'queued'
+        self.stage = None
+        self.result_path = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def set_stage(self, stage):
+        """Marks the job as having entered the given stage."""
+        self.stage = stage
+
+    @property
+    def progress(self):
+        """Fraction of stages completed, between 0 and 1."""
+        if self.status == 'finished':
+            return 1.0
+        if self.stage not in self.stages:
+            return 0.0
+        return self.stages.index(self.stage) / len(self.stages)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'stage': self.stage,
+            'stages': self.stages,
+            'progress': round(self.progress, 3),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Runs jobs on a bounded pool of local worker threads.
+
+    At most max_workers jobs run at once and at most max_pending jobs may be
+    queued or running; submitting beyond that raises JobQueueFull. Only the
+    most recent max_retained finished jobs are remembered, and their result
+    files are removed when they are forgotten. A folder that can't be removed
+    yet (on Windows, while its result is still being downloaded) is retried
+    the next time jobs are forgotten.
+    """
+
+    def __init__(self, work_folder, max_workers=2, max_pending=20, max_retained=100):
+        self.work_folder = work_folder
+        self.max_pending = max_pending
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._leftover_folders = set()  # folders of forgotten jobs still to be removed
+        self._lock = threading.Lock()
+        os.makedirs(work_folder, exist_ok=True)
+
+    def job_folder(self, job):
+        """Returns (and creates) the private folder a job reads and writes its files in."""
+        folder = os.path.join(self.work_folder, job.id)
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def create(self, kind, stages, download_name):
+        """Reserves a slot in the queue and registers a new job, before its input is saved."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs are already queued or running")
+            self._pending += 1
+            job = Job(kind, stages, download_name)
+            self._jobs[job.id] = job
+        return job
+
+    def submit(self, job, func, *args):
+        """
+        Starts a job created with create(). func is called as func(job, *args)
+        and must return the path of the result file.
+        """
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def discard(self, job, error):
+        """Fails a created job that could not be started, releasing its slot."""
+        job.error = error
+        job.status = 'failed'
+        job.finished_at = time.time()
+        with self._lock:
+            self._pending -= 1
+            self._forget_old_jobs()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, func, args):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result_path = func(job, *args)
+            job.status = 'finished'
+        except Exception as e:
+            logging.error(f"Job {job.id} ({job.kind}) failed during {job.stage}: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._pending -= 1
+                self._forget_old_jobs()
+
+    def _forget_old_jobs(self):
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        for job in finished[:max(0, len(finished) - self.max_retained)]:
+            del self._jobs[job.id]
+            self._leftover_folders.add(os.path.join(self.work_folder, job.id))
+        for folder in list(self._leftover_folders):
+            if self._remove_folder(folder):
+                self._leftover_folders.discard(folder)
+
+    @staticmethod
+    def _remove_folder(folder):
+        """Removes a job folder and its files; returns False if some file is still in use."""
+        try:
+            for filename in os.listdir(folder) if os.path.isdir(folder) else []:
+                os.remove(os.path.join(folder, filename))
+            if os.path.isdir(folder):
+                os.rmdir(folder)
+        except OSError as e:
+            logging.info(f"Could not remove job folder {folder} yet: {e}")
+            return False
+        return True
@@ -1,4 +1,5 @@
 import pandas as pd
+from utils.master_utils.schema import read_master_csv
 
 def update_master_csv():
     # File paths
@@ -27,8 +28,8 @@ def update_master_csv():
 
     # Load the new data and the master data
     try:
-        new_data = pd.read_csv(NEW_CSV_PATH)
-        master_data = pd.read_csv(MASTER_CSV_PATH)
+        new_data = read_master_csv(NEW_CSV_PATH)
+        master_data = read_master_csv(MASTER_CSV_PATH)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         return
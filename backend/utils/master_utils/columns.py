@@ -0,0 +1,6 @@
+# Column layout of BrokerMetrics exports and the master built from them.
+# Kept free of heavy imports so command-line tools can use it at startup.
+
+EXPECTED_COLUMNS = ['Agent ID', 'First Name', 'Last Name', 'Office ID', 'Office Name',
+                    'Phone 1', 'Phone 1 Type', 'Phone 2', 'Phone 2 Type', 'Phone 3',
+                    'Phone 3 Type', 'EMail', 'Alt. Address', 'Alt. City', 'Alt. Zip']
@@ -1,18 +1,9 @@
 import pandas as pd
 import os
-import re
-
-# Function to format phone numbers
-def format_phone_number(phone):
-    """
-    Cleans and validates a phone number by removing non-numeric characters.
-    Returns the phone number only if it is 10 digits long, otherwise None.
-    """
-    phone = re.sub(r'\D', '', str(phone))  # Remove non-numeric characters
-    return phone if len(phone) == 10 else None
+from utils.master_utils.ingest import list_csv_files, load_brokermetrics_files
 
 # Combine CSV files from a folder into a master file
-def combine_csv_files(folder_path, master_csv_path, expected_columns):
+def combine_csv_files(folder_path, master_csv_path, expected_columns, workers=1):
     """
     Combines all CSV files in a folder into a master CSV file.
 
@@ -20,32 +11,21 @@ def combine_csv_files(folder_path, master_csv_path, expected_columns):
     - folder_path: Path to the folder containing CSV files.
     - master_csv_path: Path to save the combined master CSV file.
     - expected_columns: List of columns to ensure consistency in the combined data.
+    - workers: Number of processes used to read and clean the files (1 = no pool).
     """
     dataframes = []
 
-    # Iterate through each CSV file in the folder
-    for filename in os.listdir(folder_path):
-        if filename.endswith(".csv"):
-            file_path = os.path.join(folder_path, filename)
-            print(f"Processing file: {filename}")
-
-            # Read each CSV file
-            try:
-                df = pd.read_csv(file_path)
-                # Ensure it has the expected columns in the correct order
-                df = df[expected_columns]
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                continue
-
-            # Format phone numbers for specified columns
-            phone_columns = ["Phone 1", "Phone 2", "Phone 3"]
-            for phone_col in phone_columns:
-                if phone_col in df.columns:
-                    df[phone_col] = df[phone_col].apply(format_phone_number)
+    # Read, validate and format phone numbers of each CSV file, in filename order
+    file_paths = list_csv_files(folder_path)
+    for file_path, df, error in load_brokermetrics_files(file_paths, expected_columns, workers=workers):
+        filename = os.path.basename(file_path)
+        print(f"Processing file: {filename}")
+        if df is None:
+            print(f"Error processing {filename}: {error}")
+            continue
 
-            # Append the cleaned DataFrame to the list
-            dataframes.append(df)
+        # Append the cleaned DataFrame to the list
+        dataframes.append(df)
 
     # Combine all DataFrames into a single DataFrame
     if dataframes:
@@ -24,15 +24,16 @@ def count_rows_with_phone_values(df, phone_columns):
 
     return count_with_values
 
-# Example usage
-# Load your CSV file into a DataFrame (replace with your file)
-df = pd.read_csv(r'CSV-Tools\backend\brokermetrics_data\Aggregated\SB.csv')
+if __name__ == "__main__":
+    # Example usage
+    # Load your CSV file into a DataFrame (replace with your file)
+    df = pd.read_csv(r'CSV-Tools\backend\brokermetrics_data\Aggregated\SB.csv')
 
 
-# Check the data types of all columns
-print(df.dtypes)
-# Input list of phone columns
-phone_columns = ["Phone 1", "Phone 2", "Phone 3"]
+    # Check the data types of all columns
+    print(df.dtypes)
+    # Input list of phone columns
+    phone_columns = ["Phone 1", "Phone 2", "Phone 3"]
 
-# Count the rows with any phone values and print stats
-row_count = count_rows_with_phone_values(df, phone_columns)
+    # Count the rows with any phone values and print stats
+    row_count = count_rows_with_phone_values(df, phone_columns)
@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from utils.master_utils.schema import master_read_dtypes, apply_master_schema
+from utils.master_utils.columns import EXPECTED_COLUMNS
+
+
+def list_csv_files(folder_path):
+    """Returns the CSV files in a folder in a stable (sorted) order."""
+    return [os.path.join(folder_path, filename)
+            for filename in sorted(os.listdir(folder_path))
+            if filename.endswith('.csv')]
+
+
+def load_brokermetrics_file(file_path, expected_columns=EXPECTED_COLUMNS):
+    """
+    Loads one BrokerMetrics export, reading only the expected columns,
+    validating them and converting them to the compact master schema
+    (which also normalizes the phone columns).
+
+    Returns:
+    tuple: (file_path, DataFrame or None, error message or None).
+    """
+    try:
+        wanted = set(expected_columns)
+        df = pd.read_csv(file_path, usecols=lambda col: col in wanted, dtype=master_read_dtypes())
+    except Exception as e:
+        return file_path, None, f"could not be loaded: {e}"
+
+    missing = [col for col in expected_columns if col not in df.columns]
+    if missing:
+        return file_path, None, f"is missing expected columns {missing}"
+
+    df = apply_master_schema(df[expected_columns].copy())
+    return file_path, df, None
+
+
+def load_brokermetrics_files(file_paths, expected_columns=EXPECTED_COLUMNS, workers=1):
+    """
+    Loads and normalizes many BrokerMetrics exports, optionally in a process pool.
+
+    Results are yielded in the order of file_paths no matter which worker
+    finishes first, so the combined output is deterministic.
+
+    Args:
+    file_paths: List of CSV paths to load.
+    expected_columns: Columns each file must contain; other columns are not read.
+    workers: Number of worker processes; 1 loads everything in this process.
+
+    Yields:
+    tuple: (file_path, DataFrame or None, error message or None) per file.
+    """
+    if workers <= 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            yield load_brokermetrics_file(file_path, expected_columns)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(load_brokermetrics_file, file_paths,
+                                [expected_columns] * len(file_paths))
@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+import logging
+
+import pandas as pd
+
+from utils.master_utils.ingest import EXPECTED_COLUMNS, list_csv_files, load_brokermetrics_files
+
+MANIFEST_FILENAME = 'manifest.json'
+# Bump when load_brokermetrics_file changes what it produces, to invalidate old caches
+CACHE_VERSION = 2
+
+
+def file_content_hash(file_path, block_size=1024 * 1024):
+    """Returns the SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    Records which source files have already been ingested into a cache folder.
+
+    Each entry holds the file's size, mtime and content hash plus the name of
+    the pickled, normalized DataFrame produced from it. Files whose size and
+    mtime are unchanged are trusted without rehashing; files that were only
+    touched are recognized by their content hash.
+    """
+
+    def __init__(self, cache_dir, expected_columns=EXPECTED_COLUMNS):
+        self.cache_dir = cache_dir
+        self.expected_columns = list(expected_columns)
+        self.path = os.path.join(cache_dir, MANIFEST_FILENAME)
+        self.entries = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    def _settings_key(self):
+        return hashlib.sha256(json.dumps([CACHE_VERSION, self.expected_columns]).encode()).hexdigest()[:16]
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+        if data.get('settings') == self._settings_key():
+            self.entries = data.get('files', {})
+
+    def save(self):
+        """Writes the manifest atomically (temp file plus rename)."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'settings': self._settings_key(), 'files': self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def cached_frame(self, file_path):
+        """Returns the cached DataFrame for an unchanged file, or None if it must be re-parsed."""
+        entry = self.entries.get(file_path)
+        if entry is None:
+            return None
+        cache_path = os.path.join(self.cache_dir, entry['cache_file'])
+        if not os.path.exists(cache_path):
+            return None
+
+        stat = os.stat(file_path)
+        if stat.st_size != entry['size']:
+            return None
+        if stat.st_mtime != entry['mtime']:
+            # Touched but possibly identical: compare contents before re-parsing
+            if file_content_hash(file_path) != entry['sha256']:
+                return None
+            entry['mtime'] = stat.st_mtime
+        return pd.read_pickle(cache_path)
+
+    def store(self, file_path, df):
+        """Caches the normalized DataFrame of a freshly parsed file."""
+        stat = os.stat(file_path)
+        sha256 = file_content_hash(file_path)
+        cache_file = f"{sha256}.pkl"
+        df.to_pickle(os.path.join(self.cache_dir, cache_file))
+        self._forget_cache_file(file_path, keep=cache_file)
+        self.entries[file_path] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': sha256,
+            'cache_file': cache_file,
+        }
+
+    def prune(self, current_paths):
+        """Drops entries (and cached frames) for files that no longer exist in the source folder."""
+        for file_path in [path for path in self.entries if path not in current_paths]:
+            self._forget_cache_file(file_path)
+            del self.entries[file_path]
+
+    def _forget_cache_file(self, file_path, keep=None):
+        entry = self.entries.get(file_path)
+        if entry is None or entry['cache_file'] == keep:
+            return
+        # Another source file with identical contents may share the cached frame
+        if any(other['cache_file'] == entry['cache_file'] for path, other in self.entries.items() if path != file_path):
+            return
+        try:
+            os.remove(os.path.join(self.cache_dir, entry['cache_file']))
+        except FileNotFoundError:
+            pass
+
+
+def load_folder_incremental(folder_path, cache_dir, expected_columns=EXPECTED_COLUMNS, workers=1):
+    """
+    Loads every BrokerMetrics CSV in a folder, parsing only new or changed files.
+
+    Unchanged files are served from the per-file cache recorded in the
+    manifest; new or changed ones go through load_brokermetrics_files
+    (optionally in a process pool) and are cached for the next rebuild.
+
+    Args:
+    folder_path: Folder containing the source CSV files.
+    cache_dir: Folder holding the manifest and cached intermediates.
+    expected_columns: Columns each file must contain.
+    workers: Number of worker processes used for the changed files.
+
+    Returns:
+    list: Normalized DataFrames in filename order (files that failed to load are skipped).
+    """
+    manifest = IngestManifest(cache_dir, expected_columns)
+    file_paths = [os.path.abspath(path) for path in list_csv_files(folder_path)]
+
+    frames = {}
+    changed_paths = []
+    for file_path in file_paths:
+        df = manifest.cached_frame(file_path)
+        if df is not None:
+            frames[file_path] = df
+        else:
+            changed_paths.append(file_path)
+
+    logging.info(f"{folder_path}: reusing {len(frames)} cached files, parsing {len(changed_paths)} new or changed files")
+
+    for file_path, df, error in load_brokermetrics_files(changed_paths, expected_columns, workers=workers):
+        if df is None:
+            logging.warning(f"File {file_path} does not have the expected columns or could not be loaded: {error}")
+            continue
+        manifest.store(file_path, df)
+        frames[file_path] = df
+
+    manifest.prune(set(file_paths))
+    manifest.save()
+    return [frames[path] for path in file_paths if path in frames]
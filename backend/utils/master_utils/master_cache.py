@@ -0,0 +1,223 @@
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.phone_utils import normalize_phone_values
+from utils.processing import (load_and_preprocess_master, melt_master_dataframe, hash_key_columns,
+                              build_key_index, build_key_lookup)
+from utils.fuzzy import FuzzyNameIndex
+from utils.agent_lookup import AgentIndex
+from utils.metrics import timed_stage
+
+NAME_COLUMNS = ['First Name', 'Last Name']
+# Single-column keys that can identify an agent on their own, by key kind
+CONTACT_COLUMNS = {'email': 'EMail', 'phone': 'Phone'}
+
+
+def contact_keys(values, kind):
+    """
+    Normalizes an email or phone column and turns it into 64-bit keys.
+
+    Emails are compared trimmed (case is already folded by the loaders);
+    phones are compared as their 10-digit number. Blank and invalid values
+    are reported as absent so they never match each other.
+
+    Args:
+    values: A Series of raw emails or phones.
+    kind: 'email' or 'phone'.
+
+    Returns:
+    tuple: (keys as a uint64 array, boolean mask of the rows that have a key).
+    """
+    if kind == 'phone':
+        phones = normalize_phone_values(values, as_int=True)
+        present = phones.notna().to_numpy()
+        return phones.fillna(0).to_numpy(dtype=np.uint64), present
+
+    emails = pd.Series(values, copy=False).astype('string').str.strip()
+    present = (emails.notna() & (emails != '')).to_numpy(dtype=bool)
+    keys = pd.util.hash_pandas_object(emails.astype(object), index=False).to_numpy()
+    return keys, present
+
+
+def build_contact_lookup(df, kind):
+    """
+    Build a build_key_lookup-style (sorted keys, row positions) lookup over
+    the rows of df that have an email or phone key.
+
+    Keys shared by more than one agent name, such as an office's main line,
+    are left out: they can't tell agents apart, so those inputs fall
+    through to the next match tier.
+    """
+    keys, present = contact_keys(df[CONTACT_COLUMNS[kind]], kind)
+    positions = np.flatnonzero(present)
+    keys = keys[positions]
+
+    owners = pd.DataFrame({'key': keys, 'name': hash_key_columns(df.iloc[positions], NAME_COLUMNS)}).drop_duplicates()
+    shared = owners['key'][owners['key'].duplicated()].unique()
+    unambiguous = ~np.isin(keys, shared)
+    keys, positions = keys[unambiguous], positions[unambiguous]
+
+    order = np.argsort(keys, kind='stable')
+    return keys[order], positions[order]
+
+
+class MasterSnapshot:
+    """
+    An immutable, fully preprocessed view of one master file.
+
+    Attributes:
+    path: Path of the master CSV the snapshot was built from.
+    mtime: Modification time of that file when it was read.
+    master_df: Lowercased, de-duplicated master DataFrame.
+    melted_df: master_df melted to one row per phone number.
+    name_keys: Hashed index of the (First Name, Last Name) keys in melted_df.
+    name_lookup: Sorted key lookup for fetching the melted rows of given names.
+    loaded_at: Wall-clock time the snapshot finished building.
+    fuzzy_index: FuzzyNameIndex over the master names, built on first use.
+    contact_lookup(kind): Key lookup over melted_df by email or phone, built on first use.
+    agent_index: AgentIndex over master_df for single-agent lookups, built on first use.
+    """
+
+    def __init__(self, path, mtime, master_df, melted_df):
+        self.path = path
+        self.mtime = mtime
+        self.master_df = master_df
+        self.melted_df = melted_df
+        self.name_keys = build_key_index(melted_df, NAME_COLUMNS)
+        self.name_lookup = build_key_lookup(melted_df, NAME_COLUMNS)
+        self.loaded_at = time.time()
+        self._fuzzy_index = None
+        self._fuzzy_lock = threading.Lock()
+        self._contact_lookups = {}
+        self._contact_lock = threading.Lock()
+        self._agent_index = None
+        self._agent_lock = threading.Lock()
+
+    @property
+    def fuzzy_index(self):
+        if self._fuzzy_index is None:
+            with self._fuzzy_lock:
+                if self._fuzzy_index is None:
+                    self._fuzzy_index = FuzzyNameIndex(self.master_df)
+        return self._fuzzy_index
+
+    @property
+    def agent_index(self):
+        if self._agent_index is None:
+            with self._agent_lock:
+                if self._agent_index is None:
+                    self._agent_index = AgentIndex(self.master_df)
+        return self._agent_index
+
+    def contact_lookup(self, kind):
+        """Returns the 'email' or 'phone' lookup over melted_df, building it on first use."""
+        lookup = self._contact_lookups.get(kind)
+        if lookup is None:
+            with self._contact_lock:
+                lookup = self._contact_lookups.get(kind)
+                if lookup is None:
+                    lookup = build_contact_lookup(self.melted_df, kind)
+                    self._contact_lookups[kind] = lookup
+        return lookup
+
+    @classmethod
+    def from_csv(cls, path):
+        """Read, normalize and melt the master CSV at path."""
+        mtime = os.path.getmtime(path)
+        with timed_stage('master load'):
+            master_df = load_and_preprocess_master(path)
+        with timed_stage('melt'):
+            melted_df = melt_master_dataframe(master_df)
+        return cls(path, mtime, master_df, melted_df)
+
+
+class MasterCache:
+    """
+    Keeps the preprocessed master resident in memory and reloads it in the
+    background when the file's path or mtime changes.
+
+    Readers always get a complete snapshot: a reload builds a new
+    MasterSnapshot off to the side and swaps the reference in one step.
+    """
+
+    def __init__(self, master_csv_path, poll_interval=30):
+        self.master_csv_path = master_csv_path
+        self.poll_interval = poll_interval
+        self._snapshot = None
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self):
+        """The resident snapshot, or None if nothing has been loaded yet (never triggers a load)."""
+        return self._snapshot
+
+    def get(self):
+        """Return the current snapshot, loading it first if nothing is resident yet."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.reload()
+        return snapshot
+
+    def set_path(self, master_csv_path):
+        """Point the cache at a different master file and load it."""
+        self.master_csv_path = master_csv_path
+        return self.reload()
+
+    def is_stale(self):
+        """Check whether the master on disk differs from the resident snapshot."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return True
+        if snapshot.path != self.master_csv_path:
+            return True
+        try:
+            return os.path.getmtime(self.master_csv_path) != snapshot.mtime
+        except OSError:
+            return False
+
+    def reload(self, force=True):
+        """Build a fresh snapshot and swap it in. Concurrent reloads are serialized."""
+        with self._load_lock:
+            if not force and not self.is_stale():
+                return self._snapshot
+            path = self.master_csv_path
+            logging.info(f"Loading master file: {path}")
+            start = time.perf_counter()
+            snapshot = MasterSnapshot.from_csv(path)
+            # Built before the swap so the first agent lookup on a new master doesn't pay for it
+            with timed_stage('agent index'):
+                snapshot.agent_index
+            self._snapshot = snapshot
+            logging.info(f"Master loaded in {time.perf_counter() - start:.2f}s "
+                         f"({len(snapshot.master_df)} rows, {len(snapshot.melted_df)} melted rows)")
+            return snapshot
+
+    def start(self):
+        """Load the master now and start the background watcher thread."""
+        self.get()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._watch, name="master-cache-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background watcher thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.reload(force=False)
+            except Exception as e:
+                # Keep serving the previous snapshot if the new file can't be read
+                logging.error(f"Failed to reload master file {self.master_csv_path}: {e}")
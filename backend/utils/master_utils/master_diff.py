@@ -0,0 +1,298 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.phone_utils import PHONE_COLUMNS, normalize_phone_values
+from utils.processing import hash_key_columns
+from utils.crossmatch import HashedKeySet
+
+DIFF_COLUMNS = ['Agent ID', 'First Name', 'Last Name'] + PHONE_COLUMNS + ['EMail']
+CHANGE_COLUMNS = ['Agent ID', 'First Name', 'Last Name', 'Change', 'Old', 'New']
+FINGERPRINT_COLUMNS = ['Phone A', 'Phone B', 'Phone C', 'EMail']
+DEFAULT_CHUNKSIZE = 200000
+
+
+def read_contact_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Streams a master CSV reduced to what the diff compares, chunk by chunk.
+
+    Every chunk has an int64 'Agent ID' (rows without a usable one are
+    dropped), the names as written, a trimmed lowercase 'EMail' ('' when
+    blank), the agent's valid phones as int64 'Phone A'..'Phone C' in
+    ascending order (0 for none), so reordered phones compare equal, and a
+    64-bit 'Fingerprint' of the phones and email.
+
+    Yields:
+    tuple: (chunk, number of rows dropped for lacking an Agent ID).
+    """
+    chunks = pd.read_csv(file_path, usecols=lambda col: col in DIFF_COLUMNS, dtype=str,
+                         keep_default_na=False, na_filter=False, chunksize=chunksize)
+    for chunk in chunks:
+        if 'Agent ID' not in chunk.columns:
+            raise ValueError(f"{file_path} has no 'Agent ID' column")
+        ids = pd.to_numeric(chunk['Agent ID'], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(ids) & (ids == np.floor(ids))
+        chunk = chunk[valid]
+
+        reduced = pd.DataFrame({'Agent ID': ids[valid].astype(np.int64)})
+        for col in ['First Name', 'Last Name']:
+            reduced[col] = chunk[col].to_numpy(dtype=object) if col in chunk.columns else ''
+        # Only emails are compared; names are just reported, so they skip the string passes
+        emails = chunk['EMail'] if 'EMail' in chunk.columns else pd.Series('', index=chunk.index)
+        reduced['EMail'] = emails.str.strip().str.lower().to_numpy(dtype=object)
+
+        present = [col for col in PHONE_COLUMNS if col in chunk.columns]
+        phones = np.zeros((len(chunk), len(PHONE_COLUMNS)), dtype=np.int64)
+        if present and len(chunk):
+            # All phone columns normalized in one pass, then back to one row per agent
+            flat = chunk[present].to_numpy().ravel(order='F')
+            # Blank cells as missing, so they skip the formatted-text fallback
+            flat = normalize_phone_values(np.where(flat == '', None, flat), as_int=True)
+            phones[:, :len(present)] = flat.fillna(0).to_numpy(dtype=np.int64).reshape(len(present), -1).T
+        phones.sort(axis=1)
+        for i, col in enumerate(FINGERPRINT_COLUMNS[:-1]):
+            reduced[col] = phones[:, i]
+        reduced['Fingerprint'] = hash_key_columns(reduced, FINGERPRINT_COLUMNS)
+        yield reduced, int((~valid).sum())
+
+
+def _contacts(phones, emails):
+    """(phones, emails) sets per row of phones (n x 3, 0 = none) and emails ('' = none)."""
+    return [({phone for phone in row if phone}, {email} if email else set())
+            for row, email in zip(phones.tolist(), emails)]
+
+
+def _contact_text(contacts):
+    """'7145550000 7145551234; a@b.com' for each agent's (phones, emails) sets."""
+    return [' '.join(str(phone) for phone in sorted(phones)) + (f"; {', '.join(sorted(emails))}" if emails else '')
+            for phones, emails in contacts]
+
+
+def _agent_events(agents, change, contacts):
+    """One 'agent added' / 'agent removed' change row per (Agent ID, First Name, Last Name), with their contacts."""
+    events = pd.DataFrame(list(agents), columns=['Agent ID', 'First Name', 'Last Name'])
+    events['Change'] = change
+    text = _contact_text(contacts)
+    events['Old'] = text if change == 'agent removed' else ''
+    events['New'] = text if change == 'agent added' else ''
+    return events
+
+
+class MasterDiff:
+    """
+    The differences between two master snapshots, keyed on Agent ID.
+
+    Agents in both files whose phones or email differ are 'changed'; for
+    them every phone added or removed and the email being added, removed or
+    changed is counted and listed in `changes`. Phone order doesn't matter,
+    and the rows of an Agent ID that appears more than once are merged.
+    """
+
+    def __init__(self):
+        self.old_agents = 0
+        self.new_agents = 0
+        self.added = 0
+        self.removed = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.phones_added = 0
+        self.phones_removed = 0
+        self.emails_added = 0
+        self.emails_removed = 0
+        self.emails_changed = 0
+        self.skipped_rows = 0
+        self.duplicate_ids = 0
+        self._changes = []
+
+    @property
+    def changes(self):
+        """
+        One row per change: Agent ID, names, 'Change' ('agent added', 'agent
+        removed', 'phone added', 'phone removed', 'email added', 'email
+        removed' or 'email changed') and the 'Old' and 'New' values.
+        """
+        if not self._changes:
+            return pd.DataFrame(columns=CHANGE_COLUMNS)
+        return pd.concat(self._changes, ignore_index=True)[CHANGE_COLUMNS]
+
+    def log_summary(self):
+        print(f'Agents: {self.old_agents} -> {self.new_agents}')
+        print(f'Agents added: {self.added}, removed: {self.removed}, changed: {self.changed}, '
+              f'unchanged: {self.unchanged}')
+        print(f'Phones added: {self.phones_added}, removed: {self.phones_removed}')
+        print(f'Emails added: {self.emails_added}, removed: {self.emails_removed}, changed: {self.emails_changed}')
+        if self.skipped_rows or self.duplicate_ids:
+            print(f'Rows without an Agent ID: {self.skipped_rows}, '
+                  f'rows merged into an earlier row of their Agent ID: {self.duplicate_ids}')
+
+
+def _merge_contacts(groups, agent_id, contacts):
+    phones, emails = groups.setdefault(agent_id, (set(), set()))
+    phones |= contacts[0]
+    emails |= contacts[1]
+
+
+def _load_old(file_path, chunksize, diff):
+    """
+    Reads the old snapshot into compact arrays sorted by Agent ID: ids,
+    fingerprints, phones and a DataFrame of names and emails (categorical
+    names, since they repeat heavily), one row per id.
+
+    An id on several rows keeps its first row's names; the union of the
+    phones and emails of all its rows is returned separately.
+
+    Returns:
+    tuple: (rows, phones, {Agent ID: (phones, emails)} for repeated ids), or
+    None when the file has no rows.
+    """
+    frames, phone_parts = [], []
+    for chunk, skipped in read_contact_chunks(file_path, chunksize):
+        diff.skipped_rows += skipped
+        phone_parts.append(chunk[FINGERPRINT_COLUMNS[:-1]].to_numpy())
+        frames.append(chunk[['Agent ID', 'Fingerprint', 'First Name', 'Last Name', 'EMail']]
+                      .astype({'First Name': 'category', 'Last Name': 'category'}))
+    if not frames:
+        return None
+    for col in ['First Name', 'Last Name']:
+        categories = pd.api.types.union_categoricals([frame[col] for frame in frames])
+        frames = [frame.assign(**{col: frame[col].cat.set_categories(categories.categories)}) for frame in frames]
+    old = pd.concat(frames, ignore_index=True)
+    phones = np.concatenate(phone_parts)
+
+    repeated = {}
+    first = ~old['Agent ID'].duplicated().to_numpy()
+    diff.duplicate_ids += int((~first).sum())
+    if not first.all():
+        rows = np.flatnonzero(old['Agent ID'].duplicated(keep=False).to_numpy())
+        for agent_id, contacts in zip(old['Agent ID'].to_numpy()[rows].tolist(),
+                                      _contacts(phones[rows], old['EMail'].to_numpy()[rows])):
+            _merge_contacts(repeated, agent_id, contacts)
+    order = np.flatnonzero(first)[np.argsort(old['Agent ID'].to_numpy()[first], kind='stable')]
+    return old.iloc[order].reset_index(drop=True), phones[order], repeated
+
+
+def _changed_events(agent, before, after, diff):
+    """Lists one agent's phone and email changes between two (phones, emails) sets and counts them."""
+    (old_phones, old_emails), (new_phones, new_emails) = before, after
+    events = [agent + ('phone added', '', str(phone)) for phone in sorted(new_phones - old_phones)]
+    events += [agent + ('phone removed', str(phone), '') for phone in sorted(old_phones - new_phones)]
+    if old_emails != new_emails:
+        if len(old_emails) == 1 and len(new_emails) == 1:
+            events.append(agent + ('email changed', *old_emails, *new_emails))
+            diff.emails_changed += 1
+        else:
+            events += [agent + ('email added', '', email) for email in sorted(new_emails - old_emails)]
+            events += [agent + ('email removed', email, '') for email in sorted(old_emails - new_emails)]
+            diff.emails_added += len(new_emails - old_emails)
+            diff.emails_removed += len(old_emails - new_emails)
+    # Fingerprints can also differ for the same contacts, e.g. one number in two slots
+    if events:
+        diff.changed += 1
+        diff.phones_added += len(new_phones - old_phones)
+        diff.phones_removed += len(old_phones - new_phones)
+    else:
+        diff.unchanged += 1
+    return events
+
+
+def diff_masters(old_path, new_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Compares two master snapshots keyed on Agent ID, reading each file once.
+
+    The old snapshot is held as compact sorted arrays; the new one is
+    streamed chunk by chunk. Each row's phones and email are reduced to a
+    64-bit fingerprint, so agents whose fingerprint is unchanged are skipped
+    with a single array comparison. Only the rows of added and changed
+    agents, and of ids on more than one row, are kept; they are compared
+    field by field at the end, once every row of an id has been seen.
+
+    An agent on several rows of a file has the union of their phones and
+    emails, so an agent whose phones moved between rows is unchanged.
+
+    Args:
+    old_path: The earlier master CSV.
+    new_path: The later master CSV.
+    chunksize: Rows of the new master processed at a time.
+
+    Returns:
+    MasterDiff: The counts and the list of changes.
+    """
+    diff = MasterDiff()
+    loaded = _load_old(old_path, chunksize, diff)
+    old, old_phones, old_repeated = loaded if loaded is not None else (
+        pd.DataFrame(columns=['Agent ID', 'Fingerprint', 'First Name', 'Last Name', 'EMail']),
+        np.zeros((0, 3), dtype=np.int64), {})
+    old_ids = old['Agent ID'].to_numpy(dtype=np.int64)
+    old_fingerprints = old['Fingerprint'].to_numpy(dtype=np.uint64)
+    # Repeated ids are compared on their merged contacts, never on a single row's fingerprint
+    old_merged = np.isin(old_ids, np.fromiter(old_repeated, dtype=np.int64, count=len(old_repeated)))
+    diff.old_agents = len(old)
+    seen_old = np.zeros(len(old), dtype=bool)
+    seen_new = HashedKeySet()
+    pending = []
+
+    for chunk, skipped in read_contact_chunks(new_path, chunksize):
+        diff.skipped_rows += skipped
+        ids = chunk['Agent ID'].to_numpy()
+        first = seen_new.add_new(ids.view(np.uint64))
+        diff.duplicate_ids += int((~first).sum())
+        diff.new_agents += int(first.sum())
+
+        positions = np.minimum(np.searchsorted(old_ids, ids), max(len(old_ids) - 1, 0))
+        found = old_ids[positions] == ids if len(old_ids) else np.zeros(len(ids), dtype=bool)
+        seen_old[positions[found & first]] = True
+
+        unchanged = found & first & ~old_merged[positions] if len(old_ids) else found
+        unchanged[unchanged] = old_fingerprints[positions[unchanged]] == chunk['Fingerprint'].to_numpy()[unchanged]
+        diff.unchanged += int(unchanged.sum())
+        if not unchanged.all():
+            pending.append(chunk[~unchanged].assign(First=first[~unchanged]))
+        logging.info(f"Compared {diff.new_agents} agents of {new_path}")
+
+    def old_contacts(position):
+        agent_id = int(old_ids[position])
+        if agent_id in old_repeated:
+            return old_repeated[agent_id]
+        return _contacts(old_phones[position:position + 1], [old['EMail'].iat[position]])[0]
+
+    # Every id of the kept rows, with its first kept row's names and the union of their contacts
+    agents, merged = {}, {}
+    if pending:
+        rows = pd.concat(pending, ignore_index=True)
+        for agent, contacts, is_first in zip(
+                zip(rows['Agent ID'].tolist(), rows['First Name'].tolist(), rows['Last Name'].tolist()),
+                _contacts(rows[FINGERPRINT_COLUMNS[:-1]].to_numpy(), rows['EMail'].tolist()),
+                rows['First'].tolist()):
+            if agent[0] not in agents:
+                agents[agent[0]] = (agent, is_first)
+            _merge_contacts(merged, agent[0], contacts)
+
+    events, added = [], []
+    for agent_id, (agent, first_kept) in agents.items():
+        position = min(int(np.searchsorted(old_ids, agent_id)), max(len(old_ids) - 1, 0))
+        if not len(old_ids) or old_ids[position] != agent_id:
+            added.append((agent, merged[agent_id]))
+            continue
+        before = old_contacts(position)
+        if not first_kept:
+            # The id's first row matched the old snapshot and was counted unchanged; its contacts are the old ones
+            diff.unchanged -= 1
+            _merge_contacts(merged, agent_id, before)
+        events.extend(_changed_events(agent, before, merged[agent_id], diff))
+    if events:
+        diff._changes.append(pd.DataFrame(events, columns=CHANGE_COLUMNS))
+    diff.added = len(added)
+    if added:
+        diff._changes.append(_agent_events([agent for agent, _ in added], 'agent added',
+                                           [contacts for _, contacts in added]))
+
+    removed = np.flatnonzero(~seen_old)
+    diff.removed = len(removed)
+    if diff.removed:
+        removed_rows = old.iloc[removed]
+        diff._changes.append(_agent_events(
+            zip(removed_rows['Agent ID'].tolist(), removed_rows['First Name'].tolist(),
+                removed_rows['Last Name'].tolist()),
+            'agent removed', [old_contacts(position) for position in removed.tolist()]))
+    return diff
@@ -2,19 +2,22 @@ import os
 import pandas as pd
 import logging
 import numpy as np
-
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+from utils.phone_utils import normalize_phone_columns
+from utils.master_utils.ingest import EXPECTED_COLUMNS, list_csv_files, load_brokermetrics_files
+from utils.master_utils.manifest import load_folder_incremental
+from utils.master_utils.schema import read_master_csv
+from utils.processing import coalesce_duplicates
+from utils.external_dedup import DEFAULT_MEMORY_BUDGET_MB, dedup_csv_file
+from utils.master_utils.partitions import build_partitions
 
 
 class CSVProcessor:
 
     @staticmethod
-    def load_csv(file_path):
+    def load_csv(file_path, reader=pd.read_csv):
         """Loads a CSV file into a DataFrame."""
         try:
-            df = pd.read_csv(file_path)
+            df = reader(file_path)
             return df
         except FileNotFoundError:
             logging.error(f"Error: The file at {file_path} was not found.")
@@ -27,6 +30,11 @@ class CSVProcessor:
             logging.error(f"An unexpected error occurred: {e}")
         return None
 
+    @staticmethod
+    def load_master_csv(file_path):
+        """Loads a master (or BrokerMetrics-shaped) CSV file into the compact master schema."""
+        return CSVProcessor.load_csv(file_path, reader=read_master_csv)
+
     @staticmethod
     def clean_column_names(df):
         """Cleans column names by removing leading/trailing spaces, converting to lowercase, and replacing spaces with underscores."""
@@ -37,22 +45,11 @@ class CSVProcessor:
     @staticmethod
     def convert_phone_numbers(df, phone_columns):
         """Converts phone numbers to pure digits in specified columns and ensures they are 10 digits long."""
+        df = normalize_phone_columns(df, phone_columns)
         for column in phone_columns:
             if column in df.columns:
-                # Convert to string and check for '.' at index -2
-                df[column] = df[column].astype(str).apply(
-                    lambda x: x[:-1] if len(x) == 12 and x[-2] == '.' else x
-                )
-
-                # Clean phone numbers: remove non-digit characters and validate length
-
-                df[column] = df[column].str.replace(r'\D', '', regex=True)
-  
-                df[column] = df[column].apply(lambda x: x if len(x) == 10 else None)  # Set to None if not 10 digits
-                
-                # Optionally, convert the column back to string type
-                df[column] = df[column].astype('string')  # Ensure the column is of string type for further operations
-
+                # Ensure the column is of string type for further operations
+                df[column] = df[column].astype('string')
         return df
 
 
@@ -82,35 +79,36 @@ class CSVProcessor:
             logging.error(f"An error occurred while saving the file: {e}")
 
     @staticmethod
-    def combine_csv_files(folder_path, output_file_path):
-        """Combines all CSV files in a specified folder into a single CSV file."""
-        expected_columns = ['Agent ID', 'First Name', 'Last Name', 'Office ID', 'Office Name',
-       'Phone 1', 'Phone 1 Type', 'Phone 2', 'Phone 2 Type', 'Phone 3',
-       'Phone 3 Type', 'EMail', 'Alt. Address', 'Alt. City', 'Alt. Zip']
-
+    def combine_csv_files(folder_path, output_file_path, workers=1, cache_dir=None, coalesce_on=None):
+        """
+        Combines all CSV files in a specified folder into a single CSV file, loading them with up to `workers` processes.
+        When cache_dir is given, only files that are new or changed since the last build are parsed.
+        When coalesce_on is given (e.g. ['Agent ID']), rows sharing that key are merged into one, keeping every filled field;
+        rows of a key whose values conflict (e.g. different phones) are all kept.
+        """
         if not os.path.isdir(folder_path):
             logging.error(f"Folder path does not exist: {folder_path}")
             return
 
-        all_dfs = []
-        for filename in os.listdir(folder_path):
-            if filename.endswith('.csv'):
-                file_path = os.path.join(folder_path, filename)
-                logging.info(f"Processing file: {file_path}")
-
-                try:
-                    df = CSVProcessor.load_csv(file_path)
-                    if df is not None and all(col in df.columns for col in expected_columns):
-                        # df = CSVProcessor.clean_column_names(df)
-                        df = CSVProcessor.convert_phone_numbers(df, ['Phone 1', 'Phone 2', 'Phone 3'])
-                        all_dfs.append(df[expected_columns])
-                    else:
-                        logging.warning(f"File {file_path} does not have the expected columns or could not be loaded.")
-                except Exception as e:
-                    logging.error(f"Error processing file {file_path}: {e}")
+        if cache_dir is not None:
+            all_dfs = load_folder_incremental(folder_path, cache_dir, EXPECTED_COLUMNS, workers=workers)
+        else:
+            all_dfs = []
+            file_paths = list_csv_files(folder_path)
+            for file_path, df, error in load_brokermetrics_files(file_paths, EXPECTED_COLUMNS, workers=workers):
+                logging.info(f"Processed file: {file_path}")
+                if df is not None:
+                    all_dfs.append(df)
+                else:
+                    logging.warning(f"File {file_path} does not have the expected columns or could not be loaded: {error}")
 
         if all_dfs:
+            # Phones are already Int64, which writes the plain 10 digits
             combined_df = pd.concat(all_dfs, ignore_index=True)
+            if coalesce_on is not None:
+                row_count_before = len(combined_df)
+                combined_df = coalesce_duplicates(combined_df, coalesce_on)
+                logging.info(f'Coalesced {row_count_before} rows into {len(combined_df)} on {coalesce_on}')
             CSVProcessor.save_csv(combined_df, output_file_path)
         else:
             logging.warning("No CSV files to combine.")
@@ -119,8 +117,8 @@ class CSVProcessor:
     def combine_two_csv(file_path1, file_path2, output_file_path):
         """Combines two CSV files into a single CSV file."""
         try:
-            df1 = CSVProcessor.load_csv(file_path1)
-            df2 = CSVProcessor.load_csv(file_path2)
+            df1 = CSVProcessor.load_master_csv(file_path1)
+            df2 = CSVProcessor.load_master_csv(file_path2)
 
             expected_columns = ['Agent ID', 'First Name', 'Last Name', 'Office ID', 'Office Name',
        'Phone 1', 'Phone 1 Type', 'Phone 2', 'Phone 2 Type', 'Phone 3',
@@ -152,79 +150,105 @@ class CSVProcessor:
     @staticmethod
     def count_cells(file_path):
         """Counts the total number of non-empty phone cells in a CSV file."""
-        df = CSVProcessor.load_csv(file_path)
+        df = CSVProcessor.load_master_csv(file_path)
         if df is not None:
             phone_columns = ["Phone 1", "Phone 2", "Phone 3"]
             non_empty_cells = df[phone_columns].notna().sum().sum()
             logging.info(f"Total number of phone cells in {phone_columns}: {non_empty_cells}")
 
     @staticmethod
-    def drop_duplicates_in_csv(file_path):
-        """Drops duplicate rows from a CSV file."""
-        df = CSVProcessor.load_csv(file_path)
-        if df is not None:
-            row_count_before = len(df)
-            logging.info(f'Row count before dropping duplicates: {row_count_before}')
-            df_cleaned = df.drop_duplicates()
-            row_count_after = len(df_cleaned)
-            logging.info(f'Row count after dropping duplicates: {row_count_after}')
-            CSVProcessor.save_csv(df_cleaned, file_path)
-
-
-
-CSVProcessor.combine_csv_files(
-    r'data\brokermetrics_data\LA',
-    r'data\brokermetrics_data\Aggregated\LA.csv'
-)
-
-CSVProcessor.drop_duplicates_in_csv(
-    r"data\brokermetrics_data\Aggregated\LA.csv"
-)
-CSVProcessor.count_cells(
-    r"data\brokermetrics_data\Aggregated\LA.csv"
-)
-
-
-
-CSVProcessor.combine_csv_files(
-    r'data\brokermetrics_data\Orange County',
-    r'data\brokermetrics_data\Aggregated\OC.csv'
-)
-
-CSVProcessor.drop_duplicates_in_csv(
-    r"data\brokermetrics_data\Aggregated\OC.csv"
-)
-CSVProcessor.count_cells(
-    r"data\brokermetrics_data\Aggregated\OC.csv"
-)
-
-CSVProcessor.combine_csv_files(
-    r'data\brokermetrics_data\San Bernardino',
-    r'data\brokermetrics_data\Aggregated\SB.csv'
-)
-
-CSVProcessor.drop_duplicates_in_csv(
-    r"data\brokermetrics_data\Aggregated\SB.csv"
-)
-CSVProcessor.count_cells(
-    r"data\brokermetrics_data\Aggregated\SB.csv"
-)
-
-
-
-# Process the CSV files
-CSVProcessor.combine_csv_files(
-    r'data\brokermetrics_data\Aggregated',
-    r'data\brokermetrics_data\Master\10232024.csv'
-)
-
-CSVProcessor.drop_duplicates_in_csv(
-    r"data\brokermetrics_data\Master\10232024.csv"
-)
-CSVProcessor.count_cells(
-    r"data\brokermetrics_data\Master\10232024.csv"
-)
-CSVProcessor.count_cells(
-    r"data\brokermetrics_data\Master\10212024.csv"
-)
-
+    def drop_duplicates_in_csv(file_path, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        """
+        Drops duplicate rows from a CSV file, rewriting it atomically. Files too
+        large for memory_budget_mb are deduplicated out of core in on-disk buckets.
+        """
+        try:
+            row_count_before, row_count_after = dedup_csv_file(file_path, memory_budget_mb=memory_budget_mb)
+        except FileNotFoundError:
+            logging.error(f"Error: The file at {file_path} was not found.")
+            return
+        except pd.errors.EmptyDataError:
+            logging.error("Error: The file is empty.")
+            return
+        except Exception as e:
+            logging.error(f"An error occurred while dropping duplicates: {e}")
+            return
+        logging.info(f'Row count before dropping duplicates: {row_count_before}')
+        logging.info(f'Row count after dropping duplicates: {row_count_after}')
+
+
+
+def build_master():
+    """
+    Rebuilds the per-county aggregates (LA, OC, SB) from their BrokerMetrics
+    folders, the per-region master partitions the app serves from, and the
+    combined master, deduplicating and counting phone cells along the way.
+    """
+    CSVProcessor.combine_csv_files(
+        r'data\brokermetrics_data\LA',
+        r'data\brokermetrics_data\Aggregated\LA.csv',
+        cache_dir=r'data\brokermetrics_data\.ingest_cache\LA'
+    )
+
+    CSVProcessor.drop_duplicates_in_csv(
+        r"data\brokermetrics_data\Aggregated\LA.csv"
+    )
+    CSVProcessor.count_cells(
+        r"data\brokermetrics_data\Aggregated\LA.csv"
+    )
+
+    CSVProcessor.combine_csv_files(
+        r'data\brokermetrics_data\Orange County',
+        r'data\brokermetrics_data\Aggregated\OC.csv',
+        cache_dir=r'data\brokermetrics_data\.ingest_cache\OC'
+    )
+
+    CSVProcessor.drop_duplicates_in_csv(
+        r"data\brokermetrics_data\Aggregated\OC.csv"
+    )
+    CSVProcessor.count_cells(
+        r"data\brokermetrics_data\Aggregated\OC.csv"
+    )
+
+    CSVProcessor.combine_csv_files(
+        r'data\brokermetrics_data\San Bernardino',
+        r'data\brokermetrics_data\Aggregated\SB.csv',
+        cache_dir=r'data\brokermetrics_data\.ingest_cache\SB'
+    )
+
+    CSVProcessor.drop_duplicates_in_csv(
+        r"data\brokermetrics_data\Aggregated\SB.csv"
+    )
+    CSVProcessor.count_cells(
+        r"data\brokermetrics_data\Aggregated\SB.csv"
+    )
+
+    # One partition per region; a single region can be rebuilt alone with
+    # python -m utils.master_utils.partitions --regions LA
+    build_partitions(
+        r'data\brokermetrics_data\Aggregated',
+        r'data\brokermetrics_data\Master\partitions'
+    )
+
+    # Process the CSV files
+    CSVProcessor.combine_csv_files(
+        r'data\brokermetrics_data\Aggregated',
+        r'data\brokermetrics_data\Master\10232024.csv',
+        coalesce_on=['Agent ID']
+    )
+
+    CSVProcessor.drop_duplicates_in_csv(
+        r"data\brokermetrics_data\Master\10232024.csv"
+    )
+    CSVProcessor.count_cells(
+        r"data\brokermetrics_data\Master\10232024.csv"
+    )
+    CSVProcessor.count_cells(
+        r"data\brokermetrics_data\Master\10212024.csv"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    build_master()
@@ -0,0 +1,328 @@
+"""
+Keep the master as one partition per region (LA, OC, SB) plus a small
+catalog, instead of one flat file, so a crossmatch or lookup only touches
+the regions it needs and each region can be rebuilt and reloaded on its own.
+
+The catalog (catalog.json next to the partitions) lists every region's
+file and row count, and the zips and offices found in it, which is what
+lets a lookup infer its region from an office or a zip.
+
+Rebuild regions from their aggregates (Aggregated/LA.csv, ...), from the backend folder:
+    python -m utils.master_utils.partitions
+    python -m utils.master_utils.partitions --regions LA
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from bisect import bisect_right
+
+from utils.file_utils import atomic_output
+from utils.master_utils.master_cache import MasterCache
+from utils.master_utils.schema import read_master_csv
+from utils.processing import coalesce_duplicates
+
+# Region code -> BrokerMetrics folder its exports are in; aggregates and partitions are named <code>.csv
+REGIONS = {'LA': 'LA', 'OC': 'Orange County', 'SB': 'San Bernardino'}
+CATALOG_FILENAME = 'catalog.json'
+CATALOG_VERSION = 1
+
+
+def normalize_zip(value):
+    """The 5-digit zip in a value like 92618, '92618-1234' or 92618.0, or '' if there isn't one."""
+    if value is None:
+        return ''
+    text = str(value).strip().split('-')[0].split('.')[0]
+    return text if len(text) == 5 and text.isdigit() else ''
+
+
+def parse_regions(value):
+    """Region codes from a hint like 'la', 'LA,OC' or ['la', 'sb'], upper-cased and without duplicates."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return list(dict.fromkeys(code.strip().upper() for code in value if code.strip()))
+
+
+def partition_summary(master_df):
+    """
+    The catalog fields describing one partition's contents: its row count
+    and the distinct zips, office ids and (lowercased) office names in it.
+    """
+    zips = {normalize_zip(value) for value in master_df['Alt. Zip'].dropna().unique()}
+    office_ids = master_df['Office ID'].dropna().unique()
+    office_names = master_df['Office Name'].dropna().astype(str).str.strip().str.lower().unique()
+    return {
+        'rows': len(master_df),
+        'zips': sorted(zip_code for zip_code in zips if zip_code),
+        'office_ids': sorted(int(office_id) for office_id in office_ids),
+        'office_names': sorted(office_names),
+    }
+
+
+class PartitionCatalog:
+    """
+    The catalog of a partition folder: which regions exist, where their
+    files are and what they contain, with in-memory indexes for inferring
+    the regions an office or zip belongs to.
+
+    Attributes:
+    partition_dir: Folder holding the partition CSVs and catalog.json.
+    regions: Region code -> catalog entry (file, rows, built_at, zips, office_ids, office_names).
+    """
+
+    def __init__(self, partition_dir):
+        self.partition_dir = partition_dir
+        self.path = os.path.join(partition_dir, CATALOG_FILENAME)
+        self.regions = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        if data and data.get('version') != CATALOG_VERSION:
+            raise ValueError(f"Unsupported partition catalog version in {self.path}: {data.get('version')}")
+        self.regions = data.get('regions', {})
+        self._index()
+
+    def _index(self):
+        self._zip_regions, self._zip3_regions = {}, {}
+        self._office_id_regions, self._office_name_regions = {}, {}
+        for region, entry in self.regions.items():
+            for zip_code in entry.get('zips', []):
+                self._zip_regions.setdefault(zip_code, set()).add(region)
+                self._zip3_regions.setdefault(zip_code[:3], set()).add(region)
+            for office_id in entry.get('office_ids', []):
+                self._office_id_regions.setdefault(str(office_id), set()).add(region)
+            for office_name in entry.get('office_names', []):
+                self._office_name_regions.setdefault(office_name, set()).add(region)
+        # All office names in one string, so a partial name is found with str.find instead of a Python loop
+        self._office_names = list(self._office_name_regions)
+        self._office_name_starts = []
+        position = 0
+        for name in self._office_names:
+            self._office_name_starts.append(position)
+            position += len(name) + 1
+        self._office_names_text = '\n'.join(self._office_names)
+
+    def save(self):
+        """Writes the catalog atomically, so readers never see a half-written file."""
+        os.makedirs(self.partition_dir, exist_ok=True)
+        with atomic_output(self.path) as tmp_path:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CATALOG_VERSION, 'regions': self.regions}, f, sort_keys=True)
+
+    def record(self, region, file_name, summary):
+        """Adds or replaces a region's entry (see partition_summary) and saves the catalog."""
+        self.regions[region] = dict(summary, file=file_name, built_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        self._index()
+        self.save()
+
+    def partition_path(self, region):
+        return os.path.join(self.partition_dir, self.regions[region]['file'])
+
+    def regions_for_zip(self, zip_code):
+        """Regions with agents at this zip; failing that, regions with zips sharing its first three digits."""
+        zip_code = normalize_zip(zip_code)
+        if not zip_code:
+            return set()
+        return set(self._zip_regions.get(zip_code) or self._zip3_regions.get(zip_code[:3], ()))
+
+    def regions_for_office(self, office):
+        """Regions with an office whose id equals office, or whose name equals (failing that, contains) it."""
+        office = str(office).strip().lower() if office is not None else ''
+        if not office:
+            return set()
+        regions = self._office_id_regions.get(office) or self._office_name_regions.get(office)
+        if regions:
+            return set(regions)
+        regions = set()
+        office = office.replace('\n', ' ')
+        position = self._office_names_text.find(office)
+        while position != -1:
+            i = bisect_right(self._office_name_starts, position) - 1
+            regions.update(self._office_name_regions[self._office_names[i]])
+            # Continue from the next name: one hit per name is enough
+            if i + 1 == len(self._office_names):
+                break
+            position = self._office_names_text.find(office, self._office_name_starts[i + 1])
+        return regions
+
+    def resolve_regions(self, region=None, office=None, zip_code=None):
+        """
+        Picks the partitions a query needs to touch.
+
+        An explicit region hint wins. Otherwise the regions are inferred from
+        the office and zip (the regions both agree on, or either's if they
+        don't overlap); when nothing can be inferred every region is used.
+
+        Args:
+        region: Optional region code or codes ('LA', 'la,oc', ['SB']).
+        office: Optional Office ID or office name.
+        zip_code: Optional zip code.
+
+        Returns:
+        list: Region codes in catalog order.
+
+        Raises:
+        ValueError: If the hint names a region that isn't in the catalog.
+        """
+        hinted = parse_regions(region)
+        unknown = [code for code in hinted if code not in self.regions]
+        if unknown:
+            raise ValueError(f"Unknown region(s) {unknown}; the master has {sorted(self.regions)}")
+        if hinted:
+            return [code for code in self.regions if code in hinted]
+
+        inferred = [regions for regions in (self.regions_for_office(office), self.regions_for_zip(zip_code)) if regions]
+        selected = set.intersection(*inferred) if inferred else set(self.regions)
+        if not selected:
+            selected = set.union(*inferred)
+        return [code for code in self.regions if code in selected]
+
+
+def build_partition(region, aggregate_path, partition_dir):
+    """
+    Builds one region's partition from its aggregate: rows sharing an Agent
+    ID are coalesced and exact duplicates dropped, as for the flat master,
+    and the partition file and its catalog entry are replaced atomically, so
+    a running MasterCache picks up the new partition on its next check.
+
+    Args:
+    region: Region code, e.g. 'LA'.
+    aggregate_path: The region's aggregate CSV (e.g. Aggregated/LA.csv).
+    partition_dir: Folder for the partitions and their catalog.
+
+    Returns:
+    int: Rows in the partition.
+    """
+    start = time.perf_counter()
+    df = read_master_csv(aggregate_path)
+    df = coalesce_duplicates(df, ['Agent ID']).drop_duplicates()
+    file_name = f'{region}.csv'
+    os.makedirs(partition_dir, exist_ok=True)
+    with atomic_output(os.path.join(partition_dir, file_name)) as tmp_path:
+        df.to_csv(tmp_path, index=False)
+
+    # Re-read right before writing, so regions rebuilt in the meantime keep their entries
+    catalog = PartitionCatalog(partition_dir)
+    catalog.record(region, file_name, partition_summary(df))
+    logging.info(f"Built partition {region}: {len(df)} rows from {aggregate_path} "
+                 f"in {time.perf_counter() - start:.1f}s")
+    return len(df)
+
+
+def build_partitions(aggregated_dir, partition_dir, regions=None):
+    """
+    Builds the partition of every region (or just `regions`) from the
+    <code>.csv aggregates in aggregated_dir. Regions without an aggregate are skipped.
+
+    Returns:
+    dict: Region code -> rows in its partition.
+    """
+    built = {}
+    for region in parse_regions(regions) or list(REGIONS):
+        aggregate_path = os.path.join(aggregated_dir, f'{region}.csv')
+        if not os.path.exists(aggregate_path):
+            logging.warning(f"No aggregate for region {region} at {aggregate_path}")
+            continue
+        built[region] = build_partition(region, aggregate_path, partition_dir)
+    return built
+
+
+class PartitionedMasterCache:
+    """
+    Keeps every region partition resident, each in its own MasterCache, so a
+    rebuilt region is reloaded on its own while the others keep serving.
+    The catalog is re-read whenever catalog.json changes, which is how new
+    regions and updated zip/office indexes are picked up.
+    """
+
+    def __init__(self, partition_dir, poll_interval=30):
+        self.partition_dir = partition_dir
+        self.poll_interval = poll_interval
+        self.catalog_path = os.path.join(partition_dir, CATALOG_FILENAME)
+        self._catalog = None
+        self._catalog_mtime = None
+        self._caches = {}
+        self._started = False
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        """Whether the partition folder has a catalog to serve from."""
+        return os.path.exists(self.catalog_path)
+
+    @property
+    def catalog(self):
+        """The current PartitionCatalog, re-read if catalog.json changed since it was last read."""
+        try:
+            mtime = os.path.getmtime(self.catalog_path)
+        except OSError:
+            mtime = None
+        if self._catalog is None or mtime != self._catalog_mtime:
+            with self._lock:
+                if self._catalog is None or mtime != self._catalog_mtime:
+                    catalog = PartitionCatalog(self.partition_dir)
+                    for region in catalog.regions:
+                        if region not in self._caches:
+                            self._caches[region] = MasterCache(catalog.partition_path(region), self.poll_interval)
+                            if self._started:
+                                self._caches[region].start()
+                    self._catalog, self._catalog_mtime = catalog, mtime
+        return self._catalog
+
+    def resolve_regions(self, region=None, office=None, zip_code=None):
+        """The regions a query needs (see PartitionCatalog.resolve_regions)."""
+        return self.catalog.resolve_regions(region, office, zip_code)
+
+    def snapshots(self, regions=None):
+        """The MasterSnapshots of the given regions (all by default), loading any that aren't resident yet."""
+        regions = regions or list(self.catalog.regions)
+        return [self._caches[region].get() for region in regions]
+
+    def resident(self, regions=None):
+        """
+        Region -> resident MasterSnapshot for the given regions (all by
+        default), without loading anything; regions not loaded yet map to None.
+        """
+        regions = regions or list(self.catalog.regions)
+        return {region: self._caches[region].snapshot for region in regions}
+
+    def start(self):
+        """Load every partition and start watching each one (and the catalog) for changes."""
+        catalog = self.catalog
+        self._started = True
+        for region in catalog.regions:
+            self._caches[region].start()
+
+    def stop(self):
+        for cache in self._caches.values():
+            cache.stop()
+        self._started = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", help=f"Comma-separated regions to rebuild (default: all of {', '.join(REGIONS)})")
+    parser.add_argument("--aggregated-dir", default=os.path.join('data', 'brokermetrics_data', 'Aggregated'),
+                        help="Folder with the <region>.csv aggregates")
+    parser.add_argument("--partition-dir", default=os.path.join('data', 'brokermetrics_data', 'Master', 'partitions'),
+                        help="Folder for the partitions and their catalog")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    built = build_partitions(args.aggregated_dir, args.partition_dir, args.regions)
+    print(", ".join(f"{region}: {rows} rows" for region, rows in built.items()) or "No partitions built")
+    if not built:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
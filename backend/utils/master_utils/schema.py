@@ -0,0 +1,73 @@
+from importlib.util import find_spec
+
+import pandas as pd
+
+from utils.phone_utils import PHONE_COLUMNS, normalize_phone_values
+
+# Optional, only used for compact string columns; checked without importing
+# it, since pyarrow is only needed once a master is actually loaded
+ARROW_STRINGS = find_spec('pyarrow') is not None
+
+# Heavily repeated values: stored once per distinct value plus a small code per row
+CATEGORY_COLUMNS = ['Office Name', 'Phone 1 Type', 'Phone 2 Type', 'Phone 3 Type', 'Alt. City', 'Alt. Zip']
+# Mostly distinct text: Arrow-backed when pyarrow is installed, plain object columns otherwise
+STRING_COLUMNS = ['First Name', 'Last Name', 'EMail', 'Alt. Address']
+ID_COLUMNS = ['Agent ID', 'Office ID']
+
+
+def string_dtype():
+    """The dtype used for STRING_COLUMNS: 'string[pyarrow]', or object without pyarrow."""
+    return pd.StringDtype('pyarrow') if ARROW_STRINGS else object
+
+
+def master_read_dtypes():
+    """
+    dtype= mapping for pd.read_csv on a master file. Phones are read as text
+    so apply_master_schema can normalize both float artifacts and formatted
+    numbers; columns missing from the file are ignored by read_csv.
+    """
+    dtypes = {col: 'category' for col in CATEGORY_COLUMNS}
+    dtypes.update({col: str for col in PHONE_COLUMNS})
+    if ARROW_STRINGS:
+        dtypes.update({col: string_dtype() for col in STRING_COLUMNS})
+    return dtypes
+
+
+def apply_master_schema(df):
+    """
+    Converts a master-shaped DataFrame to the compact master schema:
+    Int64 phones, categorical low-cardinality columns, Arrow strings for
+    names and emails (when available) and Int64 ids. Columns that are not
+    present are skipped.
+
+    Args:
+    df: The DataFrame to convert (modified in place).
+
+    Returns:
+    pd.DataFrame: The same DataFrame with compact dtypes.
+    """
+    for col in PHONE_COLUMNS:
+        if col in df.columns and df[col].dtype != 'Int64':
+            df[col] = normalize_phone_values(df[col], as_int=True).array
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    if ARROW_STRINGS:
+        for col in STRING_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(string_dtype())
+    for col in ID_COLUMNS:
+        # Nullable ints, so a blank id (or a join that misses) doesn't turn every id into a float
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]) and df[col].dtype != 'Int64':
+            ids = df[col]
+            if (ids.dropna() % 1 == 0).all():
+                df[col] = ids.astype('Int64')
+    return df
+
+
+def read_master_csv(csv_path, **kwargs):
+    """
+    Reads a master CSV (a path or a file-like object) straight into the
+    compact master schema. Extra keyword arguments go to pd.read_csv.
+    """
+    return apply_master_schema(pd.read_csv(csv_path, dtype=master_read_dtypes(), **kwargs))
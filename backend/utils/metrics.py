@@ -0,0 +1,190 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; covers a few-row paste up to a multi-million-row master load
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base for metrics with an optional fixed set of label names."""
+
+    type_name = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """A monotonically increasing total, e.g. rows processed."""
+
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down. Unlabelled gauges may be given a
+    function instead, which is called at scrape time; returning None
+    leaves the sample out.
+    """
+
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        if self.function is None:
+            return super().render()
+        value = self.function()
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        if value is not None:
+            lines.append(f'{self.name} {_format_value(float(value))}')
+        return lines
+
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets, plus their sum and count."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            # An observation equal to a bound falls in that bucket (le = "less than or equal")
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_sample(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.label_names, key, [('le', _format_value(float(bound)))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.label_names, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text format."""
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=(), function=None):
+        return self.register(Gauge(name, documentation, labels, function))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'csvtools_stage_seconds',
+    'Time spent in a processing stage, one observation per run (per chunk when streaming).',
+    labels=('stage',))
+ROWS_PROCESSED = REGISTRY.counter(
+    'csvtools_rows_processed_total', 'Rows read from uploads and written to responses.',
+    labels=('route', 'direction'))
+BYTES_PROCESSED = REGISTRY.counter(
+    'csvtools_bytes_processed_total', 'Bytes received in uploads and sent in responses.',
+    labels=('route', 'direction'))
+HTTP_REQUESTS = REGISTRY.counter(
+    'csvtools_http_requests_total', 'HTTP requests handled.',
+    labels=('route', 'method', 'status'))
+# Single-agent lookups answer in well under the smallest stage bucket
+AGENT_LOOKUP_SECONDS = REGISTRY.histogram(
+    'csvtools_agent_lookup_seconds', 'Time to answer one agent lookup from the resident index.',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1))
+RESULT_CACHE_REQUESTS = REGISTRY.counter(
+    'csvtools_result_cache_requests_total', 'Uploads answered from the result cache (hit) or processed (miss).',
+    labels=('route', 'result'))
+
+
+@contextmanager
+def timed_stage(stage):
+    """Records how long the with-block takes under the given stage name, even if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
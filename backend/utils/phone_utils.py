@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+PHONE_COLUMNS = ["Phone 1", "Phone 2", "Phone 3"]
+
+# Valid phone numbers are exactly 10 digits, i.e. in [10**9, 10**10)
+MIN_PHONE = 10**9
+MAX_PHONE = 10**10
+
+
+def normalize_phone_values(values, as_int=False):
+    """
+    Normalizes a flat array of phone values to 10-digit phone numbers.
+
+    Numeric cells (including pandas float artifacts such as 7143106401.0)
+    are validated arithmetically without going through strings; only cells
+    that hold formatted text like "(714) 310-6401" have their non-digits
+    stripped. Anything that doesn't end up as exactly 10 digits is invalid.
+
+    Args:
+    values: A Series or array-like of raw phone values.
+    as_int: If True, return compact Int64 storage instead of strings.
+
+    Returns:
+    pd.Series: Normalized phones (str or Int64), None/<NA> where invalid.
+    """
+    values = pd.Series(values, copy=False).reset_index(drop=True)
+    numbers = np.full(len(values), np.nan)
+
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+    elif len(values):
+        # Plain numbers and numeric strings ("7143106401.0") convert directly
+        numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+        # Formatted text falls back to stripping non-digits
+        text_mask = np.isnan(numbers) & values.notna().to_numpy()
+        if text_mask.any():
+            # Float artifacts never get here, so dots are separators ("714.555.0000")
+            digits = values[text_mask].astype(str).str.replace(r'\D', '', regex=True)
+            digits = digits[digits.str.len() == 10]
+            numbers[digits.index.to_numpy()] = digits.astype(np.int64).to_numpy()
+
+    valid = (numbers >= MIN_PHONE) & (numbers < MAX_PHONE) & (numbers == np.floor(numbers))
+    phones = np.where(valid, numbers, 0).astype(np.int64)
+
+    if as_int:
+        return pd.Series(pd.array(phones, dtype="Int64")).where(valid, pd.NA)
+    return pd.Series(np.where(valid, phones.astype(str), None), dtype=object)
+
+
+def normalize_phone_columns(df, phone_columns=PHONE_COLUMNS, as_int=False):
+    """
+    Normalizes several phone columns of a DataFrame in one vectorized pass.
+
+    All present columns are flattened into a single array, normalized
+    together and written back, so the per-column overhead is paid once.
+
+    Args:
+    df: The DataFrame to process (modified in place).
+    phone_columns: List of columns containing phone numbers; missing ones are skipped.
+    as_int: If True, store phones as Int64 instead of strings.
+
+    Returns:
+    pd.DataFrame: The same DataFrame with normalized phone columns.
+    """
+    columns = [col for col in phone_columns if col in df.columns]
+    if not columns:
+        return df
+
+    flat = df[columns].to_numpy().ravel(order='F')
+    normalized = normalize_phone_values(flat, as_int=as_int)
+
+    n_rows = len(df)
+    for i, col in enumerate(columns):
+        df[col] = normalized.iloc[i * n_rows:(i + 1) * n_rows].values
+    return df
@@ -1,5 +1,11 @@
+import numpy as np
 import pandas as pd
 
+from utils.master_utils.schema import read_master_csv
+
+# infer_dtype results of object columns that hold at least one str (or are empty)
+STRING_INFERRED_TYPES = ('string', 'empty', 'mixed', 'mixed-integer')
+
 def convert_csv_to_lowercase(input_file_path, output_file_path):
     """
     Converts all cells in a CSV file to lowercase and saves the result.
@@ -12,17 +18,193 @@ def load_and_preprocess_data(input_csv_path, master_csv_path):
     """
     Load and preprocess CSV files by converting all text to lowercase.
     """
-    input_df = pd.read_csv(input_csv_path).applymap(lambda x: x.lower() if isinstance(x, str) else x)
-    master_df = pd.read_csv(master_csv_path).applymap(lambda x: x.lower() if isinstance(x, str) else x)
-    return input_df.drop_duplicates(), master_df.drop_duplicates()
+    input_df = load_and_preprocess_csv(input_csv_path)
+    master_df = load_and_preprocess_master(master_csv_path)
+    return input_df, master_df
+
+def lowercase_strings(df):
+    """
+    Lowercase every string cell in the DataFrame one column at a time,
+    leaving non-string cells untouched. Categorical columns only have
+    their categories lowercased, so they stay categorical.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = lowercase_categorical(df[col])
+        elif df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            # Object columns without any string (ids, numbers, dates) have nothing to lowercase
+            if pd.api.types.infer_dtype(df[col], skipna=True) not in STRING_INFERRED_TYPES:
+                continue
+            lowered = df[col].str.lower()
+            df[col] = lowered.where(lowered.notna(), df[col])
+    return df
+
+def lowercase_categorical(series):
+    """
+    Lowercase the categories of a categorical Series. Categories that only
+    differ by case ('Irvine', 'IRVINE') are merged into one.
+    """
+    lowered = series.cat.categories.map(lambda value: value.lower() if isinstance(value, str) else value)
+    if lowered.is_unique:
+        return series.cat.rename_categories(lowered)
+    categories = lowered.unique()
+    new_codes = categories.get_indexer(lowered)
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, new_codes[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index, name=series.name)
+
+def load_and_preprocess_csv(csv_path):
+    """
+    Load a single CSV file (a path or a file-like object such as an upload
+    stream), convert all text to lowercase and drop duplicate rows.
+    """
+    return lowercase_strings(pd.read_csv(csv_path)).drop_duplicates()
+
+def load_and_preprocess_master(csv_path):
+    """
+    Load a master CSV into the compact master schema (see
+    utils.master_utils.schema), lowercase its text and drop duplicate rows.
+    """
+    return lowercase_strings(read_master_csv(csv_path)).drop_duplicates()
+
+def hash_key_columns(df, key_columns):
+    """
+    Hash the key columns of every row into a single 64-bit composite key.
+    """
+    return pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy()
+
+def build_key_index(df, key_columns):
+    """
+    Build a hashed index of the unique composite keys in df, to be probed
+    many times by split_matching_rows.
+    """
+    return pd.Index(np.unique(hash_key_columns(df, key_columns)))
+
+def build_key_lookup(df, key_columns):
+    """
+    Build a sorted lookup over the composite keys of df so the rows for a
+    handful of keys can be fetched without scanning or re-hashing df.
+    
+    Returns:
+    key_lookup: Tuple of (sorted key hashes, row positions in that order).
+    """
+    hashes = hash_key_columns(df, key_columns)
+    order = np.argsort(hashes, kind='stable')
+    return hashes[order], order
+
+def lookup_key_positions(key_lookup, keys):
+    """
+    Find every row sharing each of keys in a lookup from build_key_lookup.
+    
+    Returns:
+    key_positions: For each match, the position in keys it was found for.
+    row_positions: For each match, the row position in the looked-up DataFrame.
+    """
+    sorted_hashes, order = key_lookup
+    starts = np.searchsorted(sorted_hashes, keys, side='left')
+    counts = np.searchsorted(sorted_hashes, keys, side='right') - starts
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(np.arange(len(keys)), counts), order[np.repeat(starts, counts) + offsets]
+
+def select_matching_rows(df, key_lookup, keys):
+    """
+    Return the rows of df whose composite key hash is in keys, in their
+    original order, using a lookup from build_key_lookup(df, ...).
+    """
+    _, positions = lookup_key_positions(key_lookup, np.unique(keys))
+    return df.iloc[np.sort(positions)]
 
-def find_missing_rows(main_df, supplementary_df, key_columns):
+def split_matching_rows(main_df, supplementary_df, key_columns, key_index=None):
     """
-    Find rows in supplementary_df that are missing in main_df based on key columns.
+    Split supplementary_df into rows whose keys are present in main_df and
+    rows whose keys are not, in a single vectorized probe.
+    
+    Args:
+    main_df: The DataFrame to match against (ignored when key_index is given).
+    supplementary_df: The DataFrame whose rows are being looked up.
+    key_columns: List of column names to use as keys for comparison.
+    key_index: Optional prebuilt index from build_key_index(main_df, key_columns).
+    
+    Returns:
+    matched_rows_df: Rows of supplementary_df found in main_df.
+    missing_rows_df: Rows of supplementary_df not found in main_df.
     """
-    missing_rows_df = supplementary_df[~supplementary_df[key_columns].apply(tuple, 1).isin(main_df[key_columns].apply(tuple, 1))]
+    if key_index is None:
+        key_index = build_key_index(main_df, key_columns)
+    found = pd.Index(hash_key_columns(supplementary_df, key_columns)).isin(key_index)
+    return supplementary_df[found], supplementary_df[~found]
+
+def find_missing_rows(main_df, supplementary_df, key_columns, key_index=None):
+    """
+    Adds rows from supplementary_df to main_df if they are not already present
+    based on the key columns (e.g., 'First Name' and 'Last Name').
+    
+    Args:
+    main_df: The DataFrame to which non-matching rows will be added.
+    supplementary_df: The DataFrame from which non-matching rows will be sourced.
+    key_columns: List of column names to use as keys for comparison.
+    key_index: Optional prebuilt index from build_key_index(main_df, key_columns).
+    
+    Returns:
+    missing_rows_df: The DataFrame of missing rows that are not present in main_df.
+    """
+    _, missing_rows_df = split_matching_rows(main_df, supplementary_df, key_columns, key_index)
     return missing_rows_df.loc[:, ['First Name', 'Last Name', 'Phone', 'EMail']]
 
+def coalesce_duplicates(df, key_columns):
+    """
+    Collapse rows sharing the same key into one row per key in a single
+    hashed pass. Instead of keeping one whole row and discarding the rest,
+    every column takes the group's non-null value, so fields only the
+    "losing" rows had are kept.
+    
+    Only groups whose rows agree are collapsed: if any column holds two
+    different non-null values within a group (two phones, two offices),
+    merging would have to drop one, so all of that group's rows are kept
+    unchanged. Rows whose key columns are all missing have nothing
+    identifying them, so they are kept unchanged too. Rows missing only
+    some key columns are grouped on the values they have.
+    
+    Args:
+    df: The DataFrame to deduplicate.
+    key_columns: Column(s) identifying a record, e.g. ['Agent ID'] or
+    ['First Name', 'Last Name', 'EMail'].
+    
+    Returns:
+    pd.DataFrame: One row per agreeing key, plus every row of conflicting
+    keys and every keyless row, in their original order.
+    """
+    if isinstance(key_columns, str):
+        key_columns = [key_columns]
+    if df.empty:
+        return df.copy()
+
+    keys = pd.Series(hash_key_columns(df, key_columns))
+    no_key = df[key_columns].isna().all(axis=1).to_numpy()
+    first_rows = ~keys.duplicated().to_numpy() | no_key
+    repeated = keys.duplicated(keep=False).to_numpy() & ~no_key
+    if not repeated.any():
+        return df.iloc[np.flatnonzero(first_rows)].reset_index(drop=True)
+
+    # Only keys that occur more than once need grouping; their groups come out
+    # in first-appearance order, so they line up with their first rows below
+    positions = np.flatnonzero(repeated)
+    grouped = df.iloc[positions].groupby(keys.to_numpy()[positions], sort=False)
+    agrees = (grouped.nunique() <= 1).all(axis=1)
+    conflicting = repeated & np.isin(keys.to_numpy(), agrees.index[~agrees.to_numpy()])
+    kept = first_rows | conflicting
+    coalesced = grouped.first()[agrees.to_numpy()]
+    targets = np.flatnonzero((first_rows & repeated & ~conflicting)[kept])
+
+    kept_positions = np.flatnonzero(kept)
+    columns = {}
+    for col in df.columns:
+        values = df[col].array.take(kept_positions)
+        values[targets] = coalesced[col].array
+        columns[col] = values
+    return pd.DataFrame(columns, copy=False)
+
 def melt_master_dataframe(master_df):
     """
     Melt the master DataFrame to handle multiple phone numbers.
@@ -30,6 +212,8 @@ def melt_master_dataframe(master_df):
     non_phone_columns = [col for col in master_df.columns if col not in ["Phone 1", "Phone 2", "Phone 3", "Phone 1 Type", "Phone 2 Type", "Phone 3 Type"]]
     melted_master_df = pd.melt(master_df, id_vars=non_phone_columns, value_vars=["Phone 1", "Phone 2", "Phone 3"],
                                var_name="Phone Type", value_name="Phone")
+    # Only three distinct values, repeated on every melted row
+    melted_master_df["Phone Type"] = melted_master_df["Phone Type"].astype("category")
     return melted_master_df
 
 def count_matching_names(main_df, supplementary_df, key_columns):
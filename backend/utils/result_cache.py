@@ -0,0 +1,167 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+HASH_BLOCK_SIZE = 1024 * 1024
+ENTRY_SUFFIX = '.csv'
+
+
+def hash_stream(stream, block_size=HASH_BLOCK_SIZE):
+    """
+    SHA-256 of a binary file-like object's content, read a block at a time.
+    The stream is rewound to where it was, so it can still be parsed afterwards.
+    """
+    position = stream.tell()
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(block_size), b''):
+        digest.update(block)
+    stream.seek(position)
+    return digest.hexdigest()
+
+
+def cache_key(*parts):
+    """A stable hex key for any JSON-serializable parts (content hash, master version, parameters...)."""
+    encoded = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Disk-backed cache of CSV results, keyed by cache_key and capped in size.
+
+    Each entry is one file in cache_dir. Entries are evicted least recently
+    used first once their total size exceeds max_bytes; the order is kept in
+    memory and mirrored in the files' modification times, so it survives a
+    restart. A max_bytes of 0 disables storing.
+
+    Windows can't remove or replace a file that is still open, e.g. while a
+    response is being sent from it. Such an evicted entry stays counted in
+    size and its removal is retried on later evictions.
+
+    Attributes:
+    cache_dir: Folder holding the entries.
+    max_bytes: Size cap of all entries together.
+    size: Current size of all entries, in bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._evicted = {}  # key -> size of evicted entries whose file couldn't be removed yet
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Picks up the entries left by an earlier process and removes half-written ones."""
+        found = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.tmp'):
+                os.remove(entry.path)
+            elif entry.name.endswith(ENTRY_SUFFIX):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-len(ENTRY_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+        with self._lock:
+            self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def open(self, key):
+        """
+        Opens a cached result for reading and marks it most recently used.
+
+        The file is opened under the lock, so an eviction right after leaves
+        the caller a readable file (on Windows the removal waits until it is
+        closed, see the class docstring).
+
+        Returns:
+        file: The entry opened in binary mode, or None when it isn't cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            try:
+                result = open(self.path(key), 'rb')
+            except FileNotFoundError:
+                # Removed behind our back; forget it
+                self.size -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+            try:
+                os.utime(self.path(key))
+            except OSError:
+                pass  # only the order after a restart depends on it
+            return result
+
+    def store(self, key, pieces):
+        """
+        Passes text pieces (e.g. from iter_csv) through while writing them to
+        a new entry, so a streamed response fills the cache as it is sent.
+
+        The entry is only added once every piece has been consumed; if the
+        consumer stops early or a piece raises, the partial file is removed.
+
+        Yields:
+        str: The pieces, unchanged.
+        """
+        if self.max_bytes <= 0:
+            yield from pieces
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f'.{key}.', suffix='.tmp')
+        try:
+            with open(fd, 'w', encoding='utf-8', newline='') as f:
+                for piece in pieces:
+                    f.write(piece)
+                    yield piece
+            self._add(key, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _add(self, key, tmp_path):
+        size = os.path.getsize(tmp_path)
+        if size > self.max_bytes:
+            logging.info(f"Result of {size} bytes is larger than the {self.max_bytes}-byte cache; not cached")
+            return
+        with self._lock:
+            try:
+                os.replace(tmp_path, self.path(key))
+            except OSError as e:
+                # The previous result for this key is still being sent (Windows); keep it
+                logging.info(f"Could not replace cached result {key}: {e}")
+                return
+            self.size += size - self._entries.pop(key, 0) - self._evicted.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def _remove(self, key, size):
+        """Deletes an evicted entry's file, or keeps it counted for a later retry if it is still open."""
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            self._evicted[key] = size
+            return
+        self.size -= size
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits max_bytes. Call with the lock held."""
+        for key, size in list(self._evicted.items()):
+            del self._evicted[key]
+            self._remove(key, size)
+        while self._entries and self.size > self.max_bytes:
+            self._remove(*self._entries.popitem(last=False))
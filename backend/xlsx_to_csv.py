@@ -1,26 +1,241 @@
+"""
+Convert a folder of Excel workbooks (MLS / BrokerMetrics exports) to CSV.
+
+Workbooks are converted in parallel, one per worker process. .xlsx files
+are streamed row by row with openpyxl's read-only mode instead of being
+loaded whole by pd.read_excel. A workbook is skipped when its CSV is
+already newer than it and holds the requested columns, so re-running only
+converts new or changed files.
+With --expected-columns only the BrokerMetrics columns the master build
+reads are written, so the combine steps read less data.
+
+Run from the backend folder:
+    python xlsx_to_csv.py data/mls_data --workers 4
+    python xlsx_to_csv.py data/brokermetrics_data/Newly_added --expected-columns
+"""
 import os
-import pandas as pd
-
-# Define the folder containing the Excel files
-folder_path = r'CSV-Tools\backend\agentdata\mls_data'  # Adjust the folder path as needed
-
-# Iterate through all files in the folder
-for filename in os.listdir(folder_path):
-    # Check if the file is an Excel file (ends with .xlsx or .xls)
-    if filename.endswith('.xlsx') or filename.endswith('.xls'):
-        # Construct the full file path
-        file_path = os.path.join(folder_path, filename)
-        
-        # Read the Excel file
-        df = pd.read_excel(file_path)
-        
-        # Create an output CSV file path by changing the file extension to .csv
-        output_filename = filename.rsplit('.', 1)[0] + '.csv'
-        output_path = os.path.join(folder_path, output_filename)
-        
-        # Write the DataFrame to a CSV file
-        df.to_csv(output_path, index=False)
-        
-        print(f"Processed {filename} and saved as {output_filename}")
-
-print("All Excel files have been processed and converted to CSV.")
+import csv
+import argparse
+import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.file_utils import atomic_output
+from utils.master_utils.columns import EXPECTED_COLUMNS
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+
+
+def list_workbooks(folder_path):
+    """Returns the Excel workbooks in a folder in sorted order, skipping Office lock files (~$...)."""
+    return [os.path.join(folder_path, filename)
+            for filename in sorted(os.listdir(folder_path))
+            if filename.lower().endswith(EXCEL_EXTENSIONS) and not filename.startswith('~$')]
+
+
+def csv_path_for(file_path, output_folder=None):
+    """The CSV a workbook converts to: same name with .csv, next to it or in output_folder."""
+    filename = os.path.splitext(os.path.basename(file_path))[0] + '.csv'
+    return os.path.join(output_folder or os.path.dirname(file_path), filename)
+
+
+def _header_names(header):
+    return [str(name).strip() if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+
+
+def read_csv_header(output_path):
+    """The column names in the first line of a CSV, or None when it is empty."""
+    with open(output_path, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), None)
+
+
+def is_up_to_date(file_path, output_path, columns=None):
+    """
+    True when the CSV exists, was written after the workbook was last
+    modified and holds the requested columns, so a file converted with
+    --expected-columns is redone when all columns are wanted and vice versa.
+
+    Args:
+    file_path: The workbook.
+    output_path: Its CSV.
+    columns: The columns the CSV must hold, in order; None for all of the
+    workbook's columns, which reads the workbook's header row.
+    """
+    if not os.path.exists(output_path) or os.path.getmtime(output_path) < os.path.getmtime(file_path):
+        return False
+    written = read_csv_header(output_path)
+    if columns is not None:
+        return written == list(columns)
+    rows = iter_sheet_rows(file_path)
+    try:
+        header = next(rows, None)
+    finally:
+        rows.close()
+    return header is not None and written == _header_names(header)
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    # Dates as pd.read_excel + to_csv writes them: 2024-01-05, with the time only when there is one
+    if isinstance(value, datetime.datetime):
+        if value.time() == datetime.time(0):
+            return value.date().isoformat()
+        return value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    # Whole numbers (ids, phones) are stored as floats; write 7143106401, not 7143106401.0
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_sheet_rows(file_path):
+    """
+    Yields the first sheet of a workbook as tuples of cell values, skipping
+    empty rows. .xlsx/.xlsm files are streamed with openpyxl in read-only
+    mode; legacy .xls files can only be read whole through pd.read_excel.
+    """
+    if file_path.lower().endswith('.xls'):
+        import pandas as pd
+        df = pd.read_excel(file_path, header=None, dtype=object)
+        for row in df.itertuples(index=False, name=None):
+            values = tuple(None if pd.isna(value) else value for value in row)
+            if any(value is not None for value in values):
+                yield values
+        return
+
+    # Imported here so the CLI starts (and workers spawn) without loading openpyxl up front
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("openpyxl is required to read .xlsx workbooks (pip install openpyxl)") from None
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            # Read-only sheets often report trailing formatted-but-empty rows
+            if any(value is not None for value in row):
+                yield row
+    finally:
+        workbook.close()
+
+
+def convert_workbook(file_path, output_path, columns=None):
+    """
+    Converts the first sheet of a workbook to CSV, writing the output atomically.
+
+    Args:
+    file_path: The workbook to convert.
+    output_path: The CSV to write.
+    columns: If given, only these columns are written, in this order; the
+    workbook must contain all of them.
+
+    Returns:
+    int: The number of data rows written.
+    """
+    rows = iter_sheet_rows(file_path)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("the first sheet is empty")
+    header = _header_names(header)
+
+    positions = list(range(len(header)))
+    if columns is not None:
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise ValueError(f"missing expected columns {missing}")
+        positions = [header.index(col) for col in columns]
+
+    row_count = 0
+    with atomic_output(output_path) as tmp_path:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([header[i] for i in positions])
+            for row in rows:
+                writer.writerow([_cell_text(row[i]) if i < len(row) else '' for i in positions])
+                row_count += 1
+    return row_count
+
+
+def _convert_if_stale(file_path, output_path, columns, force):
+    """
+    Converts one workbook unless its CSV is up to date.
+
+    Returns:
+    tuple: (file_path, 'converted' / 'skipped' / 'failed', rows written or error message).
+    """
+    try:
+        if not force and is_up_to_date(file_path, output_path, columns):
+            return file_path, 'skipped', None
+        return file_path, 'converted', convert_workbook(file_path, output_path, columns)
+    except Exception as e:
+        return file_path, 'failed', str(e)
+
+
+def _report(result):
+    file_path, status, detail = result
+    filename = os.path.basename(file_path)
+    if status == 'converted':
+        print(f"Processed {filename} ({detail} rows)")
+    elif status == 'skipped':
+        print(f"Skipped {filename}: CSV is up to date")
+    else:
+        print(f"Error converting {filename}: {detail}")
+    return result
+
+
+def convert_folder(folder_path, output_folder=None, columns=None, workers=None, force=False):
+    """
+    Converts every workbook in a folder to CSV, in a process pool.
+
+    Args:
+    folder_path: Folder containing the workbooks.
+    output_folder: Where to write the CSVs; defaults to folder_path.
+    columns: Only write these columns (e.g. EXPECTED_COLUMNS); all columns when None.
+    workers: Number of worker processes; defaults to the CPU count, 1 converts in this process.
+    force: Convert even workbooks whose CSV is up to date.
+
+    Returns:
+    list: One (file_path, status, rows or error) tuple per workbook, in filename order.
+    """
+    file_paths = list_workbooks(folder_path)
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
+    jobs = [(file_path, csv_path_for(file_path, output_folder), columns, force) for file_path in file_paths]
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) or 1
+
+    results = {}
+    if workers == 1:
+        for job in jobs:
+            results[job[0]] = _report(_convert_if_stale(*job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_convert_if_stale, *job) for job in jobs]
+            for future in as_completed(futures):
+                result = _report(future.result())
+                results[result[0]] = result
+    return [results[file_path] for file_path in file_paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="Folder containing the Excel files")
+    parser.add_argument("--output-dir", help="Where to write the CSV files (default: next to the workbooks)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--expected-columns", action="store_true",
+                        help="Only write the BrokerMetrics columns used to build the master")
+    parser.add_argument("--force", action="store_true", help="Convert workbooks even if their CSV is up to date")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"folder does not exist: {args.folder}")
+    columns = EXPECTED_COLUMNS if args.expected_columns else None
+    results = convert_folder(args.folder, args.output_dir, columns, args.workers, args.force)
+
+    counts = {status: sum(1 for _, s, _ in results if s == status) for status in ('converted', 'skipped', 'failed')}
+    print(f"{counts['converted']} converted, {counts['skipped']} up to date, {counts['failed']} failed")
+    if counts['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()